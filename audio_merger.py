@@ -12,16 +12,413 @@ Usage:
     python audio_merger.py
 """
 
+import contextlib
+import hashlib
 import json
 import os
 import sys
 import requests
+from requests.adapters import HTTPAdapter
+import shutil
+import struct
 import subprocess
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import List, Dict, Optional
+from urllib.parse import urlsplit
+from typing import Callable, List, Dict, Optional, Tuple
 from pydub import AudioSegment
 import time
 
+import metrics
+
+try:
+    import numpy as np
+except ImportError:  # Optional: only needed by the "pcm" merge engine
+    np = None
+
+
+class TTSCache:
+    """On-disk, content-addressed LRU cache of synthesized audio."""
+    
+    def __init__(self, directory: str = ".tts_cache", max_size_mb: float = 256):
+        """
+        Initialize the cache, indexing any entries left by previous runs.
+        
+        Args:
+            directory: Directory holding cached audio files
+            max_size_mb: Size cap in megabytes; least recently used entries are evicted
+        """
+        self.directory = directory
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        
+        os.makedirs(self.directory, exist_ok=True)
+        
+        # Rebuild LRU order from modification times (touched on every hit)
+        existing = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".audio"):
+                stat = os.stat(os.path.join(self.directory, name))
+                existing.append((stat.st_mtime, name[:-len(".audio")], stat.st_size))
+        for _, key, size in sorted(existing):
+            self._entries[key] = size
+            self._size += size
+    
+    @staticmethod
+    def make_key(text: str, voice: str, emotion: str, rate: str,
+                 payload_format: str) -> str:
+        """Hash everything that influences the synthesized audio."""
+        material = json.dumps([text, voice, emotion, rate, payload_format])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.audio")
+    
+    def get(self, key: str, dest_path: str) -> bool:
+        """
+        Copy cached audio for a key to dest_path.
+        
+        Returns:
+            True on a hit, False on a miss
+        """
+        # copyfile returns dest_path, so a hit is never None
+        return self._lookup(key, lambda path: shutil.copyfile(path, dest_path)) is not None
+    
+    def read(self, key: str) -> Optional[bytes]:
+        """Return cached audio for a key, or None on a miss."""
+        
+        def read_file(path: str) -> bytes:
+            with open(path, 'rb') as f:
+                return f.read()
+        
+        return self._lookup(key, read_file)
+    
+    def _lookup(self, key: str, fetch: Callable[[str], object]):
+        """Apply fetch to a cached entry's file, counting the hit or miss."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                metrics.TTS_CACHE_EVENTS.labels(event="miss").inc()
+                return None
+            self._entries.move_to_end(key)
+        
+        try:
+            result = fetch(self._path(key))
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            # Entry removed behind our back; treat as a miss
+            with self._lock:
+                self._size -= self._entries.pop(key, 0)
+                self.misses += 1
+            metrics.TTS_CACHE_EVENTS.labels(event="miss").inc()
+            return None
+        
+        with self._lock:
+            self.hits += 1
+        metrics.TTS_CACHE_EVENTS.labels(event="hit").inc()
+        return result
+    
+    def put(self, key: str, src_path: str):
+        """Store a copy of an audio file for a key, evicting least recently used entries."""
+        self._store(key, os.path.getsize(src_path),
+                    lambda tmp_path: shutil.copyfile(src_path, tmp_path))
+    
+    def put_bytes(self, key: str, data: bytes):
+        """Store audio bytes for a key, evicting least recently used entries."""
+        
+        def write(tmp_path: str):
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+        
+        self._store(key, len(data), write)
+    
+    def _store(self, key: str, size: int, write: Callable[[str], None]):
+        if size > self.max_bytes:
+            return
+        
+        path = self._path(key)
+        # Unique across threads and processes sharing the cache directory
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        
+        with self._lock:
+            self._size -= self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._size += size
+            
+            while self._size > self.max_bytes:
+                old_key, old_size = self._entries.popitem(last=False)
+                self._size -= old_size
+                self.evictions += 1
+                metrics.TTS_CACHE_EVENTS.labels(event="eviction").inc()
+                try:
+                    os.remove(self._path(old_key))
+                except OSError:
+                    pass
+    
+    def stats(self) -> Dict:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+            }
+
+
+class RequestCancelled(Exception):
+    """Raised inside a TTS request whose result is no longer needed."""
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker shared by every segment of a run.
+    
+    After failure_threshold consecutive failures the breaker opens and the
+    endpoint is skipped without a request. Once cooldown seconds have passed
+    a single probe request is let through (half-open): success closes the
+    breaker, failure opens it for another cooldown.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+    
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 30.0,
+                 name: str = ""):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.name = name
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+        self._set_state(self.CLOSED)
+    
+    def _set_state(self, state: str):
+        self.state = state
+        metrics.TTS_CIRCUIT_STATE.labels(endpoint=self.name).set(self.STATE_VALUES[state])
+    
+    def allow(self) -> bool:
+        """Return True if a request may be sent to the endpoint now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self._set_state(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                self._set_state(self.CLOSED)
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                self._set_state(self.OPEN)
+                self.opened_at = time.monotonic()
+            self._probing = False
+    
+    def release(self):
+        """Give back a probe that ended without an outcome (e.g. cancelled)."""
+        with self._lock:
+            self._probing = False
+    
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN
+    
+    def stats(self) -> Dict:
+        """Return the breaker state for reporting."""
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "trips": self.trips,
+            }
+
+
+class AdaptiveLimiter:
+    """
+    Token bucket plus AIMD concurrency limit for one TTS endpoint.
+    
+    The token bucket caps the request rate. The concurrency limit grows by
+    roughly one slot per round of successful requests and is multiplied by
+    backoff on overload (429, 5xx, timeouts, refused connections), at most
+    once per window of ``limit`` completed requests (like TCP congestion
+    control), so in-flight requests settle at what the endpoint can serve.
+    """
+    
+    def __init__(self,
+                 initial_limit: int = 4,
+                 min_limit: int = 1,
+                 max_limit: int = 4,
+                 rate: Optional[float] = None,
+                 burst: Optional[float] = None,
+                 backoff: float = 0.5,
+                 name: str = ""):
+        """
+        Initialize the limiter.
+        
+        Args:
+            initial_limit: Starting number of concurrent requests
+            min_limit: Floor for the concurrency limit
+            max_limit: Ceiling for the concurrency limit (equal to initial_limit
+                and min_limit for a fixed limit)
+            rate: Requests per second allowed by the token bucket (None = unlimited)
+            burst: Token bucket capacity (default: one second of rate)
+            backoff: Multiplicative decrease applied on overload
+            name: Endpoint label for metrics
+        
+        A floor below one request could never be raised again (nothing would
+        complete), so min_limit is at least 1 and the other bounds follow it.
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate or 1.0)
+        self.backoff = backoff
+        self.name = name
+        self.in_flight = 0
+        self.decreases = 0
+        self.throttled = 0
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+        self._since_decrease = 0
+        self._condition = threading.Condition()
+        metrics.TTS_CONCURRENCY_LIMIT.labels(endpoint=name).set(self.limit)
+    
+    def _take_token(self):
+        """Block until the token bucket allows one more request."""
+        if self.rate is None:
+            return
+        waited = False
+        while True:
+            with self._condition:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+                self._refilled_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_time = (1 - self._tokens) / self.rate
+                if not waited:
+                    self.throttled += 1
+                    waited = True
+            time.sleep(wait_time)
+    
+    def acquire(self):
+        """Wait for a token and a free concurrency slot."""
+        self._take_token()
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+    
+    def release(self, outcome: Optional[bool]):
+        """
+        Free a slot and adapt the limit.
+        
+        Args:
+            outcome: True on success, False on overload, None when the response
+                says nothing about capacity (client errors, cancellation)
+        """
+        with self._condition:
+            self.in_flight -= 1
+            self._since_decrease += 1
+            if outcome is True:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            elif outcome is False:
+                # Requests already in flight at the last decrease don't count again
+                if self._since_decrease >= int(self.limit) and self.limit > self.min_limit:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self._since_decrease = 0
+                    self.decreases += 1
+            metrics.TTS_CONCURRENCY_LIMIT.labels(endpoint=self.name).set(self.limit)
+            self._condition.notify_all()
+    
+    def permit(self) -> "_Permit":
+        """Context manager holding one slot; set .outcome before it exits."""
+        return _Permit(self)
+    
+    def stats(self) -> Dict:
+        """Return the current limit and counters."""
+        with self._condition:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "decreases": self.decreases,
+                "throttled": self.throttled,
+            }
+
+
+class _Permit:
+    """One acquired AdaptiveLimiter slot."""
+    
+    def __init__(self, limiter: AdaptiveLimiter):
+        self.limiter = limiter
+        self.outcome: Optional[bool] = None
+    
+    def __enter__(self) -> "_Permit":
+        self.limiter.acquire()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and issubclass(
+                exc_type, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+            self.outcome = False
+        self.limiter.release(self.outcome)
+        return False
+
+
+# Limiters are per endpoint and shared by every AudioGenerator in the process
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(url: str, **settings) -> AdaptiveLimiter:
+    """
+    Return the process-wide limiter for an endpoint, creating it on first use.
+    
+    Args:
+        url: Endpoint URL
+        **settings: AdaptiveLimiter arguments, used only when it is created
+    """
+    with _limiters_lock:
+        if url not in _limiters:
+            _limiters[url] = AdaptiveLimiter(name=url, **settings)
+        return _limiters[url]
+
 
 class AudioGenerator:
     """Generate audio from text using TTS services."""
@@ -29,11 +426,328 @@ class AudioGenerator:
     def __init__(self, primary_url: str = "http://localhost:8880/tts",
                  fallback_url: str = "http://localhost:5005/v1/audio/speech",
                  timeout: int = 60,
-                 max_retries: int = 3):
+                 max_retries: int = 3,
+                 max_in_flight: int = 4,
+                 cache: Optional[TTSCache] = None,
+                 stream: bool = False,
+                 chunk_size: int = 64 * 1024,
+                 batch_url: Optional[str] = None,
+                 payload_formats: Optional[Dict[str, str]] = None,
+                 pool_size: Optional[int] = None,
+                 breaker_threshold: Optional[int] = 3,
+                 breaker_cooldown: float = 30.0,
+                 hedge_percentile: Optional[float] = None,
+                 hedge_budget: float = 0.1,
+                 hedge_initial_delay: float = 2.0,
+                 hedge_min_samples: int = 20,
+                 rate_limit: Optional[Dict] = None,
+                 retry_backoff: float = 1.0):
+        """
+        Initialize the generator.
+        
+        Args:
+            primary_url: Primary TTS endpoint
+            fallback_url: Endpoint used when the primary fails
+            timeout: Request timeout in seconds
+            max_retries: Attempts per endpoint
+            max_in_flight: Concurrent requests allowed per endpoint
+            cache: Optional TTSCache for synthesized clips
+            stream: Stream responses straight to disk
+            chunk_size: Download chunk size in bytes
+            batch_url: Optional /tts/batch endpoint
+            payload_formats: Request format ("edge" or "orpheus") per endpoint URL
+            pool_size: Keep-alive connections kept per host (default max_in_flight)
+            breaker_threshold: Consecutive failures that open an endpoint's
+                circuit breaker (None disables breakers)
+            breaker_cooldown: Seconds an open breaker waits before a probe
+            hedge_percentile: Hedge to the fallback once the primary has been
+                slower than this percentile of its recent latencies (None
+                disables hedging)
+            hedge_budget: Maximum hedges as a fraction of primary requests
+            hedge_initial_delay: Hedge deadline in seconds until enough
+                latency samples exist
+            hedge_min_samples: Primary latencies needed before the
+                percentile deadline is used
+            rate_limit: AdaptiveLimiter arguments applied to every endpoint;
+                None keeps a fixed limit of max_in_flight
+            retry_backoff: Base of the exponential wait between retries, in seconds
+        """
         self.primary_url = primary_url
         self.fallback_url = fallback_url
+        self.batch_url = batch_url
         self.timeout = timeout
         self.max_retries = max_retries
+        self.max_in_flight = max_in_flight
+        self.cache = cache
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.payload_formats = payload_formats or {}
+        self.pool_size = pool_size or max_in_flight
+        self.rate_limit = rate_limit
+        self.retry_backoff = retry_backoff
+        self._slots_lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._sessions: Dict[str, requests.Session] = {}
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.hedge_percentile = hedge_percentile
+        self.hedge_budget = hedge_budget
+        self.hedge_initial_delay = hedge_initial_delay
+        self.hedge_min_samples = hedge_min_samples
+        self._latencies: Dict[str, deque] = {}
+        self._hedge_lock = threading.Lock()
+        self.hedge_requests = 0
+        self.hedges_sent = 0
+        self.hedge_wins = 0
+    
+    def _breaker(self, url: str) -> Optional[CircuitBreaker]:
+        """Return the circuit breaker guarding an endpoint, if enabled."""
+        if self.breaker_threshold is None:
+            return None
+        with self._slots_lock:
+            if url not in self._breakers:
+                self._breakers[url] = CircuitBreaker(self.breaker_threshold,
+                                                     self.breaker_cooldown, name=url)
+            return self._breakers[url]
+    
+    def endpoint_health(self) -> Dict[str, Dict]:
+        """Return the circuit breaker state of every endpoint used so far."""
+        with self._slots_lock:
+            breakers = dict(self._breakers)
+        return {url: breaker.stats() for url, breaker in breakers.items()}
+    
+    def _session(self, url: str) -> requests.Session:
+        """
+        Return the keep-alive session for an endpoint's host.
+        
+        Sessions are pooled per scheme://host:port, so every segment, retry
+        and batch request to the same service reuses warm connections instead
+        of opening a new TCP connection each time.
+        """
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        with self._slots_lock:
+            if origin not in self._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount(f"{parts.scheme}://", adapter)
+                self._sessions[origin] = session
+            return self._sessions[origin]
+    
+    def close(self):
+        """Close all pooled connections."""
+        with self._slots_lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            session.close()
+    
+    def _limiter(self, url: str) -> AdaptiveLimiter:
+        """Return the limiter bounding request rate and concurrency to an endpoint."""
+        if self.rate_limit is None:
+            return get_limiter(url, initial_limit=self.max_in_flight,
+                               min_limit=self.max_in_flight, max_limit=self.max_in_flight)
+        return get_limiter(url, **self.rate_limit)
+    
+    def endpoint_limits(self) -> Dict[str, Dict]:
+        """Return the limiter state of this generator's endpoints."""
+        urls = [self.primary_url, self.fallback_url] + ([self.batch_url] if self.batch_url else [])
+        return {url: self._limiter(url).stats() for url in urls}
+    
+    def _key_lock(self, key: str) -> threading.Lock:
+        """Return the lock serializing synthesis of one cache key."""
+        with self._slots_lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = threading.Lock()
+            return self._key_locks[key]
+    
+    def _payload_format(self, url: str) -> str:
+        """Return the request format configured for an endpoint."""
+        if url in self.payload_formats:
+            return self.payload_formats[url]
+        # Configs without payloadFormat: guess from the URL
+        if "edge-tts" in url or "localhost:8880" in url:
+            return "edge"
+        return "orpheus"
+    
+    @staticmethod
+    def _build_payload(payload_format: str, text: str, voice: str,
+                       emotion: str, rate: str) -> Dict:
+        """Build the request body for an endpoint's payload format."""
+        if payload_format == "edge":
+            # Edge TTS API format
+            return {
+                "text": text,
+                "lang": "en-US",
+                "emotion": emotion,
+                "rate": rate
+            }
+        # Orpheus TTS API format
+        return {
+            "input": text,
+            "model": "orpheus",
+            "voice": voice,
+            "response_format": "wav",
+            "speed": 1.0
+        }
+    
+    def _record_latency(self, url: str, seconds: float):
+        """Remember a request's latency for hedge deadlines (a lower bound if cancelled)."""
+        with self._hedge_lock:
+            if url not in self._latencies:
+                self._latencies[url] = deque(maxlen=200)
+            self._latencies[url].append(seconds)
+    
+    def _hedge_delay(self) -> float:
+        """Seconds to wait for the primary before hedging to the fallback."""
+        with self._hedge_lock:
+            samples = sorted(self._latencies.get(self.primary_url, ()))
+        if len(samples) < self.hedge_min_samples:
+            return self.hedge_initial_delay
+        index = min(len(samples) - 1, int(len(samples) * self.hedge_percentile / 100))
+        return samples[index]
+    
+    def _take_hedge(self) -> bool:
+        """Spend one hedge from the budget, if any is left."""
+        with self._hedge_lock:
+            if self.hedges_sent + 1 > max(1.0, self.hedge_budget * self.hedge_requests):
+                return False
+            self.hedges_sent += 1
+            metrics.TTS_HEDGES.labels(result="sent").inc()
+            return True
+    
+    def hedge_stats(self) -> Dict:
+        """Return hedging counters."""
+        with self._hedge_lock:
+            return {
+                "requests": self.hedge_requests,
+                "hedges": self.hedges_sent,
+                "fallback_wins": self.hedge_wins,
+            }
+    
+    def _start(self, function, *args) -> Future:
+        """Run function(*args) on its own thread and return its future."""
+        future: Future = Future()
+        
+        def run():
+            try:
+                future.set_result(function(*args))
+            except BaseException as e:
+                future.set_exception(e)
+        
+        threading.Thread(target=run, daemon=True).start()
+        return future
+    
+    def _hedged_fetch(self, text: str, voice: str, emotion: str, rate: str,
+                      output_path: Optional[str]):
+        """
+        Fetch from the primary, hedging to the fallback if it is slow.
+        
+        Each request writes to its own temporary file (or buffer, when
+        output_path is None). The first successful one is moved to
+        output_path and the other is cancelled; a cancelled streaming
+        download stops at its next chunk.
+        """
+        with self._hedge_lock:
+            self.hedge_requests += 1
+        
+        attempts = {}
+        
+        def launch(url: str, suffix: str, coalesce: bool) -> Future:
+            cancel = threading.Event()
+            path = f"{output_path}.{suffix}" if output_path is not None else None
+            future = self._start(self._cached_or_fetch, url, text, voice,
+                                 emotion, rate, path, cancel, coalesce)
+            attempts[future] = (url, path, cancel)
+            return future
+        
+        primary = launch(self.primary_url, "primary", True)
+        delay = self._hedge_delay()
+        done, _ = wait([primary], timeout=delay)
+        
+        if not done:
+            breaker = self._breaker(self.fallback_url)
+            if (breaker is None or not breaker.is_open) and self._take_hedge():
+                print(f"  🏁 Primary slower than {delay:.2f}s, hedging to fallback")
+                # With the same payload format the hedge shares the primary's
+                # cache key; waiting on its key lock would defeat the hedge
+                launch(self.fallback_url, "hedge", False)
+        
+        winner = None
+        pending = set(attempts)
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if winner is None and future.exception() is None and future.result():
+                    winner = future
+        
+        for future, (url, path, cancel) in attempts.items():
+            if future is winner:
+                continue
+            cancel.set()
+            # The loser may still finish later; drop whatever it leaves behind
+            if path is not None:
+                future.add_done_callback(
+                    lambda f, path=path: os.path.exists(path) and os.remove(path))
+        
+        if winner is None:
+            if len(attempts) == 1:
+                # Primary failed outright: fall back as generate_audio would
+                print(f"  ⚠️  Primary service failed, trying fallback...")
+                metrics.TTS_FALLBACKS.inc()
+                return self._cached_or_fetch(self.fallback_url, text, voice,
+                                             emotion, rate, output_path)
+            return None
+        
+        url, path, _ = attempts[winner]
+        if url == self.fallback_url:
+            with self._hedge_lock:
+                self.hedge_wins += 1
+            metrics.TTS_HEDGES.labels(result="fallback_won").inc()
+            print(f"  🏁 Fallback won the hedge")
+        if output_path is None:
+            return winner.result()
+        os.replace(path, output_path)
+        return output_path
+    
+    def _cached_or_fetch(self, url: str, text: str, voice: str,
+                         emotion: str, rate: str, output_path: Optional[str],
+                         cancel: Optional[threading.Event] = None,
+                         coalesce: bool = True):
+        """
+        Serve audio from the cache, synthesizing and storing it on a miss.
+        
+        Returns output_path, or the audio bytes when output_path is None;
+        None if the endpoint failed. With coalesce False the request does not
+        wait for an identical synthesis already in flight.
+        """
+        
+        if self.cache is None:
+            return self._try_service(url, text, voice, emotion, rate, output_path, cancel)
+        
+        key = self.cache.make_key(text, voice, emotion, rate,
+                                  self._payload_format(url))
+        
+        # Identical segments in flight at once wait for the first synthesis
+        with self._key_lock(key) if coalesce else contextlib.nullcontext():
+            if output_path is None:
+                cached = self.cache.read(key)
+            else:
+                cached = output_path if self.cache.get(key, output_path) else None
+            if cached is not None:
+                print(f"  💾 Cache hit ({key[:12]})")
+                return cached
+            
+            result = self._try_service(url, text, voice, emotion, rate, output_path, cancel)
+            if result is not None:
+                try:
+                    if output_path is None:
+                        self.cache.put_bytes(key, result)
+                    else:
+                        self.cache.put(key, result)
+                except OSError as e:
+                    print(f"  ⚠️  Failed to cache audio: {e}")
+            return result
     
     def generate_audio(self, text: str, voice: str = "en-US-AriaNeural",
                       emotion: str = "neutral", rate: str = "normal",
@@ -52,102 +766,451 @@ class AudioGenerator:
             Path to generated audio file or None if failed
         """
         
-        # Try primary service first
-        audio_data = self._try_service(
-            self.primary_url,
-            text, voice, emotion, rate
-        )
+        if output_path is None:
+            output_path = f"output_{int(time.time())}.mp3"
+        
+        if self._generate(text, voice, emotion, rate, output_path) is None:
+            return None
+        
+        print(f"  ✅ Audio saved to {output_path}")
+        return output_path
+    
+    def synthesize(self, text: str, voice: str = "en-US-AriaNeural",
+                   emotion: str = "neutral", rate: str = "normal") -> Optional[bytes]:
+        """
+        Generate audio like generate_audio, but return it instead of saving it.
+        
+        Returns:
+            The encoded audio as received from the TTS service, or None if failed
+        """
+        audio = self._generate(text, voice, emotion, rate, None)
+        if audio is not None:
+            print(f"  ✅ Audio received ({len(audio)} bytes)")
+        return audio
+    
+    def _generate(self, text: str, voice: str, emotion: str, rate: str,
+                  output_path: Optional[str]):
+        """Primary (hedged, if enabled) then fallback; see _cached_or_fetch."""
+        
+        if self.hedge_percentile is not None:
+            # Primary with a hedge to the fallback if it is slow
+            result = self._hedged_fetch(text, voice, emotion, rate, output_path)
+        else:
+            # Try primary service first
+            result = self._cached_or_fetch(
+                self.primary_url,
+                text, voice, emotion, rate, output_path
+            )
         
         # Fallback to secondary service if primary fails
-        if audio_data is None:
+        if result is None and self.hedge_percentile is None:
             print(f"  ⚠️  Primary service failed, trying fallback...")
-            audio_data = self._try_service(
+            metrics.TTS_FALLBACKS.inc()
+            result = self._cached_or_fetch(
                 self.fallback_url,
-                text, voice, emotion, rate
+                text, voice, emotion, rate, output_path
             )
         
-        if audio_data is None:
+        if result is None:
             print(f"  ❌ Failed to generate audio after {self.max_retries} retries")
-            return None
-        
-        # Save audio to file
-        if output_path is None:
-            output_path = f"output_{int(time.time())}.mp3"
+        return result
+    
+    def _read_response(self, response: requests.Response,
+                       cancel: Optional[threading.Event] = None) -> bytes:
+        """Read a response body into memory, aborting at the next chunk on cancel."""
+        chunks = []
+        for chunk in response.iter_content(chunk_size=self.chunk_size):
+            if cancel is not None and cancel.is_set():
+                raise RequestCancelled()
+            chunks.append(chunk)
+        return b"".join(chunks)
+    
+    def _write_response(self, response: requests.Response, output_path: str,
+                        cancel: Optional[threading.Event] = None):
+        """
+        Write a response body to output_path.
         
+        The body is written chunk by chunk to a temporary file and moved into
+        place once complete, so a streamed download never leaves a truncated
+        file behind and never holds the whole clip in memory. Setting cancel
+        aborts the download at the next chunk.
+        """
+        tmp_path = f"{output_path}.part"
         try:
-            with open(output_path, 'wb') as f:
-                f.write(audio_data)
-            print(f"  ✅ Audio saved to {output_path}")
-            return output_path
-        except Exception as e:
-            print(f"  ❌ Failed to save audio: {e}")
-            return None
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if cancel is not None and cancel.is_set():
+                        raise RequestCancelled()
+                    f.write(chunk)
+            os.replace(tmp_path, output_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
     
     def _try_service(self, url: str, text: str, voice: str,
-                     emotion: str, rate: str) -> Optional[bytes]:
-        """Try to generate audio from a specific service."""
+                     emotion: str, rate: str, output_path: Optional[str],
+                     cancel: Optional[threading.Event] = None):
+        """
+        Try to generate audio from a specific service into output_path.
+        
+        With output_path None the audio is returned as bytes instead.
+        """
         
+        breaker = self._breaker(url)
         for attempt in range(self.max_retries):
+            # Status is printed as one line so concurrent segments don't interleave
+            attempt_label = f"  🔄 Attempt {attempt + 1}/{self.max_retries}..."
+            if cancel is not None and cancel.is_set():
+                return None
+            if breaker is not None and not breaker.allow():
+                print(f"  ⛔ Circuit open for {url}, skipping")
+                return None
+            if attempt > 0:
+                metrics.TTS_RETRIES.labels(endpoint=url).inc()
+            failed = True
+            outcome = "error"
+            started = time.monotonic()
             try:
-                print(f"  🔄 Attempt {attempt + 1}/{self.max_retries}...", end=" ")
-                
-                if "edge-tts" in url or "localhost:8880" in url:
-                    # Edge TTS API format
-                    payload = {
-                        "text": text,
-                        "lang": "en-US",
-                        "emotion": emotion,
-                        "rate": rate
-                    }
-                else:
-                    # Orpheus TTS API format
-                    payload = {
-                        "input": text,
-                        "model": "orpheus",
-                        "voice": voice,
-                        "response_format": "wav",
-                        "speed": 1.0
-                    }
-                
-                response = requests.post(
-                    url,
-                    json=payload,
-                    timeout=self.timeout
-                )
+                payload_format = self._payload_format(url)
+                payload = self._build_payload(payload_format, text, voice, emotion, rate)
+                params = None
+                if payload_format == "edge" and self.stream:
+                    params = {"stream": "true"}
                 
-                if response.status_code == 200:
-                    print("✅ Success")
-                    return response.content
-                else:
-                    print(f"❌ Status {response.status_code}")
+                with self._limiter(url).permit() as permit, \
+                        metrics.TTS_IN_FLIGHT.labels(endpoint=url).track_inprogress():
+                    started = time.monotonic()
+                    response = self._session(url).post(
+                        url,
+                        json=payload,
+                        params=params,
+                        timeout=self.timeout,
+                        stream=self.stream
+                    )
                     
+                    with response:
+                        if response.status_code == 200:
+                            if output_path is None:
+                                result = self._read_response(response, cancel)
+                                size = len(result)
+                            else:
+                                self._write_response(response, output_path, cancel)
+                                result = output_path
+                                size = os.path.getsize(output_path)
+                            permit.outcome = True
+                            elapsed = time.monotonic() - started
+                            self._record_latency(url, elapsed)
+                            metrics.TTS_REQUEST_SECONDS.labels(
+                                endpoint=url, attempt=str(attempt + 1), outcome="success"
+                            ).observe(elapsed)
+                            metrics.TTS_BYTES.labels(endpoint=url).inc(size)
+                            if breaker is not None:
+                                breaker.record_success()
+                            print(f"{attempt_label} ✅ Success")
+                            return result
+                        else:
+                            # Client errors mean the endpoint is up but rejected this request
+                            failed = response.status_code >= 500 or response.status_code == 429
+                            permit.outcome = False if failed else None
+                            outcome = f"status_{response.status_code}"
+                            print(f"{attempt_label} ❌ Status {response.status_code}")
+                    
+            except RequestCancelled:
+                # The other side of a hedge won; not a failure of this endpoint.
+                # It took at least this long, so keep it as a latency sample
+                # or the hedge deadline only ever sees the fast requests.
+                elapsed = time.monotonic() - started
+                self._record_latency(url, elapsed)
+                metrics.TTS_REQUEST_SECONDS.labels(
+                    endpoint=url, attempt=str(attempt + 1), outcome="cancelled"
+                ).observe(elapsed)
+                if breaker is not None:
+                    breaker.release()
+                return None
             except requests.exceptions.Timeout:
-                print("❌ Timeout")
+                outcome = "timeout"
+                print(f"{attempt_label} ❌ Timeout")
             except requests.exceptions.ConnectionError:
-                print("❌ Connection Error")
+                outcome = "connection_error"
+                print(f"{attempt_label} ❌ Connection Error")
             except Exception as e:
-                print(f"❌ Error: {str(e)}")
+                print(f"{attempt_label} ❌ Error: {str(e)}")
+            
+            metrics.TTS_REQUEST_SECONDS.labels(
+                endpoint=url, attempt=str(attempt + 1), outcome=outcome
+            ).observe(time.monotonic() - started)
+            
+            if breaker is not None:
+                if failed:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if breaker.is_open:
+                    # Stop burning retries on an endpoint that is down
+                    print(f"  ⛔ Circuit opened for {url}")
+                    return None
             
             if attempt < self.max_retries - 1:
-                wait_time = 2 ** attempt  # Exponential backoff
-                time.sleep(wait_time)
+                wait_time = self.retry_backoff * 2 ** attempt  # Exponential backoff
+                if cancel is not None:
+                    cancel.wait(wait_time)
+                else:
+                    time.sleep(wait_time)
         
         return None
+    
+    def generate_batch(self, items: List[Dict],
+                       output_paths: Optional[List[str]] = None) -> List:
+        """
+        Generate several clips with one request to the batch endpoint.
+        
+        Cached items are served locally; anything the batch fails to
+        produce falls back to generate_audio with its usual retries.
+        
+        Args:
+            items: Dicts with text and optional voice, emotion and rate
+            output_paths: Where to save each clip, parallel to items;
+                None to return the audio bytes instead
+            
+        Returns:
+            Path (or bytes) for each generated clip, or None for items that failed
+        """
+        in_memory = output_paths is None
+        if in_memory:
+            output_paths = [None] * len(items)
+        items = [{
+            "text": item['text'],
+            "voice": item.get('voice', 'en-US-AriaNeural'),
+            "emotion": item.get('emotion', 'neutral'),
+            "rate": item.get('rate', 'normal'),
+        } for item in items]
+        results: List = [None] * len(items)
+        
+        # The batch endpoint speaks the Edge payload format
+        keys = [None] * len(items)
+        if self.cache is not None:
+            for i, (item, path) in enumerate(zip(items, output_paths)):
+                keys[i] = self.cache.make_key(item['text'], item['voice'],
+                                              item['emotion'], item['rate'], "edge")
+                if in_memory:
+                    results[i] = self.cache.read(keys[i])
+                elif self.cache.get(keys[i], path):
+                    results[i] = path
+                if results[i] is not None:
+                    print(f"  💾 Cache hit ({keys[i][:12]})")
+        
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending and self.batch_url:
+            received = self._try_batch(
+                [items[i] for i in pending],
+                [output_paths[i] for i in pending]
+            )
+            for i, result in zip(pending, received):
+                if result is None:
+                    continue
+                results[i] = result
+                if in_memory:
+                    print(f"  ✅ Audio received ({len(result)} bytes)")
+                else:
+                    print(f"  ✅ Audio saved to {result}")
+                if self.cache is not None:
+                    try:
+                        if in_memory:
+                            self.cache.put_bytes(keys[i], result)
+                        else:
+                            self.cache.put(keys[i], result)
+                    except OSError as e:
+                        print(f"  ⚠️  Failed to cache audio: {e}")
+        
+        for i, result in enumerate(results):
+            if result is None:
+                if in_memory:
+                    results[i] = self.synthesize(**items[i])
+                else:
+                    results[i] = self.generate_audio(output_path=output_paths[i], **items[i])
+        
+        return results
+    
+    def _try_batch(self, items: List[Dict],
+                   output_paths: List[Optional[str]]) -> List:
+        """
+        Send one request to the batch endpoint and save each returned clip.
+        
+        The response is a sequence of length-prefixed frames in request
+        order: a 1-byte status (0 = audio, 1 = error message), a 4-byte
+        big-endian length, then the payload. Clips whose output path is
+        None are returned as bytes.
+        """
+        results: List = [None] * len(items)
+        payload = {
+            "items": [self._build_payload("edge", **item) for item in items]
+        }
+        frame_header = struct.Struct(">BI")
+        label = f"  📦 Batch of {len(items)}..."
+        breaker = self._breaker(self.batch_url)
+        if breaker is not None and not breaker.allow():
+            print(f"{label} ⛔ Circuit open, skipping")
+            return results
+        failed = True
+        outcome = "error"
+        started = time.monotonic()
+        
+        try:
+            with self._limiter(self.batch_url).permit() as permit, \
+                    metrics.TTS_IN_FLIGHT.labels(endpoint=self.batch_url).track_inprogress():
+                started = time.monotonic()
+                response = self._session(self.batch_url).post(
+                    self.batch_url,
+                    json=payload,
+                    timeout=self.timeout,
+                    stream=True
+                )
+                
+                with response:
+                    if response.status_code != 200:
+                        failed = response.status_code >= 500 or response.status_code == 429
+                        permit.outcome = False if failed else None
+                        outcome = f"status_{response.status_code}"
+                        print(f"{label} ❌ Status {response.status_code}")
+                        return results
+                    failed = False
+                    outcome = "success"
+                    permit.outcome = True
+                    
+                    for i, output_path in enumerate(output_paths):
+                        status, length = frame_header.unpack(
+                            self._read_exact(response.raw, frame_header.size))
+                        if status != 0:
+                            error = self._read_exact(response.raw, length)
+                            print(f"  ❌ Batch item {i + 1} failed: {error.decode('utf-8', 'replace')}")
+                            continue
+                        
+                        if output_path is None:
+                            results[i] = self._read_exact(response.raw, length)
+                            metrics.TTS_BYTES.labels(endpoint=self.batch_url).inc(length)
+                            continue
+                        
+                        tmp_path = f"{output_path}.part"
+                        try:
+                            with open(tmp_path, 'wb') as f:
+                                remaining = length
+                                while remaining:
+                                    chunk = self._read_exact(response.raw, min(remaining, self.chunk_size))
+                                    f.write(chunk)
+                                    remaining -= len(chunk)
+                            os.replace(tmp_path, output_path)
+                        finally:
+                            # A frame cut short must not leave a partial file behind
+                            if os.path.exists(tmp_path):
+                                os.remove(tmp_path)
+                        metrics.TTS_BYTES.labels(endpoint=self.batch_url).inc(length)
+                        results[i] = output_path
+            
+            print(f"{label} ✅ {sum(r is not None for r in results)}/{len(items)} succeeded")
+            
+        except requests.exceptions.Timeout:
+            outcome = "timeout"
+            print(f"{label} ❌ Timeout")
+        except requests.exceptions.ConnectionError:
+            outcome = "connection_error"
+            print(f"{label} ❌ Connection Error")
+        except Exception as e:
+            print(f"{label} ❌ Error: {str(e)}")
+        finally:
+            metrics.TTS_REQUEST_SECONDS.labels(
+                endpoint=self.batch_url, attempt="batch", outcome=outcome
+            ).observe(time.monotonic() - started)
+            if breaker is not None:
+                if failed:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+        
+        return results
+    
+    @staticmethod
+    def _read_exact(stream, size: int) -> bytes:
+        """Read exactly size bytes from a raw response stream."""
+        data = b""
+        while len(data) < size:
+            chunk = stream.read(size - len(data))
+            if not chunk:
+                raise IOError("Batch response ended early")
+            data += chunk
+        return data
 
 
 class AudioMerger:
     """Merge multiple audio files into a single output."""
     
+    ENGINES = ("pydub", "pcm", "ffmpeg")
+    
+    # Target-independent loudnorm measurements (safe to cache per file)
+    LOUDNESS_STATS = ("input_i", "input_tp", "input_lra", "input_thresh")
+    
     def __init__(self, output_format: str = "mp3",
                  bitrate: str = "192k",
-                 sample_rate: int = 44100):
+                 sample_rate: int = 44100,
+                 channels: int = 2,
+                 engine: str = "pydub",
+                 on_progress: Optional[Callable[[int, int], None]] = None):
+        """
+        Initialize the merger.
+        
+        Args:
+            output_format: Output container/codec passed to FFmpeg
+            bitrate: Output bitrate
+            sample_rate: Output sample rate in Hz
+            channels: Output channel count
+            engine: "pydub" (AudioSegment.append), "pcm" (single-pass
+                NumPy mix into a preallocated buffer, requires numpy) or
+                "ffmpeg" (one streaming FFmpeg filtergraph, constant memory)
+            on_progress: Optional callback receiving (inputs done, total inputs)
+        """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown merge engine: {engine}")
+        if engine == "pcm" and np is None:
+            print("⚠️  WARNING: numpy not installed, falling back to the pydub merge engine")
+            engine = "pydub"
+        
         self.output_format = output_format
         self.bitrate = bitrate
         self.sample_rate = sample_rate
+        self.channels = channels
+        self.engine = engine
+        self.on_progress = on_progress
+    
+    def _report_progress(self, done: int, total: int):
+        if self.on_progress is not None:
+            self.on_progress(done, total)
+    
+    def _record_output(self, output_path: str):
+        metrics.MERGE_BYTES_WRITTEN.labels(engine=self.engine).inc(os.path.getsize(output_path))
+    
+    def probe_duration(self, path: str) -> Optional[float]:
+        """Return the duration of an audio file in seconds using ffprobe."""
+        try:
+            result = subprocess.run(
+                ["ffprobe", "-v", "error",
+                 "-show_entries", "format=duration",
+                 "-of", "default=noprint_wrappers=1:nokey=1",
+                 path],
+                capture_output=True, text=True
+            )
+            return float(result.stdout.strip())
+        except (FileNotFoundError, ValueError):
+            return None
+    
+    @staticmethod
+    def loudnorm_filter(target_loudness: float) -> str:
+        """Return the FFmpeg loudnorm filter for a target loudness in LUFS."""
+        return f"loudnorm=I={target_loudness}:TP=-1.5:LRA=11"
     
     def merge_audio_files(self, audio_files: List[str],
                          output_path: str = "final_merged.mp3",
-                         crossfade: float = 0.5) -> Optional[str]:
+                         crossfade: float = 0.5,
+                         loudness_target: Optional[float] = None,
+                         gains: Optional[List[float]] = None) -> Optional[str]:
         """
         Merge multiple audio files into one.
         
@@ -155,6 +1218,10 @@ class AudioMerger:
             audio_files: List of paths to audio files to merge
             output_path: Path for the output merged file
             crossfade: Crossfade duration in seconds (0 for no crossfade)
+            loudness_target: If set, loudness-normalize to this LUFS value
+                during the export instead of in a separate pass
+            gains: Optional per-file gain in dB applied while merging
+                (see loudness_gain)
             
         Returns:
             Path to merged audio file or None if failed
@@ -168,36 +1235,59 @@ class AudioMerger:
             print(f"❌ Missing files: {missing_files}")
             return None
         
+        if gains is None:
+            gains = [0.0] * len(audio_files)
+        
+        if self.engine == "pcm":
+            return self._merge_pcm(audio_files, output_path, crossfade, loudness_target, gains)
+        if self.engine == "ffmpeg":
+            return self._merge_ffmpeg(audio_files, output_path, crossfade, loudness_target, gains)
+        
         try:
             # Load the first audio file
-            combined = AudioSegment.from_file(audio_files[0])
+            with metrics.stage("pydub", "decode"):
+                combined = AudioSegment.from_file(audio_files[0])
+                if gains[0]:
+                    combined = combined.apply_gain(gains[0])
             print(f"  ✅ Loaded {audio_files[0]} ({len(combined)}ms)")
+            self._report_progress(1, len(audio_files))
             
             # Append remaining files
-            for audio_file in audio_files[1:]:
-                segment = AudioSegment.from_file(audio_file)
+            for done, (audio_file, gain) in enumerate(zip(audio_files[1:], gains[1:]), start=2):
+                with metrics.stage("pydub", "decode"):
+                    segment = AudioSegment.from_file(audio_file)
+                    if gain:
+                        segment = segment.apply_gain(gain)
                 
                 if crossfade > 0:
                     # Apply crossfade
                     crossfade_ms = int(crossfade * 1000)
-                    combined = combined.append(
-                        segment,
-                        crossfade=crossfade_ms
-                    )
+                    with metrics.stage("pydub", "crossfade"):
+                        combined = combined.append(
+                            segment,
+                            crossfade=crossfade_ms
+                        )
                     print(f"  ✅ Added {audio_file} with {crossfade}s crossfade ({len(segment)}ms)")
                 else:
                     # Simple concatenation
-                    combined = combined + segment
+                    with metrics.stage("pydub", "crossfade"):
+                        combined = combined + segment
                     print(f"  ✅ Added {audio_file} ({len(segment)}ms)")
+                self._report_progress(done, len(audio_files))
             
             # Export the merged audio
             print(f"\n💾 Exporting to {output_path}...")
-            combined.export(
-                output_path,
-                format=self.output_format,
-                bitrate=self.bitrate,
-                parameters=["-ar", str(self.sample_rate), "-ac", "2"]
-            )
+            parameters = ["-ar", str(self.sample_rate), "-ac", "2"]
+            if loudness_target is not None:
+                parameters += ["-af", self.loudnorm_filter(loudness_target)]
+            with metrics.stage("pydub", "export"):
+                combined.export(
+                    output_path,
+                    format=self.output_format,
+                    bitrate=self.bitrate,
+                    parameters=parameters
+                )
+            self._record_output(output_path)
             
             total_duration = len(combined) / 1000
             print(f"  ✅ Merged audio saved ({total_duration:.1f}s total)")
@@ -208,57 +1298,831 @@ class AudioMerger:
             print(f"  ❌ Merge failed: {e}")
             return None
     
-    def normalize_audio(self, input_path: str,
-                       output_path: str = None,
-                       target_loudness: float = -20) -> Optional[str]:
+    def _merge_pcm(self, audio_files: List[str], output_path: str,
+                   crossfade: float, loudness_target: Optional[float],
+                   gains: List[float]) -> Optional[str]:
         """
-        Normalize audio levels using FFmpeg.
+        Merge files in a single decode/mix/encode pass.
         
-        Args:
-            input_path: Path to input audio file
-            output_path: Path for normalized output (auto-generated if None)
-            target_loudness: Target loudness in LUFS
-            
-        Returns:
-            Path to normalized audio file or None if failed
+        Every input is decoded exactly once by FFmpeg straight into one
+        float32 buffer preallocated from the probed durations; crossfades
+        are mixed in place and the result is encoded once. Peak memory is
+        the output buffer plus one crossfade window, instead of the
+        repeated whole-buffer copies made by AudioSegment.append.
         """
         
-        if output_path is None:
-            base, ext = os.path.splitext(input_path)
-            output_path = f"{base}_normalized{ext}"
-        
-        print(f"\n🔊 Normalizing audio to {target_loudness} LUFS...")
+        sample_rate = self.sample_rate
+        fade_frames = int(crossfade * sample_rate)
         
         try:
-            # Use ffmpeg-normalize for proper loudness normalization
-            cmd = [
-                "ffmpeg",
-                "-i", input_path,
-                "-af", f"loudnorm=I=-20:TP=-1.5:LRA=11",
-                "-y",  # Overwrite output file
-                output_path
-            ]
+            # Size the output buffer up front; grow only if probing undershot
+            durations = [self.probe_duration(f) or 0.0 for f in audio_files]
+            estimate = int(sum(durations) * sample_rate)
+            estimate -= fade_frames * (len(audio_files) - 1)
+            buffer = np.zeros((max(estimate, 0) + sample_rate, self.channels), dtype=np.float32)
+            end = 0
+            # Frames of the previous clip not already in a crossfade
+            remainder = 0
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            for index, (audio_file, gain) in enumerate(zip(audio_files, gains)):
+                with metrics.stage("pcm", "decode"):
+                    buffer, new_end, decoded = self._decode_into(
+                        audio_file, buffer, end, fade_frames, 10 ** (gain / 20), remainder)
+                clip_ms = decoded * 1000 // sample_rate
+                if index == 0:
+                    print(f"  ✅ Loaded {audio_file} ({clip_ms}ms)")
+                elif fade_frames > 0:
+                    print(f"  ✅ Added {audio_file} with {crossfade}s crossfade ({clip_ms}ms)")
+                else:
+                    print(f"  ✅ Added {audio_file} ({clip_ms}ms)")
+                remainder = new_end - end
+                end = new_end
+                self._report_progress(index + 1, len(audio_files))
             
-            if result.returncode == 0:
-                print(f"  ✅ Audio normalized: {output_path}")
-                return output_path
-            else:
-                print(f"  ❌ Normalization failed: {result.stderr}")
-                return None
-                
-        except FileNotFoundError:
-            print("  ❌ FFmpeg not found. Install it with: brew install ffmpeg")
-            return None
-        except Exception as e:
-            print(f"  ❌ Error: {e}")
+            # Export the merged audio
+            print(f"\n💾 Exporting to {output_path}...")
+            with metrics.stage("pcm", "export"):
+                self.encode_pcm(buffer[:end], output_path, loudness_target)
+            self._record_output(output_path)
+            
+            print(f"  ✅ Merged audio saved ({end / sample_rate:.1f}s total)")
+            return output_path
+            
+        except Exception as e:
+            print(f"  ❌ Merge failed: {e}")
             return None
+    
+    def _decode_into(self, path: str, buffer: "np.ndarray", start: int,
+                     fade_frames: int, gain: float = 1.0,
+                     remainder: Optional[int] = None):
+        """
+        Decode a file into buffer, crossfading with the audio ending at start.
+        
+        The decoded audio is scaled by the linear gain factor. remainder is
+        how many frames before start were not already crossfaded (all of
+        them by default); the overlap follows crossfade_frames, so a clip
+        shorter than the fade is mixed into the last frames of the previous
+        one rather than buried inside the fade window.
+        
+        Returns:
+            Tuple of (buffer, possibly reallocated; new end frame;
+            number of frames decoded from the file)
+        """
+        frame_bytes = 4 * self.channels
+        cmd = [
+            "ffmpeg", "-v", "error", "-i", path,
+            "-f", "f32le", "-ac", str(self.channels), "-ar", str(self.sample_rate),
+            "-"
+        ]
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        
+        try:
+            # Mix the crossfade window: fade the tail out and the new head in.
+            # A head shorter than the window is the whole clip, so the fade
+            # shrinks to it and still ends at start.
+            window = min(fade_frames, start if remainder is None else remainder)
+            head_frames = 0
+            if window > 0:
+                raw = proc.stdout.read(window * frame_bytes)
+                head = np.frombuffer(raw, dtype=np.float32).reshape(-1, self.channels)
+                if gain != 1.0:
+                    head = head * gain
+                head_frames = self.crossfade_frames(fade_frames, window, len(head))
+                ramp = np.linspace(0.0, 1.0, head_frames, endpoint=False,
+                                   dtype=np.float32)[:, None]
+                region = buffer[start - head_frames:start]
+                region *= 1.0 - ramp
+                region += head * ramp
+            
+            # Everything after the crossfade is read directly into the buffer
+            byte_pos = start * frame_bytes
+            while True:
+                if byte_pos + frame_bytes > buffer.nbytes:
+                    grown = np.zeros((int(len(buffer) * 1.25) + self.sample_rate, self.channels),
+                                     dtype=np.float32)
+                    grown[:len(buffer)] = buffer
+                    buffer = grown
+                view = memoryview(buffer).cast("B")[byte_pos:]
+                read = proc.stdout.readinto(view)
+                view.release()
+                if not read:
+                    break
+                byte_pos += read
+        finally:
+            proc.stdout.close()
+            stderr = proc.stderr.read()
+            proc.stderr.close()
+            returncode = proc.wait()
+        
+        if returncode != 0:
+            raise RuntimeError(f"FFmpeg failed to decode {path}: {stderr.decode(errors='replace').strip()}")
+        
+        end = byte_pos // frame_bytes
+        if gain != 1.0:
+            buffer[start:end] *= gain
+        return buffer, end, head_frames + end - start
+    
+    def decode_pcm(self, audio: bytes) -> "np.ndarray":
+        """
+        Decode encoded audio (e.g. a TTS response body) held in memory.
+        
+        Returns:
+            Read-only float32 array of shape (frames, channels) at the
+            merger's sample rate
+        """
+        cmd = [
+            "ffmpeg", "-v", "error", "-i", "pipe:0",
+            "-f", "f32le", "-ac", str(self.channels), "-ar", str(self.sample_rate),
+            "-"
+        ]
+        result = subprocess.run(cmd, input=audio, capture_output=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"FFmpeg failed to decode audio: {result.stderr.decode(errors='replace').strip()}")
+        return np.frombuffer(result.stdout, dtype=np.float32).reshape(-1, self.channels)
+    
+    @staticmethod
+    def crossfade_frames(fade_frames: int, remainder: int, clip_frames: int) -> int:
+        """
+        Frames of a clip to crossfade with the audio before it.
+        
+        The overlap never reaches back past remainder, the frames of the
+        previous clip not already in a crossfade, nor past the clip itself,
+        so clips shorter than the fade survive. Shared by the pcm engine,
+        mix_pcm and encode_pcm_stream so all of them produce the same mix.
+        """
+        return max(0, min(fade_frames, remainder, clip_frames))
+    
+    def mix_pcm(self, clips: List["np.ndarray"], crossfade: float = 0.5,
+                gains: Optional[List[float]] = None) -> "np.ndarray":
+        """
+        Concatenate decoded clips with crossfades, like merge_audio_files.
+        
+        The output buffer is allocated once at its exact length; each
+        clip is scaled by its gain (dB) and copied in, with the crossfade
+        window (see crossfade_frames) mixed in place as in the pcm engine.
+        """
+        if gains is None:
+            gains = [0.0] * len(clips)
+        fade_frames = int(crossfade * self.sample_rate)
+        
+        # remainder: frames of the previous clip not already in a crossfade
+        total = 0
+        remainder = 0
+        for clip in clips:
+            overlap = self.crossfade_frames(fade_frames, remainder, len(clip))
+            total += len(clip) - overlap
+            remainder = len(clip) - overlap
+        buffer = np.empty((total, self.channels), dtype=np.float32)
+        
+        end = 0
+        remainder = 0
+        for clip, gain in zip(clips, gains):
+            factor = np.float32(10 ** (gain / 20))
+            overlap = self.crossfade_frames(fade_frames, remainder, len(clip))
+            remainder = len(clip) - overlap
+            if overlap > 0:
+                ramp = np.linspace(0.0, 1.0, overlap, endpoint=False, dtype=np.float32)[:, None]
+                region = buffer[end - overlap:end]
+                region *= 1.0 - ramp
+                region += clip[:overlap] * (ramp * factor)
+            tail = clip[overlap:]
+            np.multiply(tail, factor, out=buffer[end:end + len(tail)])
+            end += len(tail)
+        return buffer
+    
+    def encode_pcm_stream(self, clips: List["np.ndarray"], output_path: str,
+                          crossfade: float = 0.5,
+                          loudness_target: Optional[float] = None) -> int:
+        """
+        Crossfade clips like mix_pcm, streaming the result into one encode.
+        
+        Only the previous clip's crossfade tail is held back. Each clip is
+        removed from the clips list once it has been written, so peak
+        memory is the clips not yet written plus one crossfade window,
+        instead of the whole output twice.
+        
+        Returns:
+            Number of frames encoded
+        """
+        fade_frames = int(crossfade * self.sample_rate)
+        cmd = ["ffmpeg", "-v", "error", "-y"] + self._pcm_input()
+        if loudness_target is not None:
+            cmd += ["-af", f"{self.loudnorm_filter(loudness_target)},aresample={self.sample_rate}"]
+        cmd += ["-f", self.output_format, "-b:a", self.bitrate, output_path]
+        
+        with tempfile.TemporaryFile() as stderr:
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=stderr)
+            
+            def write(pcm: "np.ndarray") -> int:
+                if len(pcm):
+                    proc.stdin.write(memoryview(np.ascontiguousarray(pcm)).cast("B"))
+                return len(pcm)
+            
+            frames = 0
+            tail = None
+            try:
+                while clips:
+                    clip = clips.pop(0)
+                    if tail is not None:
+                        overlap = self.crossfade_frames(fade_frames, len(tail), len(clip))
+                        frames += write(tail[:len(tail) - overlap])
+                        ramp = np.linspace(0.0, 1.0, overlap, endpoint=False,
+                                           dtype=np.float32)[:, None]
+                        frames += write(tail[len(tail) - overlap:] * (1.0 - ramp) + clip[:overlap] * ramp)
+                        clip = clip[overlap:]
+                    keep = min(fade_frames, len(clip)) if clips else 0
+                    frames += write(clip[:len(clip) - keep])
+                    tail = clip[len(clip) - keep:].copy() if keep else None
+                    del clip
+                if tail is not None:
+                    frames += write(tail)
+            except BrokenPipeError:
+                pass
+            finally:
+                proc.stdin.close()
+                returncode = proc.wait()
+            
+            if returncode != 0:
+                stderr.seek(0)
+                raise RuntimeError(f"FFmpeg failed to encode {output_path}: "
+                                   f"{stderr.read().decode(errors='replace').strip()}")
+        return frames
+    
+    def _pcm_input(self) -> List[str]:
+        """FFmpeg input arguments for float32 PCM on stdin."""
+        return ["-f", "f32le", "-ac", str(self.channels), "-ar", str(self.sample_rate), "-i", "-"]
+    
+    def encode_pcm(self, pcm: "np.ndarray", output_path: str,
+                   loudness_target: Optional[float] = None):
+        """Encode a float32 PCM buffer to output_path in one FFmpeg pass."""
+        cmd = ["ffmpeg", "-v", "error", "-y"] + self._pcm_input()
+        if loudness_target is not None:
+            cmd += ["-af", f"{self.loudnorm_filter(loudness_target)},aresample={self.sample_rate}"]
+        cmd += [
+            "-f", self.output_format, "-b:a", self.bitrate,
+            output_path
+        ]
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        _, stderr = proc.communicate(memoryview(np.ascontiguousarray(pcm)).cast("B"))
+        if proc.returncode != 0:
+            raise RuntimeError(f"FFmpeg failed to encode {output_path}: {stderr.decode(errors='replace').strip()}")
+    
+    def build_filtergraph(self, input_count: int, crossfade: float,
+                          loudness_target: Optional[float] = None,
+                          gains: Optional[List[float]] = None) -> str:
+        """
+        Build an FFmpeg filtergraph that merges input_count inputs into [out].
+        
+        Inputs are conformed to the output sample rate and layout (and
+        scaled by their gain in dB, if any), then chained through acrossfade
+        (or joined with concat when there is no crossfade); loudnorm is
+        optionally appended to the same graph.
+        """
+        layout = "stereo" if self.channels == 2 else "mono"
+        gains = gains or [0.0] * input_count
+        filters = [
+            f"[{i}:a]aformat=sample_fmts=fltp:sample_rates={self.sample_rate}"
+            f":channel_layouts={layout}"
+            + (f",volume={gains[i]:.2f}dB" if gains[i] else "")
+            + f"[a{i}]"
+            for i in range(input_count)
+        ]
+        
+        if input_count == 1:
+            filters.append("[a0]anull[mix]")
+        elif crossfade > 0:
+            previous = "a0"
+            for i in range(1, input_count):
+                label = "mix" if i == input_count - 1 else f"x{i}"
+                filters.append(f"[{previous}][a{i}]acrossfade=d={crossfade}:c1=tri:c2=tri[{label}]")
+                previous = label
+        else:
+            inputs = "".join(f"[a{i}]" for i in range(input_count))
+            filters.append(f"{inputs}concat=n={input_count}:v=0:a=1[mix]")
+        
+        if loudness_target is not None:
+            # loudnorm upsamples internally; resample back to the output rate
+            filters.append(f"[mix]{self.loudnorm_filter(loudness_target)},"
+                           f"aresample={self.sample_rate}[out]")
+        else:
+            filters.append("[mix]anull[out]")
+        
+        return ";".join(filters)
+    
+    def _merge_ffmpeg(self, audio_files: List[str], output_path: str,
+                      crossfade: float, loudness_target: Optional[float],
+                      gains: List[float]) -> Optional[str]:
+        """
+        Merge files with a single FFmpeg process.
+        
+        The whole merge (and optional loudness normalization) runs as one
+        filtergraph that streams from the inputs to the output file, so
+        Python memory stays constant regardless of song length.
+        """
+        
+        cmd = ["ffmpeg", "-v", "error", "-y"]
+        for audio_file in audio_files:
+            cmd += ["-i", audio_file]
+        cmd += [
+            "-filter_complex", self.build_filtergraph(len(audio_files), crossfade,
+                                                      loudness_target, gains),
+            "-map", "[out]",
+            "-ar", str(self.sample_rate), "-ac", str(self.channels),
+            "-f", self.output_format, "-b:a", self.bitrate,
+            output_path
+        ]
+        
+        for audio_file in audio_files:
+            print(f"  ✅ Queued {audio_file}")
+        print(f"\n💾 Streaming merge to {output_path}...")
+        
+        try:
+            with metrics.stage("ffmpeg", "filtergraph"):
+                result = subprocess.run(cmd, capture_output=True, text=True)
+        except FileNotFoundError:
+            print("  ❌ FFmpeg not found. Install it with: brew install ffmpeg")
+            return None
+        
+        if result.returncode != 0:
+            print(f"  ❌ Merge failed: {result.stderr.strip()}")
+            return None
+        
+        self._record_output(output_path)
+        self._report_progress(len(audio_files), len(audio_files))
+        total_duration = self.probe_duration(output_path)
+        if total_duration is not None:
+            print(f"  ✅ Merged audio saved ({total_duration:.1f}s total)")
+        else:
+            print("  ✅ Merged audio saved")
+        return output_path
+    
+    def measure_loudness(self, path: str,
+                         target_loudness: float = -20) -> Optional[Dict]:
+        """
+        Measure integrated loudness and true peak with FFmpeg's loudnorm.
+        
+        The measured input stats do not depend on target_loudness, so they
+        can be reused to normalize to any target.
+        
+        Returns:
+            Dict with input_i, input_tp, input_lra and input_thresh, or
+            None if the analysis failed
+        """
+        with metrics.stage(self.engine, "analyze"):
+            return self._loudnorm_report(["-i", path], target_loudness)
+    
+    def measure_pcm_loudness(self, pcm: "np.ndarray",
+                             target_loudness: float = -20) -> Optional[Dict]:
+        """Like measure_loudness, for a float32 buffer from decode_pcm or mix_pcm."""
+        return self._loudnorm_report(self._pcm_input(), target_loudness,
+                                     memoryview(np.ascontiguousarray(pcm)).cast("B"))
+    
+    def _loudnorm_report(self, input_args: List[str], target_loudness: float,
+                         data=None) -> Optional[Dict]:
+        """Run a loudnorm analysis pass and parse its report."""
+        cmd = ["ffmpeg", "-hide_banner", "-nostats"] + input_args + [
+            "-af", f"{self.loudnorm_filter(target_loudness)}:print_format=json",
+            "-f", "null", "-"
+        ]
+        try:
+            result = subprocess.run(cmd, input=data, capture_output=True)
+        except FileNotFoundError:
+            return None
+        
+        # loudnorm prints its JSON report as the last block on stderr
+        stderr = result.stderr.decode("utf-8", "replace")
+        report_start = stderr.rfind("{")
+        if result.returncode != 0 or report_start < 0:
+            return None
+        try:
+            report = json.loads(stderr[report_start:stderr.rfind("}") + 1])
+            return {name: float(report[name]) for name in self.LOUDNESS_STATS}
+        except (ValueError, KeyError):
+            return None
+    
+    def analyze_loudness(self, path: str) -> Optional[Dict]:
+        """
+        Return loudness stats for a file, measuring it at most once.
+        
+        Stats are stored in a "<path>.loudness.json" sidecar together with
+        the file's content hash, so a segment restored unchanged from the
+        TTS cache on a later run is never re-measured.
+        """
+        sidecar = f"{path}.loudness.json"
+        digest = BuildManifest.hash_file(path)
+        
+        try:
+            with open(sidecar, 'r') as f:
+                stored = json.load(f)
+            if stored.get("sha256") == digest:
+                return {name: stored["loudness"][name] for name in self.LOUDNESS_STATS}
+        except (OSError, ValueError, KeyError):
+            pass
+        
+        stats = self.measure_loudness(path)
+        if stats is None:
+            return None
+        
+        with open(sidecar, 'w') as f:
+            json.dump({"sha256": digest, "loudness": stats}, f)
+        return stats
+    
+    @staticmethod
+    def loudness_gain(stats: Optional[Dict], target_loudness: float,
+                      true_peak_limit: float = -1.5) -> float:
+        """
+        Linear-normalization gain in dB that brings a clip to the target.
+        
+        The gain is capped so the measured true peak stays below the limit;
+        silent or unmeasured clips get no gain.
+        """
+        if not stats or stats["input_i"] == float("-inf") or stats["input_i"] < -70:
+            return 0.0
+        gain = target_loudness - stats["input_i"]
+        return min(gain, true_peak_limit - stats["input_tp"])
+    
+    def normalize_audio(self, input_path: str,
+                       output_path: str = None,
+                       target_loudness: float = -20) -> Optional[str]:
+        """
+        Normalize audio levels using two-pass FFmpeg loudnorm.
+        
+        The first pass measures the file (reusing cached stats when
+        available); the second applies loudnorm with the measured values
+        in linear mode, which is more accurate than single-pass loudnorm.
+        
+        Args:
+            input_path: Path to input audio file
+            output_path: Path for normalized output (auto-generated if None)
+            target_loudness: Target loudness in LUFS
+            
+        Returns:
+            Path to normalized audio file or None if failed
+        """
+        
+        if output_path is None:
+            base, ext = os.path.splitext(input_path)
+            output_path = f"{base}_normalized{ext}"
+        
+        print(f"\n🔊 Normalizing audio to {target_loudness} LUFS...")
+        
+        try:
+            audio_filter = self.loudnorm_filter(target_loudness)
+            stats = self.analyze_loudness(input_path)
+            if stats is not None:
+                audio_filter += (
+                    f":measured_I={stats['input_i']}:measured_TP={stats['input_tp']}"
+                    f":measured_LRA={stats['input_lra']}:measured_thresh={stats['input_thresh']}"
+                    f":linear=true"
+                )
+            
+            cmd = [
+                "ffmpeg",
+                "-i", input_path,
+                "-af", f"{audio_filter},aresample={self.sample_rate}",
+                "-y",  # Overwrite output file
+                output_path
+            ]
+            
+            with metrics.stage(self.engine, "normalize"):
+                result = subprocess.run(cmd, capture_output=True, text=True)
+            
+            if result.returncode == 0:
+                self._record_output(output_path)
+                print(f"  ✅ Audio normalized: {output_path}")
+                return output_path
+            else:
+                print(f"  ❌ Normalization failed: {result.stderr}")
+                return None
+                
+        except FileNotFoundError:
+            print("  ❌ FFmpeg not found. Install it with: brew install ffmpeg")
+            return None
+        except Exception as e:
+            print(f"  ❌ Error: {e}")
+            return None
+
+
+def run_merge_job(job_id: str, files: list, output_path: str, crossfade: float,
+                  progress, merger_settings: dict) -> dict:
+    """
+    Merge audio files inside a worker process (n8n_api_server's merge pool).
+    
+    Args:
+        job_id: Merge job identifier (key into the shared progress dict)
+        files: Audio file paths to merge
+        output_path: Destination file path
+        crossfade: Crossfade duration between files (seconds)
+        progress: Shared dict receiving (done, total) per job
+        merger_settings: Keyword arguments for AudioMerger
+        
+    Returns:
+        Output path, size in bytes and duration in seconds
+    """
+    def on_progress(done: int, total: int):
+        progress[job_id] = (done, total)
+    
+    merger = AudioMerger(on_progress=on_progress, **merger_settings)
+    result = merger.merge_audio_files(files, output_path, crossfade=crossfade)
+    if not result:
+        raise RuntimeError(f"Merge failed for {output_path}")
+    
+    return {
+        "output": result,
+        "size": os.path.getsize(result),
+        "duration": merger.probe_duration(result)
+    }
+
+
+class BuildManifest:
+    """
+    Record of every build output and the inputs it was built from.
+    
+    Each node (segment, part or final file) is keyed by its output path
+    and stores a hash of its inputs plus the output's own content hash.
+    A node is clean when its input hash is unchanged and its output file
+    is still the one that was recorded, so only dirty nodes of the
+    segment -> part -> final graph need rebuilding. Loudness measurements
+    are kept by audio content hash, so a segment whose audio did not
+    change is never measured again, even when its part is rebuilt.
+    """
+    
+    MAX_LOUDNESS_ENTRIES = 10000
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.nodes: Dict[str, Dict] = data.get("nodes", {})
+        self.measurements: "OrderedDict[str, Dict]" = OrderedDict(data.get("loudness", {}))
+    
+    @staticmethod
+    def hash_inputs(*inputs) -> str:
+        """Hash any JSON-serializable description of a node's inputs."""
+        material = json.dumps(inputs, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def hash_file(path: str) -> str:
+        """sha256 of a file's contents."""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def _unchanged(self, entry: Dict, output_path: str) -> bool:
+        try:
+            stat = os.stat(output_path)
+        except OSError:
+            return False
+        return stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]
+    
+    def is_clean(self, output_path: str, input_hash: str) -> bool:
+        """Return True if output_path was built from input_hash and not touched since."""
+        with self._lock:
+            entry = self.nodes.get(output_path)
+        return (entry is not None
+                and entry["inputs"] == input_hash
+                and self._unchanged(entry, output_path))
+    
+    def output_hash(self, output_path: str) -> str:
+        """Content hash of an output, reusing the recorded one when the file is unchanged."""
+        with self._lock:
+            entry = self.nodes.get(output_path)
+        if entry is not None and self._unchanged(entry, output_path):
+            return entry["sha256"]
+        return self.hash_file(output_path)
+    
+    def record(self, output_path: str, input_hash: str):
+        """Record that output_path was just built from input_hash."""
+        stat = os.stat(output_path)
+        entry = {
+            "inputs": input_hash,
+            "sha256": self.hash_file(output_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "built_at": time.time(),
+        }
+        with self._lock:
+            self.nodes[output_path] = entry
+    
+    def loudness(self, content_hash: str) -> Optional[Dict]:
+        """Return the loudness stats recorded for audio with this content hash."""
+        with self._lock:
+            stats = self.measurements.get(content_hash)
+            if stats is not None:
+                self.measurements.move_to_end(content_hash)
+            return stats
+    
+    def record_loudness(self, content_hash: str, stats: Dict):
+        """Record loudness stats measured for audio with this content hash."""
+        with self._lock:
+            self.measurements[content_hash] = stats
+            self.measurements.move_to_end(content_hash)
+            while len(self.measurements) > self.MAX_LOUDNESS_ENTRIES:
+                self.measurements.popitem(last=False)
+    
+    def save(self):
+        """Write the manifest atomically."""
+        with self._lock:
+            # Not sort_keys: measurements are stored least recently used first
+            data = json.dumps({"nodes": dict(sorted(self.nodes.items())),
+                               "loudness": self.measurements}, indent=2)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+
+class TaskGraph:
+    """
+    Dependency-graph executor for the segment -> part -> final build.
+    
+    Each task runs as soon as every task it depends on has finished, on
+    one of two thread pools: "io" for network-bound work (TTS requests)
+    and "cpu" for decoding, mixing and encoding. Merging an early part
+    therefore overlaps with synthesis of later ones.
+    
+    A task is called with its dependencies' results as positional
+    arguments. A task that raises yields None and its dependents still
+    run, the same way a failed segment is skipped by the phased
+    pipeline. A result is released once every dependent has run, so
+    decoded audio does not outlive the part that mixes it.
+    """
+    
+    POOLS = ("io", "cpu")
+    
+    def __init__(self, io_workers: int = 8, cpu_workers: int = 2):
+        """
+        Args:
+            io_workers: Threads for "io" tasks
+            cpu_workers: Threads for "cpu" tasks (their heavy lifting
+                happens in FFmpeg and NumPy, outside the GIL)
+        """
+        self.workers = {"io": max(1, io_workers), "cpu": max(1, cpu_workers)}
+        self.tasks: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._started = self._finished = None
+    
+    def add(self, name: str, fn: Callable, deps: List[str] = (), pool: str = "cpu") -> str:
+        """
+        Add a task. Dependencies must already be in the graph, which keeps it acyclic.
+        
+        Returns:
+            The task name, for use in later deps lists
+        """
+        if pool not in self.POOLS:
+            raise ValueError(f"Unknown pool: {pool}")
+        if name in self.tasks:
+            raise ValueError(f"Duplicate task: {name}")
+        for dep in deps:
+            if dep not in self.tasks:
+                raise ValueError(f"Unknown dependency of {name}: {dep}")
+            self.tasks[dep]["dependents"].append(name)
+        self.tasks[name] = {
+            "fn": fn, "deps": list(deps), "pool": pool, "dependents": [],
+            "result": None, "failed": False,
+            "ready": None, "started": None, "finished": None,
+        }
+        return name
+    
+    def run(self) -> Dict[str, object]:
+        """
+        Run every task.
+        
+        Returns:
+            Results of the tasks nothing depends on, by name
+        """
+        waiting = {name: len(task["deps"]) for name, task in self.tasks.items()}
+        consumers = {name: len(task["dependents"]) for name, task in self.tasks.items()}
+        remaining = [len(self.tasks)]
+        done = threading.Event()
+        pools = {
+            pool: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"graph-{pool}")
+            for pool, workers in self.workers.items()
+        }
+        # KeyboardInterrupt/SystemExit raised by tasks, re-raised once the graph settles
+        errors = []
+        
+        def submit(name: str):
+            task = self.tasks[name]
+            task["ready"] = time.monotonic()
+            pools[task["pool"]].submit(execute, name)
+        
+        def execute(name: str):
+            task = self.tasks[name]
+            task["started"] = time.monotonic()
+            try:
+                task["result"] = task["fn"](*(self.tasks[dep]["result"] for dep in task["deps"]))
+            except BaseException as e:
+                task["failed"] = True
+                print(f"  ❌ Task {name} failed: {e!r}")
+                if not isinstance(e, Exception):
+                    errors.append(e)
+            finally:
+                # Always settle the counters, or run() would wait forever
+                task["finished"] = time.monotonic()
+                ready = []
+                with self._lock:
+                    for dep in task["deps"]:
+                        consumers[dep] -= 1
+                        if consumers[dep] == 0:
+                            self.tasks[dep]["result"] = None
+                    for dependent in task["dependents"]:
+                        waiting[dependent] -= 1
+                        if waiting[dependent] == 0:
+                            ready.append(dependent)
+                    remaining[0] -= 1
+                    if remaining[0] == 0:
+                        done.set()
+                for dependent in ready:
+                    submit(dependent)
+        
+        self._started = time.monotonic()
+        try:
+            roots = [name for name, count in waiting.items() if count == 0]
+            for name in roots:
+                submit(name)
+            if self.tasks:
+                done.wait()
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True)
+        self._finished = time.monotonic()
+        if errors:
+            raise errors[0]
+        
+        return {name: task["result"] for name, task in self.tasks.items() if not task["dependents"]}
+    
+    def critical_path(self) -> List[str]:
+        """
+        The chain of tasks that determined the run's wall time.
+        
+        Walks back from the task that finished last, each time through
+        the dependency that finished last (the one it was waiting for).
+        """
+        if not self.tasks:
+            return []
+        name = max(self.tasks, key=lambda n: self.tasks[n]["finished"])
+        path = [name]
+        while self.tasks[name]["deps"]:
+            name = max(self.tasks[name]["deps"], key=lambda n: self.tasks[n]["finished"])
+            path.append(name)
+        return path[::-1]
+    
+    def report(self) -> Dict:
+        """
+        Timing report of the last run.
+        
+        Every task gets its start offset, run time and queue time (ready
+        but waiting for a pool thread). The critical path shows where
+        the wall time went: queue time on it means its pool was too
+        small; run time is the floor no amount of parallelism removes.
+        """
+        wall = self._finished - self._started
+        
+        def timing(name: str) -> Dict:
+            task = self.tasks[name]
+            return {
+                "task": name,
+                "pool": task["pool"],
+                "start_s": round(task["started"] - self._started, 3),
+                "run_s": round(task["finished"] - task["started"], 3),
+                "queued_s": round(task["started"] - task["ready"], 3),
+                "failed": task["failed"],
+            }
+        
+        tasks = [timing(name) for name in self.tasks]
+        path = [timing(name) for name in self.critical_path()]
+        pools = {}
+        for pool, workers in self.workers.items():
+            busy = sum(t["run_s"] for t in tasks if t["pool"] == pool)
+            pools[pool] = {
+                "workers": workers,
+                "tasks": sum(1 for t in tasks if t["pool"] == pool),
+                "busy_s": round(busy, 3),
+                "utilization": round(busy / (wall * workers), 3) if wall > 0 else 0.0,
+            }
+        return {
+            "wall_s": round(wall, 3),
+            "critical_path": path,
+            "critical_path_run_s": round(sum(t["run_s"] for t in path), 3),
+            "critical_path_queued_s": round(sum(t["queued_s"] for t in path), 3),
+            "pools": pools,
+            "tasks": tasks,
+        }
 
 
 class SongProducer:
     """Complete song production pipeline."""
     
+    PIPELINES = ("files", "memory")
+    
     def __init__(self, config_path: str):
         """
         Initialize producer with configuration.
@@ -269,82 +2133,388 @@ class SongProducer:
         with open(config_path, 'r') as f:
             self.config = json.load(f)
         
+        tts_config = self.config['ttsApiConfiguration']
+        concurrency = tts_config.get('concurrency', {})
+        self.concurrent = concurrency.get('enabled', False)
+        self.max_workers = concurrency.get('maxWorkers', 8)
+        
         self.generator = AudioGenerator(
-            primary_url=self.config['ttsApiConfiguration']['endpoint'],
-            fallback_url=self.config['ttsApiConfiguration']['fallbackEndpoint'],
-            timeout=self.config['ttsApiConfiguration']['timeout'],
-            max_retries=self.config['ttsApiConfiguration']['maxRetries']
+            primary_url=tts_config['endpoint'],
+            fallback_url=tts_config['fallbackEndpoint'],
+            timeout=tts_config['timeout'],
+            max_retries=tts_config['maxRetries'],
+            max_in_flight=concurrency.get('maxInFlightPerEndpoint', 4),
+            cache=self._build_cache(tts_config.get('cache', {})),
+            stream=tts_config.get('streaming', False),
+            batch_url=tts_config.get('batchEndpoint'),
+            payload_formats={
+                url: payload_format
+                for url, payload_format in (
+                    (tts_config['endpoint'], tts_config.get('payloadFormat')),
+                    (tts_config['fallbackEndpoint'], tts_config.get('fallbackPayloadFormat'))
+                )
+                if payload_format
+            },
+            pool_size=tts_config.get('connectionPool', {}).get('maxConnections'),
+            **self._breaker_settings(tts_config.get('circuitBreaker', {})),
+            **self._hedge_settings(tts_config.get('hedging', {})),
+            rate_limit=self._rate_limit_settings(
+                tts_config.get('rateLimit', {}),
+                concurrency.get('maxInFlightPerEndpoint', 4)
+            ),
+            # The adaptive limiter absorbs overload, so retries need not wait long
+            retry_backoff=(tts_config['rateLimit'].get('retryBackoffSeconds', 0.1)
+                           if tts_config.get('rateLimit', {}).get('enabled', False) else 1.0)
         )
         
         merge_config = self.config['mergeConfiguration']['qualitySettings']
         self.merger = AudioMerger(
             output_format=merge_config['format'],
             bitrate=merge_config['bitrate'],
-            sample_rate=merge_config['sampleRate']
+            sample_rate=merge_config['sampleRate'],
+            channels=merge_config.get('channels', 2),
+            engine=self.config['mergeConfiguration'].get('engine', 'pydub')
         )
         
+        # "files": segments and parts are written to disk and merged from there
+        # "memory": segments stay in memory as TTS bytes/PCM; only the final is encoded
+        self.pipeline = self.config['mergeConfiguration'].get('pipeline', 'files')
+        if self.pipeline not in self.PIPELINES:
+            raise ValueError(f"Unknown merge pipeline: {self.pipeline}")
+        if self.pipeline == 'memory' and np is None:
+            print("⚠️  WARNING: numpy not installed, falling back to the files pipeline")
+            self.pipeline = 'files'
+        self.keep_intermediates = self.config['mergeConfiguration'].get('keepIntermediates', False)
+        
+        # "measured": per-segment loudness stats, gains applied while merging parts
+        # "loudnorm": single-pass loudnorm chained into the final export
+        normalization = self.config['mergeConfiguration']['audioNormalization']
+        self.normalization_mode = None
+        if normalization['enabled']:
+            self.normalization_mode = normalization.get('mode', 'loudnorm')
+        self.target_loudness = normalization.get('targetLoudness', -20)
+        
         self.output_dir = "audio_output"
         os.makedirs(self.output_dir, exist_ok=True)
+        
+        # Incremental builds: skip nodes whose inputs are unchanged since the last run
+        build_config = self.config.get('buildConfiguration', {})
+        self.manifest = None
+        if build_config.get('incremental', False):
+            self.manifest = BuildManifest(os.path.join(
+                self.output_dir,
+                build_config.get('manifestFile', '.build_manifest.json')
+            ))
+        
+        # Graph scheduling: every segment, part and final node runs as soon as its inputs are ready
+        scheduler_config = build_config.get('scheduler', {})
+        self.graph_enabled = scheduler_config.get('mode', 'phased') == 'graph'
+        self.cpu_workers = scheduler_config.get('cpuWorkers', 2)
+        self.schedule_report_file = scheduler_config.get('reportFile')
+        self.schedule_report = None
     
-    def generate_part(self, part: Dict) -> Optional[str]:
-        """Generate audio for a single part."""
+    @staticmethod
+    def _breaker_settings(breaker_config: Dict) -> Dict:
+        """AudioGenerator circuit breaker arguments from the configuration."""
+        if not breaker_config.get('enabled', True):
+            return {"breaker_threshold": None}
+        return {
+            "breaker_threshold": breaker_config.get('failureThreshold', 3),
+            "breaker_cooldown": breaker_config.get('cooldownSeconds', 30),
+        }
+    
+    @staticmethod
+    def _hedge_settings(hedge_config: Dict) -> Dict:
+        """AudioGenerator hedging arguments from the configuration."""
+        if not hedge_config.get('enabled', False):
+            return {}
+        return {
+            "hedge_percentile": hedge_config.get('percentile', 95),
+            "hedge_budget": hedge_config.get('maxHedgeRatio', 0.1),
+            "hedge_initial_delay": hedge_config.get('initialDelaySeconds', 2.0),
+            "hedge_min_samples": hedge_config.get('minSamples', 20),
+        }
+    
+    @staticmethod
+    def _rate_limit_settings(rate_config: Dict, max_in_flight: int) -> Optional[Dict]:
+        """AdaptiveLimiter arguments from the configuration, or None for a fixed limit."""
+        if not rate_config.get('enabled', False):
+            return None
+        return {
+            "initial_limit": rate_config.get('initialConcurrency', max_in_flight),
+            "min_limit": rate_config.get('minConcurrency', 1),
+            "max_limit": rate_config.get('maxConcurrency', max_in_flight * 4),
+            "rate": rate_config.get('requestsPerSecond'),
+            "burst": rate_config.get('burst'),
+            "backoff": rate_config.get('backoffFactor', 0.5),
+        }
+    
+    @staticmethod
+    def _build_cache(cache_config: Dict) -> Optional[TTSCache]:
+        """Create the TTS result cache if enabled in the configuration."""
+        if not cache_config.get('enabled', False):
+            return None
+        return TTSCache(
+            directory=cache_config.get('directory', '.tts_cache'),
+            max_size_mb=cache_config.get('maxSizeMB', 256)
+        )
+    
+    def _generate_segment(self, part: Dict, segment: Dict, analyze: bool = True):
+        """
+        Generate audio for a single segment of a part.
         
-        print(f"\n🎵 {part['name']}")
-        print(f"   {part['description']}")
-        print(f"   Target duration: {part['duration']}s")
+        Returns the segment file, or its audio bytes in the memory pipeline.
+        With analyze=False a new file's loudness is left for the caller.
+        """
         
-        part_audio_files = []
+        print(f"\n   📝 Generating: {part['id']}/{segment['id']} ({segment['duration']}s)")
         
-        for segment in part['segments']:
-            print(f"\n   📝 Generating: {segment['id']} ({segment['duration']}s)")
-            
-            output_path = os.path.join(
-                self.output_dir,
-                f"{part['id']}_{segment['id']}.mp3"
-            )
-            
+        options = dict(
+            text=segment['text'],
+            voice=segment.get('voice', 'en-US-AriaNeural'),
+            emotion=segment.get('emotion', 'neutral'),
+            rate=segment.get('rate', 'normal')
+        )
+        if self.pipeline == 'memory':
+            audio_file = self.generator.synthesize(**options)
+        else:
             audio_file = self.generator.generate_audio(
-                text=segment['text'],
-                voice=segment.get('voice', 'en-US-AriaNeural'),
-                emotion=segment.get('emotion', 'neutral'),
-                rate=segment.get('rate', 'normal'),
-                output_path=output_path
-            )
-            
-            if audio_file:
-                part_audio_files.append(audio_file)
-            else:
+                output_path=self._segment_output_path(part, segment), **options)
+        
+        if not audio_file:
+            print(f"   ⚠️  Skipping {segment['id']} due to generation failure")
+        elif self.pipeline == 'files' and analyze:
+            self._analyze_segment(audio_file)
+        
+        return audio_file
+    
+    def _analyze_segment(self, audio_file: str):
+        """Measure a freshly generated segment's loudness if gains are needed."""
+        if self.normalization_mode == 'measured':
+            if self._segment_loudness(audio_file) is None:
+                print(f"   ⚠️  Could not measure loudness of {audio_file}")
+    
+    def _segment_loudness(self, audio_file: str) -> Optional[Dict]:
+        """
+        Loudness stats of a segment file, measured at most once per content.
+        
+        With incremental builds the stats live in the manifest under the
+        file's content hash (reused from its node while the file is
+        unchanged); otherwise analyze_loudness keeps them in a sidecar.
+        """
+        if self.manifest is None:
+            return self.merger.analyze_loudness(audio_file)
+        
+        digest = self.manifest.output_hash(audio_file)
+        stats = self.manifest.loudness(digest)
+        if stats is None:
+            stats = self.merger.measure_loudness(audio_file)
+            if stats is not None:
+                self.manifest.record_loudness(digest, stats)
+        return stats
+    
+    def _segment_output_path(self, part: Dict, segment: Dict) -> str:
+        return os.path.join(self.output_dir, f"{part['id']}_{segment['id']}.mp3")
+    
+    def _segment_inputs(self, segment: Dict) -> str:
+        """Hash of everything a segment's audio depends on."""
+        tts_config = self.config['ttsApiConfiguration']
+        return BuildManifest.hash_inputs(
+            "segment",
+            segment['text'],
+            segment.get('voice', 'en-US-AriaNeural'),
+            segment.get('emotion', 'neutral'),
+            segment.get('rate', 'normal'),
+            tts_config['endpoint'],
+            tts_config['fallbackEndpoint'],
+        )
+    
+    def _merge_inputs(self, kind: str, audio_files: List[str], crossfade: float) -> str:
+        """Hash of a merge node: its input contents plus every output setting."""
+        merge_config = self.config['mergeConfiguration']
+        return BuildManifest.hash_inputs(
+            kind,
+            [self.manifest.output_hash(f) for f in audio_files],
+            crossfade,
+            merge_config['qualitySettings'],
+            self.merger.engine,
+            self.normalization_mode,
+            self.target_loudness,
+        )
+    
+    def _generate_batch(self, jobs: List, analyze: bool = True) -> List:
+        """Generate a part's segments with a single batch request."""
+        
+        for part, segment in jobs:
+            print(f"\n   📝 Generating: {part['id']}/{segment['id']} ({segment['duration']}s)")
+        
+        output_paths = None
+        if self.pipeline == 'files':
+            output_paths = [self._segment_output_path(part, segment) for part, segment in jobs]
+        results = self.generator.generate_batch([segment for _, segment in jobs], output_paths)
+        
+        for (_, segment), audio_file in zip(jobs, results):
+            if not audio_file:
                 print(f"   ⚠️  Skipping {segment['id']} due to generation failure")
+            elif self.pipeline == 'files' and analyze:
+                self._analyze_segment(audio_file)
+        
+        return results
+    
+    def _generate_segments(self, parts: List[Dict]) -> Dict[str, List[str]]:
+        """
+        Generate every segment of the given parts.
+        
+        In concurrent mode all segments are fanned out over one bounded
+        thread pool at once; per-endpoint load is capped by the generator.
+        
+        Args:
+            parts: Part configurations whose segments should be generated
+            
+        Returns:
+            Mapping of part id to its generated files, in config order
+        """
+        all_jobs = [(part, segment) for part in parts for segment in part['segments']]
+        results: Dict[int, Optional[str]] = {}
+        
+        # Segments whose text and settings are unchanged keep their existing file
+        if self.manifest is not None:
+            for index, (part, segment) in enumerate(all_jobs):
+                output_path = self._segment_output_path(part, segment)
+                if self.manifest.is_clean(output_path, self._segment_inputs(segment)):
+                    results[index] = output_path
+            if results:
+                print(f"\n✅ {len(results)}/{len(all_jobs)} segments up to date")
+        dirty = [index for index in range(len(all_jobs)) if index not in results]
+        generated = self._fetch_segments([all_jobs[index] for index in dirty], parts)
+        
+        for index, audio_file in zip(dirty, generated):
+            results[index] = audio_file
+            if audio_file and self.manifest is not None:
+                self.manifest.record(audio_file, self._segment_inputs(all_jobs[index][1]))
+        
+        part_files = {part['id']: [] for part in parts}
+        for index, (part, _) in enumerate(all_jobs):
+            if results[index]:
+                part_files[part['id']].append(results[index])
+        
+        return part_files
+    
+    def _fetch_segments(self, jobs: List, parts: List[Dict]) -> List:
+        """Generate (part, segment) jobs, returning results in job order."""
+        
+        # With a batch endpoint each part is one request; otherwise one per segment
+        if self.generator.batch_url:
+            units = [[job for job in jobs if job[0] is part] for part in parts]
+            units = [unit for unit in units if unit]
+            run = self._generate_batch
+        else:
+            units = [[job] for job in jobs]
+            run = lambda unit: [self._generate_segment(*unit[0])]
+        
+        if self.concurrent and len(units) > 1:
+            workers = min(self.max_workers, len(units))
+            print(f"\n⚡ Generating {len(jobs)} segments concurrently ({workers} workers)")
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                unit_results = list(pool.map(run, units))
+        else:
+            unit_results = [run(unit) for unit in units]
+        return [result for unit_result in unit_results for result in unit_result]
+    
+    def _merge_part(self, part: Dict, part_audio_files: List[str]) -> Optional[str]:
+        """Merge generated segment files into the part output."""
         
         if not part_audio_files:
             print(f"   ❌ Failed to generate {part['name']}")
             return None
         
-        # Merge segments into part
+        # Bring every segment to the target loudness as it is mixed
+        gains = None
+        if self.normalization_mode == 'measured':
+            gains = [
+                self.merger.loudness_gain(self._segment_loudness(f), self.target_loudness)
+                for f in part_audio_files
+            ]
+        
         part_output = os.path.join(self.output_dir, part['outputFile'])
-        return self.merger.merge_audio_files(
-            part_audio_files,
-            part_output,
-            crossfade=0.5
+        return self._merge_node("part", part_audio_files, part_output,
+                                crossfade=0.5, gains=gains)
+    
+    def _merge_node(self, kind: str, audio_files: List[str], output_path: str,
+                    crossfade: float, **merge_options) -> Optional[str]:
+        """Merge files into output_path unless the manifest says it is up to date."""
+        
+        input_hash = None
+        if self.manifest is not None:
+            input_hash = self._merge_inputs(kind, audio_files, crossfade)
+            if self.manifest.is_clean(output_path, input_hash):
+                print(f"  ✅ {output_path} is up to date")
+                return output_path
+        
+        merged = self.merger.merge_audio_files(
+            audio_files,
+            output_path,
+            crossfade=crossfade,
+            **merge_options
         )
+        
+        if merged and input_hash is not None:
+            self.manifest.record(merged, input_hash)
+        return merged
     
-    def produce(self) -> Optional[str]:
-        """Execute complete production pipeline."""
+    def _print_part_header(self, part: Dict):
+        print(f"\n🎵 {part['name']}")
+        print(f"   {part['description']}")
+        print(f"   Target duration: {part['duration']}s")
+    
+    def generate_part(self, part: Dict) -> Optional[str]:
+        """Generate audio for a single part."""
         
-        print("=" * 60)
-        print("🎬 SONG PRODUCTION PIPELINE")
-        print("=" * 60)
-        print(f"Project: {self.config['project']}")
-        print(f"Total Duration: {self.config['metadata']['totalDuration']}")
-        print(f"Output Format: {self.config['metadata']['outputFormat']}")
-        print("=" * 60)
+        self._print_part_header(part)
+        part_audio_files = self._generate_segments([part])[part['id']]
+        
+        # Merge segments into part
+        return self._merge_part(part, part_audio_files)
+    
+    def _final_output(self) -> Tuple[str, Optional[float]]:
+        """Final output path and the loudness target for its export."""
+        final_output = os.path.join(self.output_dir,
+                                    self.config['mergeConfiguration']['outputFile'])
+        
+        # Normalize audio if enabled, as part of the merge rather than a second pass.
+        # In measured mode the parts are already at the target loudness.
+        loudness_target = None
+        if self.normalization_mode is not None:
+            if self.normalization_mode == 'loudnorm':
+                loudness_target = self.target_loudness
+            base, ext = os.path.splitext(final_output)
+            final_output = f"{base}_normalized{ext}"
+        return final_output, loudness_target
+    
+    def _produce_files(self) -> Tuple[Optional[str], int]:
+        """
+        Generate segment files, merge them into part files, then the final.
+        
+        Returns:
+            Tuple of (final output path or None, number of parts generated)
+        """
         
         # Generate all parts
         part_files = []
         
+        if self.concurrent:
+            # Fan out every segment of every part, then merge parts in order
+            for part in self.config['parts']:
+                self._print_part_header(part)
+            segment_files = self._generate_segments(self.config['parts'])
+        
         for part in self.config['parts']:
             print(f"\n{'='*60}")
-            part_file = self.generate_part(part)
+            if self.concurrent:
+                print(f"🎵 {part['name']}")
+                part_file = self._merge_part(part, segment_files[part['id']])
+            else:
+                part_file = self.generate_part(part)
             
             if part_file:
                 part_files.append(part_file)
@@ -352,29 +2522,361 @@ class SongProducer:
                 print(f"\n⚠️  Skipping {part['name']} in final merge")
         
         if not part_files:
-            print("\n❌ No parts generated successfully")
-            return None
+            return None, 0
         
         # Merge all parts
         print(f"\n{'='*60}")
-        merge_config = self.config['mergeConfiguration']
-        final_output = os.path.join(self.output_dir, merge_config['outputFile'])
-        
-        merged_file = self.merger.merge_audio_files(
+        final_output, loudness_target = self._final_output()
+        merged_file = self._merge_node(
+            "final",
             part_files,
             final_output,
-            crossfade=merge_config['transitions']['crossfadeDuration']
+            crossfade=self.config['mergeConfiguration']['transitions']['crossfadeDuration'],
+            loudness_target=loudness_target
         )
+        return merged_file, len(part_files)
+    
+    def _memory_inputs(self) -> str:
+        """Hash of the in-memory build: every segment's inputs plus the merge settings."""
+        merge_config = self.config['mergeConfiguration']
+        return BuildManifest.hash_inputs(
+            "final",
+            [[self._segment_inputs(segment) for segment in part['segments']]
+             for part in self.config['parts']],
+            merge_config['transitions']['crossfadeDuration'],
+            merge_config['qualitySettings'],
+            self.pipeline,
+            self.normalization_mode,
+            self.target_loudness,
+        )
+    
+    def _decode_segment(self, audio: bytes) -> Optional[Tuple["np.ndarray", float]]:
+        """Decode a segment's TTS bytes to PCM with its loudness gain in dB."""
+        try:
+            with metrics.stage("memory", "decode"):
+                clip = self.merger.decode_pcm(audio)
+            
+            # Bring every segment to the target loudness as it is mixed
+            gain = 0.0
+            if self.normalization_mode == 'measured':
+                digest = None
+                stats = None
+                if self.manifest is not None:
+                    digest = hashlib.sha256(audio).hexdigest()
+                    stats = self.manifest.loudness(digest)
+                if stats is None:
+                    with metrics.stage("memory", "analyze"):
+                        stats = self.merger.measure_pcm_loudness(clip, self.target_loudness)
+                    if stats is not None and digest is not None:
+                        self.manifest.record_loudness(digest, stats)
+                gain = self.merger.loudness_gain(stats, self.target_loudness)
+            return clip, gain
+        except Exception as e:
+            print(f"   ⚠️  Could not decode segment: {e}")
+            return None
+    
+    def _mix_part(self, part: Dict, decoded: List[Tuple["np.ndarray", float]]) -> Optional["np.ndarray"]:
+        """Crossfade a part's decoded segments into one PCM buffer."""
         
-        if not merged_file:
-            print("\n❌ Merging failed")
+        if not decoded:
+            print(f"   ❌ Failed to generate {part['name']}")
+            return None
+        
+        try:
+            with metrics.stage("memory", "crossfade"):
+                mixed = self.merger.mix_pcm([clip for clip, _ in decoded], crossfade=0.5,
+                                            gains=[gain for _, gain in decoded])
+            print(f"  ✅ Mixed {len(decoded)} segments ({len(mixed) / self.merger.sample_rate:.1f}s)")
+            
+            if self.keep_intermediates:
+                part_output = os.path.join(self.output_dir, part['outputFile'])
+                with metrics.stage("memory", "export"):
+                    self.merger.encode_pcm(mixed, part_output)
+                print(f"  💾 Kept {part_output}")
+            return mixed
+            
+        except Exception as e:
+            print(f"   ❌ Failed to mix {part['name']}: {e}")
+            return None
+    
+    def _mix_final(self, part_audio: List["np.ndarray"], final_output: str,
+                   loudness_target: Optional[float]) -> Optional[str]:
+        """
+        Crossfade mixed parts straight into a single encode of the final output.
+        
+        Parts are taken off part_audio as they are written, so each one is
+        released as soon as it is encoded.
+        """
+        try:
+            print(f"\n💾 Exporting to {final_output}...")
+            with metrics.stage("memory", "export"):
+                frames = self.merger.encode_pcm_stream(
+                    part_audio,
+                    final_output,
+                    crossfade=self.config['mergeConfiguration']['transitions']['crossfadeDuration'],
+                    loudness_target=loudness_target
+                )
+        except Exception as e:
+            print(f"  ❌ Merge failed: {e}")
             return None
         
-        # Normalize audio if enabled
-        if self.config['mergeConfiguration']['audioNormalization']['enabled']:
-            normalized_file = self.merger.normalize_audio(merged_file)
-            if normalized_file:
-                final_output = normalized_file
+        metrics.MERGE_BYTES_WRITTEN.labels(engine="memory").inc(os.path.getsize(final_output))
+        print(f"  ✅ Merged audio saved ({frames / self.merger.sample_rate:.1f}s total)")
+        return final_output
+    
+    def _keep_segment(self, part: Dict, segment: Dict, audio: bytes):
+        """Write a segment's TTS bytes to its usual file when keepIntermediates is set."""
+        if self.keep_intermediates and audio is not None:
+            with open(self._segment_output_path(part, segment), 'wb') as f:
+                f.write(audio)
+    
+    def _produce_in_memory(self) -> Tuple[Optional[str], int]:
+        """
+        Generate and mix everything in memory, encoding only the final output.
+        
+        Segments are kept as the bytes the TTS service returned and decoded
+        once to PCM; parts are mixed in PCM and never encoded, so the only
+        disk write is the final export (plus segment and part files when
+        keepIntermediates is set). With incremental builds the whole song
+        is one node keyed on every segment's inputs.
+        
+        Returns:
+            Tuple of (final output path or None, number of parts generated)
+        """
+        parts = self.config['parts']
+        final_output, loudness_target = self._final_output()
+        
+        input_hash = None
+        if self.manifest is not None:
+            input_hash = self._memory_inputs()
+            if self.manifest.is_clean(final_output, input_hash):
+                print(f"\n✅ {final_output} is up to date")
+                return final_output, len(parts)
+        
+        for part in parts:
+            self._print_part_header(part)
+        jobs = [(part, segment) for part in parts for segment in part['segments']]
+        segment_audio = self._fetch_segments(jobs, parts)
+        for (part, segment), audio in zip(jobs, segment_audio):
+            self._keep_segment(part, segment, audio)
+        
+        part_audio = []
+        complete = True
+        for part in parts:
+            print(f"\n{'='*60}")
+            print(f"🎵 {part['name']}")
+            decoded = [
+                self._decode_segment(audio) for (job_part, _), audio in zip(jobs, segment_audio)
+                if job_part is part and audio is not None
+            ]
+            complete = complete and None not in decoded
+            mixed = self._mix_part(part, [clip for clip in decoded if clip is not None])
+            if mixed is not None:
+                part_audio.append(mixed)
+            else:
+                print(f"\n⚠️  Skipping {part['name']} in final merge")
+        
+        # The encoded segments are no longer needed once every part is mixed
+        complete = complete and all(audio is not None for audio in segment_audio)
+        del segment_audio
+        
+        parts_generated = len(part_audio)
+        if not part_audio:
+            return None, 0
+        
+        # Merge all parts
+        print(f"\n{'='*60}")
+        merged_file = self._mix_final(part_audio, final_output, loudness_target)
+        
+        if merged_file and input_hash is not None and complete:
+            self.manifest.record(merged_file, input_hash)
+        return merged_file, parts_generated
+    
+    def _fetch_segment_file(self, part: Dict, segment: Dict) -> Optional[str]:
+        """Generate one segment file unless the manifest says it is up to date."""
+        output_path = self._segment_output_path(part, segment)
+        input_hash = self._segment_inputs(segment) if self.manifest is not None else None
+        if input_hash is not None and self.manifest.is_clean(output_path, input_hash):
+            print(f"   ✅ {part['id']}/{segment['id']} is up to date")
+            return output_path
+        
+        audio_file = self._generate_segment(part, segment, analyze=False)
+        if audio_file and input_hash is not None:
+            self.manifest.record(audio_file, input_hash)
+        return audio_file
+    
+    def _fetch_part_batch(self, part: Dict) -> List:
+        """Generate a part's segments with one batch request (files: dirty ones only)."""
+        jobs = [(part, segment) for segment in part['segments']]
+        if self.pipeline == 'memory':
+            return self._generate_batch(jobs, analyze=False)
+        
+        results = [None] * len(jobs)
+        dirty = []
+        for index, (_, segment) in enumerate(jobs):
+            output_path = self._segment_output_path(part, segment)
+            if self.manifest is not None and self.manifest.is_clean(
+                    output_path, self._segment_inputs(segment)):
+                results[index] = output_path
+            else:
+                dirty.append(index)
+        
+        if dirty:
+            generated = self._generate_batch([jobs[index] for index in dirty], analyze=False)
+            for index, audio_file in zip(dirty, generated):
+                results[index] = audio_file
+                if audio_file and self.manifest is not None:
+                    self.manifest.record(audio_file, self._segment_inputs(jobs[index][1]))
+        return results
+    
+    def _prepare_segment_file(self, audio_file: Optional[str]) -> Optional[str]:
+        """Measure a segment file's loudness ahead of its part merge."""
+        if audio_file:
+            self._analyze_segment(audio_file)
+        return audio_file
+    
+    def _produce_graph(self) -> Tuple[Optional[str], int]:
+        """
+        Build the song as a TaskGraph instead of in phases.
+        
+        Per segment, a TTS task on the io pool feeds a cpu task that
+        measures loudness (files) or decodes to PCM (memory). Each part
+        merge runs on the cpu pool as soon as its own segments are
+        ready, while later parts are still synthesizing, and the final
+        merge runs once every part is done. Normalization is part of
+        the final export, as in the phased pipeline. The timing report
+        is kept in schedule_report.
+        
+        Returns:
+            Tuple of (final output path or None, number of parts generated)
+        """
+        parts = self.config['parts']
+        memory = self.pipeline == 'memory'
+        final_output, loudness_target = self._final_output()
+        
+        input_hash = None
+        if memory and self.manifest is not None:
+            input_hash = self._memory_inputs()
+            if self.manifest.is_clean(final_output, input_hash):
+                print(f"\n✅ {final_output} is up to date")
+                return final_output, len(parts)
+        
+        graph = TaskGraph(io_workers=self.max_workers if self.concurrent else 1,
+                          cpu_workers=self.cpu_workers)
+        failures = []
+        # Mixed part PCM is handed to the final task here rather than as a task
+        # result, so the final encode can release each part once it is written
+        mixed_parts = {}
+        
+        def prepare(part: Dict, segment: Dict, audio):
+            if audio is None:
+                failures.append(segment['id'])
+                return None
+            if not memory:
+                return self._prepare_segment_file(audio)
+            self._keep_segment(part, segment, audio)
+            decoded = self._decode_segment(audio)
+            if decoded is None:
+                failures.append(segment['id'])
+            return decoded
+        
+        def merge_part(part: Dict, *segments):
+            print(f"\n🎵 Merging {part['name']}")
+            segments = [segment for segment in segments if segment is not None]
+            if not memory:
+                return self._merge_part(part, segments)
+            mixed = self._mix_part(part, segments)
+            if mixed is None:
+                return None
+            mixed_parts[part['id']] = mixed
+            return part['id']
+        
+        def merge_final(*part_results):
+            print(f"\n{'='*60}")
+            for part, result in zip(parts, part_results):
+                if result is None:
+                    print(f"⚠️  Skipping {part['name']} in final merge")
+            part_results = [result for result in part_results if result is not None]
+            if not part_results:
+                return None, 0
+            parts_generated = len(part_results)
+            if memory:
+                part_audio = [mixed_parts.pop(part_id) for part_id in part_results]
+                return self._mix_final(part_audio, final_output, loudness_target), parts_generated
+            crossfade = self.config['mergeConfiguration']['transitions']['crossfadeDuration']
+            return self._merge_node("final", part_results, final_output, crossfade=crossfade,
+                                    loudness_target=loudness_target), parts_generated
+        
+        part_tasks = []
+        for part in parts:
+            self._print_part_header(part)
+            stage = 'decode' if memory else 'loudness'
+            if self.generator.batch_url:
+                # One request per part; each segment picks its clip out of the batch
+                batch = graph.add(f"tts:{part['id']}",
+                                  lambda part=part: self._fetch_part_batch(part), pool="io")
+                prepared = [
+                    graph.add(f"{stage}:{part['id']}/{segment['id']}",
+                              lambda results, part=part, segment=segment, index=index:
+                                  prepare(part, segment, results[index] if results else None),
+                              deps=[batch])
+                    for index, segment in enumerate(part['segments'])
+                ]
+            else:
+                fetch = self._generate_segment if memory else self._fetch_segment_file
+                prepared = [
+                    graph.add(f"{stage}:{part['id']}/{segment['id']}",
+                              lambda audio, part=part, segment=segment: prepare(part, segment, audio),
+                              deps=[graph.add(f"tts:{part['id']}/{segment['id']}",
+                                              lambda part=part, segment=segment: fetch(part, segment),
+                                              pool="io")])
+                    for segment in part['segments']
+                ]
+            part_tasks.append(graph.add(f"part:{part['id']}",
+                                        lambda *segments, part=part: merge_part(part, *segments),
+                                        deps=prepared))
+        graph.add("final", merge_final, deps=part_tasks)
+        
+        print(f"\n⚡ Scheduling {len(graph.tasks)} tasks "
+              f"({graph.workers['io']} io, {graph.workers['cpu']} cpu workers)")
+        merged_file, parts_generated = graph.run()["final"] or (None, 0)
+        
+        self.schedule_report = graph.report()
+        if self.schedule_report_file:
+            with open(os.path.join(self.output_dir, self.schedule_report_file), 'w') as f:
+                json.dump(self.schedule_report, f, indent=2)
+        
+        if merged_file and input_hash is not None and not failures:
+            self.manifest.record(merged_file, input_hash)
+        return merged_file, parts_generated
+    
+    def produce(self) -> Optional[str]:
+        """Execute complete production pipeline."""
+        
+        print("=" * 60)
+        print("🎬 SONG PRODUCTION PIPELINE")
+        print("=" * 60)
+        print(f"Project: {self.config['project']}")
+        print(f"Total Duration: {self.config['metadata']['totalDuration']}")
+        print(f"Output Format: {self.config['metadata']['outputFormat']}")
+        print("=" * 60)
+        
+        if self.graph_enabled:
+            final_output, parts_generated = self._produce_graph()
+        elif self.pipeline == 'memory':
+            final_output, parts_generated = self._produce_in_memory()
+        else:
+            final_output, parts_generated = self._produce_files()
+        
+        if self.manifest is not None:
+            self.manifest.save()
+        
+        if not parts_generated:
+            print("\n❌ No parts generated successfully")
+            return None
+        if not final_output:
+            print("\n❌ Merging failed")
+            return None
         
         # Summary
         print(f"\n{'='*60}")
@@ -382,7 +2884,32 @@ class SongProducer:
         print(f"{'='*60}")
         print(f"📁 Output Directory: {os.path.abspath(self.output_dir)}")
         print(f"🎵 Final File: {os.path.abspath(final_output)}")
-        print(f"📊 Parts Generated: {len(part_files)}")
+        print(f"📊 Parts Generated: {parts_generated}")
+        if self.generator.cache is not None:
+            cache_stats = self.generator.cache.stats()
+            print(f"💾 TTS Cache: {cache_stats['hits']} hits, "
+                  f"{cache_stats['misses']} misses, "
+                  f"{cache_stats['size_bytes'] / (1024*1024):.1f} MB")
+        if self.generator.hedge_percentile is not None:
+            hedge_stats = self.generator.hedge_stats()
+            print(f"🏁 Hedging: {hedge_stats['hedges']} hedges for "
+                  f"{hedge_stats['requests']} segments, "
+                  f"fallback won {hedge_stats['fallback_wins']}")
+        if self.generator.rate_limit is not None:
+            for url, limits in self.generator.endpoint_limits().items():
+                print(f"🚦 {url}: concurrency settled at {limits['limit']}, "
+                      f"{limits['decreases']} backoffs, {limits['throttled']} throttled")
+        for url, health in self.generator.endpoint_health().items():
+            if health['trips']:
+                print(f"⛔ {url}: circuit {health['state']}, tripped {health['trips']}x")
+        if self.schedule_report is not None:
+            path = " → ".join(f"{t['task']} ({t['run_s']:.1f}s)"
+                              for t in self.schedule_report['critical_path'])
+            print(f"⏱️  Critical path: {self.schedule_report['critical_path_run_s']:.1f}s running + "
+                  f"{self.schedule_report['critical_path_queued_s']:.1f}s queued of "
+                  f"{self.schedule_report['wall_s']:.1f}s wall: {path}")
+            if self.schedule_report_file:
+                print(f"⏱️  Schedule report: {os.path.join(self.output_dir, self.schedule_report_file)}")
         print("=" * 60)
         
         return final_output
@@ -408,7 +2935,12 @@ def main():
     # Run production pipeline
     try:
         producer = SongProducer(config_path)
-        result = producer.produce()
+        try:
+            result = producer.produce()
+        finally:
+            producer.generator.close()
+            if os.environ.get("METRICS_DUMP"):
+                metrics.dump(os.environ["METRICS_DUMP"])
         
         if result:
             print(f"\n✅ Success! Final file: {result}")
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+API Latency Benchmark
+Measures /health latency of the n8n API server while other clients hammer
+/api/stats, showing whether slow disk scans stall the event loop.
+
+The server is started with uvicorn in a scratch directory seeded with
+--files dummy outputs, so /api/stats has real directory work to do.
+
+Usage:
+    python3 benchmarks/api_latency.py
+    python3 benchmarks/api_latency.py --files 20000 --load-clients 16
+    python3 benchmarks/api_latency.py --server /path/to/old/n8n_api_server.py
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+import requests
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    """Return a TCP port that is currently free on localhost."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Return the pct-th percentile of samples (nearest rank)."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def seed_workdir(workdir: Path, server: Path, files: int):
+    """Copy the server and config into workdir and create dummy outputs."""
+    shutil.copy(server, workdir / "n8n_api_server.py")
+    for module in ("audio_merger.py", "log_store.py", "metrics.py"):
+        shutil.copy(REPO_ROOT / module, workdir / module)
+    shutil.copy(REPO_ROOT / "final.json", workdir / "final.json")
+    for directory in ("audio_output", "audio_segments"):
+        (workdir / directory).mkdir(exist_ok=True)
+        for index in range(files):
+            (workdir / directory / f"bench_{index:06d}.mp3").write_bytes(b"\0" * 64)
+
+
+def wait_until_ready(base_url: str, timeout: float = 30.0):
+    """Poll /health until the server answers."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/health", timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Server did not become ready")
+
+
+def run(base_url: str, duration: float, load_clients: int) -> dict:
+    """Drive /api/stats load and sample /health latency for duration seconds."""
+    stop = threading.Event()
+    stats_calls = [0] * load_clients
+
+    def load(index: int):
+        session = requests.Session()
+        while not stop.is_set():
+            session.get(f"{base_url}/api/stats", timeout=60)
+            stats_calls[index] += 1
+
+    workers = [threading.Thread(target=load, args=(i,), daemon=True) for i in range(load_clients)]
+    for worker in workers:
+        worker.start()
+
+    latencies = []
+    session = requests.Session()
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        started = time.perf_counter()
+        session.get(f"{base_url}/health", timeout=60)
+        latencies.append((time.perf_counter() - started) * 1000)
+        time.sleep(0.01)
+
+    stop.set()
+    for worker in workers:
+        worker.join()
+
+    return {
+        "health_requests": len(latencies),
+        "stats_requests": sum(stats_calls),
+        "health_p50_ms": round(percentile(latencies, 50), 2),
+        "health_p99_ms": round(percentile(latencies, 99), 2),
+        "health_max_ms": round(max(latencies), 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--server", default=str(REPO_ROOT / "n8n_api_server.py"),
+                        help="Server module to benchmark (e.g. an older revision)")
+    parser.add_argument("--files", type=int, default=5000,
+                        help="Dummy files per scanned directory")
+    parser.add_argument("--load-clients", type=int, default=8,
+                        help="Concurrent /api/stats clients")
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="Measurement window in seconds")
+    args = parser.parse_args()
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory(prefix="api-bench-") as tmp:
+        workdir = Path(tmp)
+        seed_workdir(workdir, Path(args.server), args.files)
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "n8n_api_server:app",
+             "--port", str(port), "--log-level", "warning"],
+            cwd=workdir,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env={**os.environ, "PYTHONPATH": str(workdir)}
+        )
+        try:
+            wait_until_ready(base_url)
+            result = run(base_url, args.duration, args.load_clients)
+        finally:
+            server.terminate()
+            server.wait()
+
+    result.update({
+        "server": args.server,
+        "files": args.files,
+        "load_clients": args.load_clients
+    })
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,613 @@
+#!/usr/bin/env python3
+"""
+End-to-End Benchmark
+Measures the production pipeline and both HTTP services offline, against
+fake TTS endpoints (benchmarks/fake_tts.py), and prints JSON.
+
+Scenarios:
+    produce    SongProducer.produce over a generated song of --segments
+               segments at each --concurrency, merge --pipelines and
+               --schedulers, primary and fallback served by fake TTS
+               servers with the given latency and failure rates
+    merge      AudioMerger.merge_audio_files of --merge-clips clips, per engine
+    normalize  AudioMerger.normalize_audio of a --normalize-seconds file
+    api        n8n_api_server endpoints (health, config, stats, output,
+               merge jobs) at each --concurrency
+    tts        tts-service POST /tts at each --concurrency, on its local
+               backend unless --tts-service-url points at a deployment
+
+Each pipeline scenario runs in its own Python process so its peak RSS is
+its own; for the services the server process's peak RSS is reported.
+Every result has "scenario", "params" and "metrics" (throughput, p50/p99,
+peak RSS). With --baseline, metrics that got worse than the tolerance
+are listed under "regressions" and the exit status is 1; so are
+scenarios that now fail, lose a metric or report more failed runs or
+errors.
+
+Usage:
+    python3 benchmarks/e2e.py --output bench.json
+    python3 benchmarks/e2e.py --scenarios produce --segments 8,32 --concurrency 1,8 \\
+        --latency lognormal:0.3:0.5 --error-rate 0.05
+    python3 benchmarks/e2e.py --baseline bench.json --tolerance 0.2
+"""
+
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import requests
+
+from api_latency import free_port, percentile, wait_until_ready
+from fake_tts import render_clip
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SCENARIOS = ("produce", "merge", "normalize", "api", "tts")
+WORDS = ("light dream river stone morning night voice heart road star fire song "
+         "silence journey wind ocean shadow hope colour rhythm").split()
+
+
+def rusage_mb(who) -> float:
+    """Peak RSS from getrusage in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def process_peak_rss_mb(pid: int) -> Optional[float]:
+    """Peak RSS of another process from /proc (None where unavailable)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def latency_metrics(samples: List[float], elapsed: float, errors: int = 0) -> dict:
+    """Throughput and p50/p99 of latency samples given in seconds."""
+    if not samples:
+        return {"requests": 0, "errors": errors}
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_per_s": round(len(samples) / elapsed, 2),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2)
+    }
+
+
+def drive(call: Callable[[requests.Session, int], bool], concurrency: int,
+          requests_total: int) -> dict:
+    """Run requests_total calls over concurrency threads, timing each one."""
+    latencies: List[float] = []
+    errors = [0]
+    counter = iter(range(requests_total))
+    lock = threading.Lock()
+
+    def worker():
+        session = requests.Session()
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            started = time.perf_counter()
+            try:
+                ok = call(session, index)
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                errors[0] += not ok
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latency_metrics(latencies, time.perf_counter() - started, errors[0])
+
+
+def start_server(cmd: List[str], cwd: Path, base_url: str, env: Optional[dict] = None):
+    """Start a server process and wait for its /health."""
+    process = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, env={**os.environ, **(env or {})})
+    try:
+        wait_until_ready(base_url)
+    except RuntimeError:
+        process.terminate()
+        raise
+    return process
+
+
+def stop_server(process):
+    process.terminate()
+    process.wait()
+
+
+def song_config(template: Path, segments: int, concurrency: int, primary: str,
+                fallback: str, timeout: float, pipeline: str = "files",
+                scheduler: str = "phased", seed: int = 0) -> dict:
+    """A copy of the template config with a generated song of the given size."""
+    with open(template) as f:
+        config = json.load(f)
+    rng = random.Random(seed)
+
+    parts = []
+    for index in range(segments):
+        if index % 4 == 0:
+            part_id = f"part{index // 4 + 1}"
+            parts.append({
+                "id": part_id, "name": part_id, "duration": 60,
+                "description": "Benchmark part", "segments": [],
+                "outputFile": f"{part_id}.mp3"
+            })
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 40)))
+        parts[-1]["segments"].append({
+            "id": f"seg{index + 1}", "type": "lyrics", "duration": 10,
+            "text": f"Segment {index + 1}. {words}.",
+            "voice": "en-US-AriaNeural", "emotion": "neutral", "rate": "normal"
+        })
+    config["parts"] = parts
+
+    tts = config["ttsApiConfiguration"]
+    tts.update({"endpoint": primary, "fallbackEndpoint": fallback, "timeout": timeout})
+    tts.pop("batchEndpoint", None)
+    tts["cache"] = {"enabled": False}
+    tts["concurrency"] = {
+        "enabled": concurrency > 1,
+        "maxWorkers": concurrency,
+        "maxInFlightPerEndpoint": concurrency
+    }
+    config["buildConfiguration"] = {"incremental": False, "scheduler": {"mode": scheduler}}
+    config["mergeConfiguration"]["pipeline"] = pipeline
+    return config
+
+
+# Pipeline scenarios (run inside a child process)
+
+def timed_runs(run_once: Callable[[int], bool], repeat: int, units: float, unit: str) -> dict:
+    """Time repeat calls of run_once; p50/p99 and throughput cover successful runs."""
+    wall, failed = [], 0
+    for run in range(repeat):
+        started = time.perf_counter()
+        ok = run_once(run)
+        elapsed = time.perf_counter() - started
+        if ok:
+            wall.append(elapsed)
+        else:
+            failed += 1
+
+    metrics = {"runs": repeat, "failed_runs": failed}
+    if wall:
+        metrics.update({
+            "wall_p50_s": round(percentile(wall, 50), 3),
+            "wall_p99_s": round(percentile(wall, 99), 3),
+            f"throughput_{unit}_per_s": round(units * len(wall) / sum(wall), 2)
+        })
+    return metrics
+
+
+def run_produce(spec: dict) -> dict:
+    from audio_merger import SongProducer
+
+    config = song_config(Path(spec["template"]), spec["segments"], spec["concurrency"],
+                         spec["primary"], spec["fallback"], spec["timeout"],
+                         spec["pipeline"], spec["scheduler"])
+
+    def produce(run: int) -> bool:
+        run_dir = Path(tempfile.mkdtemp(prefix=f"produce-{run}-", dir=spec["workdir"]))
+        with open(run_dir / "final.json", "w") as f:
+            json.dump(config, f)
+        os.chdir(run_dir)
+        producer = SongProducer("final.json")
+        try:
+            return producer.produce() is not None
+        finally:
+            producer.generator.close()
+
+    return timed_runs(produce, spec["repeat"], spec["segments"], "segments")
+
+
+def run_merge(spec: dict) -> dict:
+    from audio_merger import AudioMerger
+
+    workdir = Path(spec["workdir"])
+    clip = render_clip(spec["clip_seconds"], "mp3")
+    files = []
+    for index in range(spec["clips"]):
+        path = workdir / f"clip_{index:04d}.mp3"
+        path.write_bytes(clip)
+        files.append(str(path))
+
+    merger = AudioMerger(engine=spec["engine"])
+
+    def merge(run: int) -> bool:
+        output = str(workdir / f"merged_{run}.mp3")
+        return merger.merge_audio_files(files, output, crossfade=0.5) is not None
+
+    return timed_runs(merge, spec["repeat"], spec["clips"] * spec["clip_seconds"], "audio_s")
+
+
+def run_normalize(spec: dict) -> dict:
+    from audio_merger import AudioMerger
+
+    source = Path(spec["workdir"]) / "source.mp3"
+    source.write_bytes(render_clip(spec["seconds"], "mp3"))
+    merger = AudioMerger()
+
+    def normalize(run: int) -> bool:
+        # Drop the loudness sidecar so every run measures as well as normalizes
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(f"{source}.loudness.json")
+        output = str(source.with_name(f"norm_{run}.mp3"))
+        return merger.normalize_audio(str(source), output) is not None
+
+    return timed_runs(normalize, spec["repeat"], spec["seconds"], "audio_s")
+
+
+CHILD_SCENARIOS = {"produce": run_produce, "merge": run_merge, "normalize": run_normalize}
+
+
+def run_child(spec: dict):
+    """Entry point of a scenario's child process: print one JSON result line."""
+    sys.path.insert(0, str(REPO_ROOT))
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        result = CHILD_SCENARIOS[spec["scenario"]](spec)
+    result["peak_rss_mb"] = rusage_mb(resource.RUSAGE_SELF)
+    result["ffmpeg_peak_rss_mb"] = rusage_mb(resource.RUSAGE_CHILDREN)
+    print(json.dumps(result))
+
+
+def in_child(spec: dict) -> dict:
+    """Run a pipeline scenario in a fresh interpreter and return its metrics."""
+    with tempfile.TemporaryDirectory(prefix=f"e2e-{spec['scenario']}-") as workdir:
+        result = subprocess.run(
+            [sys.executable, __file__, "--child", json.dumps({**spec, "workdir": workdir})],
+            capture_output=True, text=True
+        )
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else
+                f"exit status {result.returncode}"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+# Scenario drivers (run in the parent)
+
+def bench_produce(args) -> List[dict]:
+    fake_args = [sys.executable, str(Path(__file__).with_name("fake_tts.py"))]
+    primary_port, fallback_port = free_port(), free_port()
+    primary = start_server(fake_args + [
+        "--port", str(primary_port), "--latency", args.latency,
+        "--error-rate", str(args.error_rate), "--throttle-rate", str(args.throttle_rate),
+        "--hang-rate", str(args.hang_rate), "--seed", str(args.seed)
+    ], REPO_ROOT, f"http://127.0.0.1:{primary_port}")
+    fallback = start_server(fake_args + [
+        "--port", str(fallback_port), "--latency", args.fallback_latency or args.latency,
+        "--error-rate", str(args.fallback_error_rate), "--seed", str(args.seed + 1)
+    ], REPO_ROOT, f"http://127.0.0.1:{fallback_port}")
+
+    def fake_stats() -> dict:
+        return {
+            name: requests.get(f"http://127.0.0.1:{port}/stats", timeout=5).json()
+            for name, port in (("primary", primary_port), ("fallback", fallback_port))
+        }
+
+    results = []
+    try:
+        for segments, concurrency, pipeline, scheduler in itertools.product(
+                args.segments, args.concurrency, args.pipelines, args.schedulers):
+            before = fake_stats()
+            params = {
+                "segments": segments, "concurrency": concurrency, "pipeline": pipeline,
+                "scheduler": scheduler,
+                "latency": args.latency, "error_rate": args.error_rate,
+                "throttle_rate": args.throttle_rate, "hang_rate": args.hang_rate
+            }
+            metrics = in_child({
+                "scenario": "produce", "segments": segments, "concurrency": concurrency,
+                "pipeline": pipeline, "scheduler": scheduler,
+                "primary": f"http://127.0.0.1:{primary_port}/tts",
+                "fallback": f"http://127.0.0.1:{fallback_port}/v1/audio/speech",
+                "timeout": args.tts_timeout, "repeat": args.repeat,
+                "template": str(args.config)
+            })
+            after = fake_stats()
+            for name in ("primary", "fallback"):
+                for key in ("requests", "errors", "throttled", "hung"):
+                    metrics[f"{name}_{key}"] = after[name][key] - before[name][key]
+            results.append({"scenario": "produce", "params": params, "metrics": metrics})
+    finally:
+        stop_server(primary)
+        stop_server(fallback)
+    return results
+
+
+def bench_merge(args) -> List[dict]:
+    return [
+        {
+            "scenario": "merge",
+            "params": {"engine": engine, "clips": clips, "clip_seconds": args.clip_seconds},
+            "metrics": in_child({"scenario": "merge", "engine": engine, "clips": clips,
+                                 "clip_seconds": args.clip_seconds, "repeat": args.repeat})
+        }
+        for engine in args.engines
+        for clips in args.merge_clips
+    ]
+
+
+def bench_normalize(args) -> List[dict]:
+    return [
+        {
+            "scenario": "normalize",
+            "params": {"seconds": seconds},
+            "metrics": in_child({"scenario": "normalize", "seconds": seconds,
+                                 "repeat": args.repeat})
+        }
+        for seconds in args.normalize_seconds
+    ]
+
+
+def bench_api(args) -> List[dict]:
+    results = []
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory(prefix="e2e-api-") as tmp:
+        workdir = Path(tmp)
+        for module in ("n8n_api_server.py", "audio_merger.py", "log_store.py", "metrics.py",
+                       "final.json"):
+            shutil.copy(REPO_ROOT / module, workdir / module)
+        (workdir / "audio_output").mkdir()
+        clip = render_clip(args.clip_seconds, "mp3")
+        for index in range(args.api_merge_inputs):
+            (workdir / "audio_output" / f"clip_{index:03d}.mp3").write_bytes(clip)
+        inputs = [f"audio_output/clip_{index:03d}.mp3" for index in range(args.api_merge_inputs)]
+
+        server = start_server(
+            [sys.executable, "-m", "uvicorn", "n8n_api_server:app",
+             "--port", str(port), "--log-level", "warning"],
+            workdir, base_url, {"PYTHONPATH": str(workdir)}
+        )
+
+        def get(path: str):
+            return lambda session, index: session.get(f"{base_url}{path}", timeout=60).ok
+
+        def merge_job(session, index) -> bool:
+            response = session.post(f"{base_url}/api/merge", timeout=60, json={
+                "files": inputs, "output": f"bench_{index}.mp3", "crossfade": 0.5
+            })
+            if response.status_code != 202:
+                return False
+            status_url = f"{base_url}{response.json()['status_url']}"
+            deadline = time.time() + 300
+            while time.time() < deadline:
+                job = session.get(status_url, timeout=60).json()["data"]
+                if job["status"] in ("completed", "failed"):
+                    return job["status"] == "completed"
+                time.sleep(0.02)
+            return False
+
+        endpoints = {
+            "GET /health": (get("/health"), args.api_requests),
+            "GET /api/config": (get("/api/config"), args.api_requests),
+            "GET /api/stats": (get("/api/stats"), args.api_requests),
+            "GET /api/output": (get("/api/output/clip_000.mp3"), args.api_requests),
+            "POST /api/merge": (merge_job, args.api_merge_jobs)
+        }
+        try:
+            for concurrency in args.concurrency:
+                for endpoint, (call, total) in endpoints.items():
+                    metrics = drive(call, concurrency, total)
+                    metrics["server_peak_rss_mb"] = process_peak_rss_mb(server.pid)
+                    results.append({
+                        "scenario": "api",
+                        "params": {"endpoint": endpoint, "concurrency": concurrency},
+                        "metrics": metrics
+                    })
+        finally:
+            stop_server(server)
+    return results
+
+
+def bench_tts(args) -> List[dict]:
+    rng = random.Random(args.seed)
+    server = None
+    if args.tts_service_url:
+        url = args.tts_service_url.rstrip("/")
+    else:
+        # Offline: the service itself on its deterministic local backend
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        server = start_server(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+             "--log-level", "warning"],
+            REPO_ROOT / "tts-service", url, {"TTS_BACKEND": "local"}
+        )
+
+    def synthesize(session, index) -> bool:
+        # Unique text per request so every call is a cache miss
+        words = " ".join(rng.choice(WORDS) for _ in range(20))
+        return session.post(f"{url}/tts", timeout=args.tts_timeout, json={
+            "text": f"Request {index} {time.time_ns()}. {words}.",
+            "lang": "en-US", "emotion": "neutral", "rate": "+0%"
+        }).ok
+
+    results = []
+    try:
+        for concurrency in args.concurrency:
+            metrics = drive(synthesize, concurrency, args.api_requests)
+            if server is not None:
+                metrics["server_peak_rss_mb"] = process_peak_rss_mb(server.pid)
+            results.append({
+                "scenario": "tts",
+                "params": {"backend": "local" if server else url, "concurrency": concurrency},
+                "metrics": metrics
+            })
+    finally:
+        if server is not None:
+            stop_server(server)
+    return results
+
+
+BENCHES = {
+    "produce": bench_produce, "merge": bench_merge, "normalize": bench_normalize,
+    "api": bench_api, "tts": bench_tts
+}
+
+
+def find_regressions(results: List[dict], baseline: List[dict], tolerance: float) -> List[dict]:
+    """
+    Metrics that got worse than the baseline by more than tolerance (a fraction).
+
+    A scenario that now errors out, a metric the baseline had but the
+    current run lacks (e.g. throughput once every run fails) and any rise
+    in failed_runs or errors always count, whatever the tolerance.
+    """
+    previous = {
+        json.dumps([entry["scenario"], entry["params"]], sort_keys=True): entry.get("metrics", {})
+        for entry in baseline
+    }
+    regressions = []
+    for entry in results:
+        old = previous.get(json.dumps([entry["scenario"], entry["params"]], sort_keys=True))
+        if not old:
+            continue
+        current = entry.get("metrics", {})
+
+        def regressed(name: str, before, value):
+            regressions.append({
+                "scenario": entry["scenario"], "params": entry["params"],
+                "metric": name, "baseline": before, "current": value
+            })
+
+        if "error" in current and "error" not in old:
+            regressed("error", None, current["error"])
+        for name, before in old.items():
+            if name not in current and name != "error":
+                regressed(name, before, None)
+        for name, value in current.items():
+            before = old.get(name)
+            if not isinstance(value, (int, float)) or not isinstance(before, (int, float)):
+                continue
+            if name in ("failed_runs", "errors"):
+                worse = value > before
+            elif not before:
+                continue
+            elif name.startswith("throughput"):
+                worse = value < before * (1 - tolerance)
+            elif name.endswith(("_ms", "_s", "_mb")):
+                worse = value > before * (1 + tolerance)
+            else:
+                continue
+            if worse:
+                regressed(name, before, value)
+    return regressions
+
+
+def int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help="Comma-separated scenarios to run")
+    parser.add_argument("--segments", type=int_list, default=[8, 32],
+                        help="Song sizes (segments, four per part) for produce")
+    parser.add_argument("--concurrency", type=int_list, default=[1, 8],
+                        help="Concurrency levels for produce, api and tts")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per pipeline scenario (p50/p99 are over runs)")
+    parser.add_argument("--config", type=Path, default=REPO_ROOT / "final.json",
+                        help="Config template for produce (parts are replaced)")
+    parser.add_argument("--latency", default="lognormal:0.2:0.5",
+                        help="Primary fake TTS latency (see fake_tts.py)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--fallback-latency", help="Fallback latency (default: --latency)")
+    parser.add_argument("--fallback-error-rate", type=float, default=0.0)
+    parser.add_argument("--tts-timeout", type=float, default=10.0)
+    parser.add_argument("--engines", default="pydub,pcm,ffmpeg",
+                        help="Merge engines for the merge scenario")
+    parser.add_argument("--pipelines", default="files,memory",
+                        help="Merge pipelines for the produce scenario")
+    parser.add_argument("--schedulers", default="phased,graph",
+                        help="Build schedulers for the produce scenario")
+    parser.add_argument("--merge-clips", type=int_list, default=[8, 32])
+    parser.add_argument("--clip-seconds", type=int, default=10)
+    parser.add_argument("--normalize-seconds", type=int_list, default=[60, 240])
+    parser.add_argument("--api-requests", type=int, default=200,
+                        help="Requests per endpoint and concurrency level")
+    parser.add_argument("--api-merge-jobs", type=int, default=8)
+    parser.add_argument("--api-merge-inputs", type=int, default=4)
+    parser.add_argument("--tts-service-url", help="Running tts-service to benchmark (default: start one on the local backend)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative slowdown before a metric is a regression")
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(json.loads(args.child))
+        return
+
+    args.engines = [engine for engine in args.engines.split(",") if engine]
+    args.pipelines = [pipeline for pipeline in args.pipelines.split(",") if pipeline]
+    args.schedulers = [scheduler for scheduler in args.schedulers.split(",") if scheduler]
+    results = []
+    for scenario in args.scenarios.split(","):
+        print(f"Running {scenario}...", file=sys.stderr)
+        results.extend(BENCHES[scenario](args))
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "commit": subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                     capture_output=True, text=True).stdout.strip() or None
+        },
+        "results": results
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = find_regressions(results, json.load(f)["results"],
+                                                     args.tolerance)
+
+    body = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(body + "\n")
+    else:
+        print(body)
+
+    if report.get("regressions"):
+        for regression in report["regressions"]:
+            print(f"Regression: {regression['scenario']} {regression['params']} "
+                  f"{regression['metric']} {regression['baseline']} -> {regression['current']}",
+                  file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
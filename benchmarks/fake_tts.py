@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Fake TTS Server
+Stand-in for the Edge and Orpheus TTS endpoints, for offline benchmarks.
+
+Speaks both payload formats AudioGenerator emits: Edge-style bodies
+({"text", "lang", "emotion", "rate"}) get an MP3 clip, Orpheus-style
+bodies ({"input", "model", "voice", "response_format"}) get a WAV clip
+(or MP3 when asked for). POST .../batch answers with the length-prefixed
+frames of tts-service's /tts/batch. Clips are sine tones whose length
+follows the word count, rendered once per length with FFmpeg.
+
+Every request waits for a delay drawn from --latency, then may be failed
+on purpose:
+    fixed:SECONDS
+    uniform:LOW:HIGH
+    lognormal:MEDIAN:SIGMA
+    exp:MEAN
+
+GET /stats reports what was served and injected.
+
+Usage:
+    python3 benchmarks/fake_tts.py --port 8880
+    python3 benchmarks/fake_tts.py --port 5005 --latency lognormal:0.4:0.6 --error-rate 0.05
+"""
+
+import argparse
+import json
+import math
+import random
+import struct
+import subprocess
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Tuple
+
+BATCH_FRAME_HEADER = struct.Struct(">BI")
+WORDS_PER_SECOND = 2.5
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Turn a latency spec such as "lognormal:0.3:0.5" into a sampler."""
+    kind, _, args = spec.partition(":")
+    values = [float(value) for value in args.split(":") if value]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    if kind == "exp" and len(values) == 1:
+        return lambda rng: rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    raise ValueError(f"Invalid latency spec: {spec}")
+
+
+def render_clip(seconds: int, audio_format: str, sample_rate: int = 44100) -> bytes:
+    """Render a stereo sine tone of the given length with FFmpeg."""
+    result = subprocess.run(
+        ["ffmpeg", "-v", "error", "-f", "lavfi",
+         "-i", f"sine=frequency=440:duration={seconds}:sample_rate={sample_rate}",
+         "-ac", "2", "-f", audio_format, "-"],
+        capture_output=True, check=True
+    )
+    return result.stdout
+
+
+class FakeTTS:
+    """Latency/failure model and clip store shared by all request threads."""
+
+    def __init__(self, latency: str = "fixed:0.05", error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, hang_rate: float = 0.0,
+                 hang_seconds: float = 120.0, max_clip_seconds: int = 30,
+                 seed: int = 0):
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.max_clip_seconds = max_clip_seconds
+        self._rng = random.Random(seed)
+        self._clips: Dict[Tuple[int, str], bytes] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "requests": 0, "edge": 0, "orpheus": 0, "batch_items": 0,
+            "errors": 0, "throttled": 0, "hung": 0, "bytes": 0
+        }
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def clip(self, text: str, audio_format: str) -> bytes:
+        """Audio for text: about WORDS_PER_SECOND words per second of tone."""
+        seconds = max(1, min(self.max_clip_seconds, round(len(text.split()) / WORDS_PER_SECOND)))
+        key = (seconds, audio_format)
+        with self._lock:
+            data = self._clips.get(key)
+        if data is None:
+            data = render_clip(seconds, audio_format)
+            with self._lock:
+                self._clips[key] = data
+        return data
+
+    def fault(self) -> Tuple[float, int]:
+        """Draw this request's delay and injected status (200 = none)."""
+        with self._lock:
+            delay = max(0.0, self.sample_latency(self._rng))
+            roll = self._rng.random()
+        if roll < self.hang_rate:
+            self.count("hung")
+            return self.hang_seconds, 200
+        roll -= self.hang_rate
+        if roll < self.error_rate:
+            self.count("errors")
+            return delay, 503
+        roll -= self.error_rate
+        if roll < self.throttle_rate:
+            self.count("throttled")
+            return delay, 429
+        return delay, 200
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serves single and batch synthesis requests from the server's FakeTTS."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        fake = self.server.fake
+        if self.path.startswith("/stats"):
+            with fake._lock:
+                body = json.dumps(fake.stats).encode("utf-8")
+            self._send(200, body)
+        elif self.path.startswith("/health"):
+            self._send(200, b'{"status": "ok"}')
+        else:
+            self._send(404, b'{"detail": "Not Found"}')
+
+    def do_POST(self):
+        fake = self.server.fake
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send(400, b'{"detail": "invalid JSON"}')
+            return
+        fake.count("requests")
+
+        delay, status = fake.fault()
+        time.sleep(delay)
+        if status != 200:
+            self._send(status, json.dumps({"detail": "injected failure"}).encode("utf-8"))
+            return
+
+        if self.path.split("?")[0].endswith("/batch"):
+            frames = []
+            for item in payload.get("items", []):
+                audio = fake.clip(item.get("text", ""), "mp3")
+                frames.append(BATCH_FRAME_HEADER.pack(0, len(audio)) + audio)
+            fake.count("batch_items", len(frames))
+            body = b"".join(frames)
+            content_type = "application/x-tts-batch"
+        elif "input" in payload:
+            fake.count("orpheus")
+            audio_format = "mp3" if payload.get("response_format") == "mp3" else "wav"
+            body = fake.clip(payload["input"], audio_format)
+            content_type = f"audio/{'mpeg' if audio_format == 'mp3' else 'wav'}"
+        elif "text" in payload:
+            fake.count("edge")
+            body = fake.clip(payload["text"], "mp3")
+            content_type = "audio/mpeg"
+        else:
+            self._send(400, b'{"detail": "expected an Edge or Orpheus payload"}')
+            return
+
+        fake.count("bytes", len(body))
+        self._send(200, body, content_type)
+
+
+def serve(port: int, host: str = "127.0.0.1", **options) -> ThreadingHTTPServer:
+    """Create a fake TTS server (call serve_forever() to run it)."""
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.fake = FakeTTS(**options)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8880)
+    parser.add_argument("--latency", default="fixed:0.05",
+                        help="Latency distribution (see module docstring)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with 429")
+    parser.add_argument("--hang-rate", type=float, default=0.0,
+                        help="Fraction of requests held for --hang-seconds (client timeouts)")
+    parser.add_argument("--hang-seconds", type=float, default=120.0)
+    parser.add_argument("--max-clip-seconds", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = serve(
+        args.port, args.host,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        hang_rate=args.hang_rate,
+        hang_seconds=args.hang_seconds,
+        max_clip_seconds=args.max_clip_seconds,
+        seed=args.seed
+    )
+    print(f"Fake TTS listening on http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+Append-only log store for the status and error logs.
+
+Entries are JSON lines. Every segment file has a sidecar byte-offset index
+(``<segment>.idx``, one 8-byte big-endian offset per entry), so reading any
+window of entries costs one index read plus one data read, no matter how much
+history precedes it. Each entry is addressed by a monotonically increasing
+sequence number that serves as the pagination cursor.
+
+When the active file grows past ``max_bytes`` it is rotated to
+``<stem>.<first_seq><suffix>``. Once more than ``max_segments`` rotated
+segments exist they are compacted into one, optionally keeping only the newest
+``retain`` entries.
+
+The same interface is available on top of SQLite via ``SQLiteLogStore``.
+
+Usage:
+    store = open_log_store("audio_output/status_log.json")
+    store.append({"status": "completed", "recorded_at": "..."})
+    entries, next_cursor = store.read(limit=50)            # newest 50
+    entries, next_cursor = store.read(cursor=next_cursor)  # newer ones
+"""
+
+import bisect
+import json
+import os
+import re
+import sqlite3
+import struct
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+OFFSET = struct.Struct(">Q")
+
+
+class _Segment:
+    """One JSONL data file plus its byte-offset index."""
+    
+    def __init__(self, path: Path, first_seq: int):
+        self.path = path
+        self.index_path = Path(f"{path}.idx")
+        self.first_seq = first_seq
+        self.count = 0
+        self.size = 0
+        self._needs_newline = False
+        self._sync_index()
+    
+    @property
+    def next_seq(self) -> int:
+        return self.first_seq + self.count
+    
+    def _sync_index(self):
+        """Bring the index up to date with the data file, rebuilding it if stale."""
+        self.size = self.path.stat().st_size if self.path.exists() else 0
+        indexed = self.index_path.stat().st_size // OFFSET.size if self.index_path.exists() else 0
+        
+        scan_from = 0
+        if indexed:
+            with open(self.index_path, "rb") as index:
+                index.seek((indexed - 1) * OFFSET.size)
+                last_offset = OFFSET.unpack(index.read(OFFSET.size))[0]
+            if last_offset < self.size and self._starts_line(last_offset):
+                with open(self.path, "rb") as data:
+                    data.seek(last_offset)
+                    line = data.readline()
+                if line.endswith(b"\n"):
+                    scan_from = last_offset + len(line)
+                else:
+                    indexed -= 1
+                    scan_from = last_offset
+            else:
+                indexed = 0
+        
+        new_offsets = []
+        if self.size > scan_from:
+            with open(self.path, "rb") as data:
+                data.seek(scan_from)
+                offset = scan_from
+                for line in data:
+                    if not line.endswith(b"\n"):
+                        # Torn write at the end of the file; never indexed
+                        self._needs_newline = True
+                        break
+                    if line.strip():
+                        new_offsets.append(offset)
+                    offset += len(line)
+        
+        with open(self.index_path, "r+b" if self.index_path.exists() else "wb") as index:
+            index.truncate(indexed * OFFSET.size)
+            index.seek(indexed * OFFSET.size)
+            index.write(b"".join(OFFSET.pack(o) for o in new_offsets))
+        self.count = indexed + len(new_offsets)
+    
+    def _starts_line(self, offset: int) -> bool:
+        if offset == 0:
+            return True
+        with open(self.path, "rb") as data:
+            data.seek(offset - 1)
+            return data.read(1) == b"\n"
+    
+    def offsets(self, start: int, stop: int) -> List[int]:
+        """Byte offsets of entries [start, stop) within this segment."""
+        if stop <= start:
+            return []
+        with open(self.index_path, "rb") as index:
+            index.seek(start * OFFSET.size)
+            raw = index.read((stop - start) * OFFSET.size)
+        return [OFFSET.unpack_from(raw, i)[0] for i in range(0, len(raw), OFFSET.size)]
+    
+    def read(self, start: int, stop: int) -> List[dict]:
+        """Decode entries [start, stop) with a single contiguous data read."""
+        offsets = self.offsets(start, stop)
+        if not offsets:
+            return []
+        end = self.offsets(stop, stop + 1)
+        end = end[0] if end else self.size
+        with open(self.path, "rb") as data:
+            data.seek(offsets[0])
+            raw = data.read(end - offsets[0])
+        
+        entries = []
+        bounds = [o - offsets[0] for o in offsets] + [len(raw)]
+        for begin, finish in zip(bounds, bounds[1:]):
+            line = raw[begin:finish].split(b"\n", 1)[0]
+            entries.append(json.loads(line))
+        return entries
+    
+    def append(self, line: bytes):
+        """Append one encoded entry (without trailing newline)."""
+        with open(self.path, "ab") as data:
+            if self._needs_newline:
+                data.write(b"\n")
+                self.size += 1
+                self._needs_newline = False
+            data.write(line + b"\n")
+        with open(self.index_path, "ab") as index:
+            index.write(OFFSET.pack(self.size))
+        self.size += len(line) + 1
+        self.count += 1
+    
+    def remove(self):
+        for path in (self.path, self.index_path):
+            if path.exists():
+                path.unlink()
+
+
+class JsonlLogStore:
+    """Indexed, rotating JSONL log store."""
+    
+    def __init__(self,
+                 path: str,
+                 max_bytes: int = 10 * 1024 * 1024,
+                 max_segments: int = 5,
+                 retain: Optional[int] = None,
+                 time_field: str = "recorded_at",
+                 on_change: Optional[Callable[[str], None]] = None):
+        """
+        Open (or create) a log store.
+        
+        Args:
+            path: Active log file, e.g. audio_output/status_log.json
+            max_bytes: Rotate the active file once it reaches this size (0 = never)
+            max_segments: Compact rotated segments once there are more than this
+            retain: Keep only this many rotated entries when compacting (None = all)
+            time_field: Entry field holding the ISO timestamp used by ``since``
+            on_change: Called with the path of every file an append, rotation
+                or compaction wrote, created or removed
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.max_segments = max_segments
+        self.retain = retain
+        self.time_field = time_field
+        self.on_change = on_change
+        self.meta_path = Path(f"{path}.meta")
+        self._lock = threading.Lock()
+        self._pattern = re.compile(
+            re.escape(self.path.stem) + r"\.(\d{12})" + re.escape(self.path.suffix) + "$"
+        )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self._rotated = []
+        for candidate in sorted(self.path.parent.iterdir()):
+            match = self._pattern.match(candidate.name)
+            if match:
+                self._rotated.append(_Segment(candidate, int(match.group(1))))
+        self._active = _Segment(self.path, self._active_first_seq())
+    
+    def _active_first_seq(self) -> int:
+        if self.meta_path.exists():
+            with open(self.meta_path, "r") as f:
+                return json.load(f)["first_seq"]
+        return self._rotated[-1].next_seq if self._rotated else 0
+    
+    def _write_meta(self):
+        tmp_path = Path(f"{self.meta_path}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"first_seq": self._active.first_seq}, f)
+        os.replace(tmp_path, self.meta_path)
+    
+    def _rotated_path(self, first_seq: int) -> Path:
+        return self.path.with_name(f"{self.path.stem}.{first_seq:012d}{self.path.suffix}")
+    
+    @property
+    def _segments(self) -> List[_Segment]:
+        return self._rotated + [self._active]
+    
+    def _files(self) -> Set[Path]:
+        """Every file the store currently owns."""
+        files = {self.meta_path}
+        for segment in self._segments:
+            files.update((segment.path, segment.index_path))
+        return files
+    
+    def _notify(self, paths: Iterable[Path]):
+        if self.on_change is not None:
+            for path in paths:
+                self.on_change(str(path))
+    
+    @property
+    def first_seq(self) -> int:
+        return self._segments[0].first_seq
+    
+    @property
+    def next_seq(self) -> int:
+        return self._active.next_seq
+    
+    def count(self) -> int:
+        """Number of entries currently stored."""
+        with self._lock:
+            return self.next_seq - self.first_seq
+    
+    def append(self, entry: dict) -> int:
+        """
+        Append an entry.
+        
+        Args:
+            entry: JSON-serialisable dict
+        
+        Returns:
+            Sequence number assigned to the entry
+        """
+        line = json.dumps(entry).encode("utf-8")
+        with self._lock:
+            seq = self.next_seq
+            self._active.append(line)
+            changed = {self._active.path, self._active.index_path}
+            if self.max_bytes and self._active.size >= self.max_bytes:
+                changed |= self._files()
+                self._rotate()
+                changed |= self._files()
+        self._notify(changed)
+        return seq
+    
+    def _rotate(self):
+        """Move the active file aside and start a new one."""
+        active = self._active
+        rotated_path = self._rotated_path(active.first_seq)
+        os.replace(active.path, rotated_path)
+        os.replace(active.index_path, f"{rotated_path}.idx")
+        self._rotated.append(_Segment(rotated_path, active.first_seq))
+        self._active = _Segment(self.path, active.next_seq)
+        self._write_meta()
+        
+        if len(self._rotated) > self.max_segments:
+            self._compact()
+    
+    def compact(self, retain: Optional[int] = None):
+        """
+        Merge all rotated segments into one.
+        
+        Args:
+            retain: Keep only the newest N rotated entries (default: store setting)
+        """
+        with self._lock:
+            changed = self._files()
+            self._compact(retain)
+            changed |= self._files()
+        self._notify(changed)
+    
+    def _compact(self, retain: Optional[int] = None):
+        retain = self.retain if retain is None else retain
+        if not self._rotated:
+            return
+        first_seq = self._rotated[0].first_seq
+        last_seq = self._rotated[-1].next_seq
+        keep_from = max(first_seq, last_seq - retain) if retain is not None else first_seq
+        
+        if keep_from == last_seq:
+            for segment in self._rotated:
+                segment.remove()
+            self._rotated = []
+            return
+        
+        merged_path = self._rotated_path(keep_from)
+        tmp_path = Path(f"{merged_path}.tmp")
+        tmp_index = Path(f"{merged_path}.idx.tmp")
+        written = 0
+        with open(tmp_path, "wb") as data, open(tmp_index, "wb") as index:
+            for segment in self._rotated:
+                start = max(keep_from, segment.first_seq) - segment.first_seq
+                if start >= segment.count:
+                    continue
+                offsets = segment.offsets(start, segment.count)
+                base = offsets[0]
+                # Copy raw bytes; offsets shift by the same delta
+                index.write(b"".join(OFFSET.pack(o - base + written) for o in offsets))
+                with open(segment.path, "rb") as source:
+                    source.seek(base)
+                    chunk = source.read(segment.size - base)
+                if not chunk.endswith(b"\n"):
+                    chunk += b"\n"
+                data.write(chunk)
+                written += len(chunk)
+        
+        os.replace(tmp_path, merged_path)
+        os.replace(tmp_index, f"{merged_path}.idx")
+        for segment in self._rotated:
+            if segment.path != merged_path:
+                segment.remove()
+        self._rotated = [_Segment(merged_path, keep_from)]
+    
+    def _locate(self, seq: int) -> Tuple[int, int]:
+        """Map a sequence number to (segment index, position in segment)."""
+        starts = [segment.first_seq for segment in self._segments]
+        index = bisect.bisect_right(starts, seq) - 1
+        return index, seq - starts[index]
+    
+    def _entry(self, seq: int) -> dict:
+        index, position = self._locate(seq)
+        return self._segments[index].read(position, position + 1)[0]
+    
+    def _seek_time(self, since: str) -> int:
+        """First sequence number whose timestamp is >= since (binary search)."""
+        low, high = self.first_seq, self.next_seq
+        while low < high:
+            middle = (low + high) // 2
+            if str(self._entry(middle).get(self.time_field, "")) < since:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+    
+    def read(self,
+             cursor: Optional[int] = None,
+             since: Optional[str] = None,
+             limit: int = 100) -> Tuple[List[dict], int]:
+        """
+        Read a page of entries.
+        
+        With a cursor, returns entries from that sequence number onwards. With
+        ``since``, returns entries recorded at or after that ISO timestamp.
+        With neither, returns the newest ``limit`` entries (a tail read).
+        
+        Args:
+            cursor: Sequence number to resume from (from a previous next_cursor)
+            since: ISO timestamp lower bound, matched against ``time_field``
+            limit: Maximum number of entries to return
+        
+        Returns:
+            (entries, next_cursor). Each entry carries its ``seq``; next_cursor
+            is the sequence number to pass to the following read.
+        """
+        with self._lock:
+            if cursor is not None:
+                start = cursor
+            elif since is not None:
+                start = self._seek_time(since)
+            else:
+                start = self.next_seq - limit
+            start = max(start, self.first_seq)
+            stop = min(start + limit, self.next_seq)
+            
+            entries = []
+            seq = start
+            while seq < stop:
+                index, position = self._locate(seq)
+                segment = self._segments[index]
+                take = min(stop - seq, segment.count - position)
+                for offset, entry in enumerate(segment.read(position, position + take)):
+                    entry["seq"] = seq + offset
+                    entries.append(entry)
+                seq += take
+            return entries, max(stop, start)
+
+
+class SQLiteLogStore:
+    """SQLite-backed log store with the same interface as JsonlLogStore."""
+    
+    def __init__(self,
+                 path: str,
+                 retain: Optional[int] = None,
+                 time_field: str = "recorded_at",
+                 on_change: Optional[Callable[[str], None]] = None,
+                 **_ignored):
+        """
+        Open (or create) a SQLite log store.
+        
+        Args:
+            path: Database file, e.g. audio_output/status_log.sqlite3
+            retain: Keep only this many newest entries when compacting (None = all)
+            time_field: Entry field holding the ISO timestamp used by ``since``
+            on_change: Called with the path of each database file (including
+                the WAL) after an append or compaction
+        """
+        self.path = path
+        self.retain = retain
+        self.time_field = time_field
+        self.on_change = on_change
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, recorded_at TEXT, data TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_recorded_at ON entries (recorded_at)")
+        self._db.commit()
+    
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    
+    def _notify(self):
+        if self.on_change is not None:
+            for suffix in ("", "-wal", "-shm"):
+                self.on_change(f"{self.path}{suffix}")
+    
+    def append(self, entry: dict) -> int:
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO entries (recorded_at, data) VALUES (?, ?)",
+                (entry.get(self.time_field), json.dumps(entry))
+            )
+            self._db.commit()
+        self._notify()
+        # AUTOINCREMENT starts at 1; expose 0-based sequence numbers
+        return cursor.lastrowid - 1
+    
+    def compact(self, retain: Optional[int] = None):
+        retain = self.retain if retain is None else retain
+        with self._lock:
+            if retain is not None:
+                self._db.execute(
+                    "DELETE FROM entries WHERE seq <= (SELECT MAX(seq) FROM entries) - ?",
+                    (retain,)
+                )
+                self._db.commit()
+            self._db.execute("VACUUM")
+        self._notify()
+    
+    def read(self,
+             cursor: Optional[int] = None,
+             since: Optional[str] = None,
+             limit: int = 100) -> Tuple[List[dict], int]:
+        with self._lock:
+            if cursor is not None:
+                rows = self._db.execute(
+                    "SELECT seq, data FROM entries WHERE seq > ? ORDER BY seq LIMIT ?",
+                    (cursor, limit)
+                ).fetchall()
+            elif since is not None:
+                rows = self._db.execute(
+                    "SELECT seq, data FROM entries WHERE recorded_at >= ? ORDER BY seq LIMIT ?",
+                    (since, limit)
+                ).fetchall()
+            else:
+                rows = self._db.execute(
+                    "SELECT seq, data FROM entries ORDER BY seq DESC LIMIT ?",
+                    (limit,)
+                ).fetchall()[::-1]
+            
+            entries = []
+            for seq, data in rows:
+                entry = json.loads(data)
+                entry["seq"] = seq - 1
+                entries.append(entry)
+            if entries:
+                next_cursor = entries[-1]["seq"] + 1
+            else:
+                last = self._db.execute("SELECT MAX(seq) FROM entries").fetchone()[0] or 0
+                next_cursor = cursor if cursor is not None else last
+            return entries, next_cursor
+
+
+BACKENDS: Dict[str, type] = {
+    "jsonl": JsonlLogStore,
+    "sqlite": SQLiteLogStore,
+}
+
+
+def open_log_store(path: str, backend: str = "jsonl", **options):
+    """
+    Open a log store.
+    
+    Args:
+        path: Log file path; the sqlite backend swaps the suffix for .sqlite3
+        backend: "jsonl" (indexed JSON lines) or "sqlite"
+        **options: Backend options (max_bytes, max_segments, retain, time_field,
+            on_change)
+    
+    Returns:
+        JsonlLogStore or SQLiteLogStore
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown log store backend: {backend}")
+    if backend == "sqlite":
+        path = str(Path(path).with_suffix(".sqlite3"))
+    return BACKENDS[backend](path, **options)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Prometheus metrics shared by audio_merger.py and n8n_api_server.py.
+
+Collectors are module-level so every AudioGenerator, AudioMerger and the API
+server in one process report into the same registry. prometheus_client is
+optional: without it every collector is a no-op and render() reports that
+metrics are disabled.
+
+Merge jobs run in worker processes; set PROMETHEUS_MULTIPROC_DIR to an empty
+directory before starting the API server to aggregate their samples.
+
+Usage:
+    from metrics import TTS_RETRIES, stage
+    TTS_RETRIES.labels(endpoint=url).inc()
+    with stage("pcm", "export"):
+        ...
+"""
+
+import contextlib
+import os
+from typing import Tuple
+
+try:
+    from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry,
+                                   Counter, Gauge, Histogram, generate_latest)
+    from prometheus_client import multiprocess
+except ImportError:  # Optional: metrics become no-ops
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    Counter = Gauge = Histogram = None
+
+ENABLED = Counter is not None
+
+
+class _NoopMetric:
+    """Stand-in accepting the prometheus_client collector API."""
+    
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+    
+    def inc(self, amount: float = 1) -> None:
+        pass
+    
+    def dec(self, amount: float = 1) -> None:
+        pass
+    
+    def set(self, value: float) -> None:
+        pass
+    
+    def observe(self, value: float) -> None:
+        pass
+    
+    def time(self):
+        return contextlib.nullcontext()
+    
+    def track_inprogress(self):
+        return contextlib.nullcontext()
+
+
+def _metric(kind, name: str, documentation: str, labelnames=(), **kwargs):
+    if not ENABLED:
+        return _NoopMetric()
+    return kind(name, documentation, labelnames, **kwargs)
+
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+
+# TTS generation (AudioGenerator)
+TTS_REQUEST_SECONDS = _metric(
+    Histogram, "tts_request_seconds",
+    "TTS request latency per endpoint and attempt",
+    ("endpoint", "attempt", "outcome"), buckets=LATENCY_BUCKETS)
+TTS_RETRIES = _metric(
+    Counter, "tts_retries_total", "TTS request retries", ("endpoint",))
+TTS_FALLBACKS = _metric(
+    Counter, "tts_fallbacks_total", "Segments sent to the fallback after the primary failed")
+TTS_HEDGES = _metric(
+    Counter, "tts_hedges_total", "Hedged TTS requests", ("result",))
+TTS_CACHE_EVENTS = _metric(
+    Counter, "tts_cache_events_total", "TTS cache hits, misses and evictions", ("event",))
+TTS_BYTES = _metric(
+    Counter, "tts_bytes_downloaded_total", "Audio bytes received from TTS endpoints", ("endpoint",))
+TTS_IN_FLIGHT = _metric(
+    Gauge, "tts_requests_in_flight", "TTS requests currently in flight", ("endpoint",),
+    multiprocess_mode="livesum")
+TTS_CONCURRENCY_LIMIT = _metric(
+    Gauge, "tts_concurrency_limit", "Adaptive concurrency limit per endpoint", ("endpoint",),
+    multiprocess_mode="liveall")
+TTS_CIRCUIT_STATE = _metric(
+    Gauge, "tts_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)",
+    ("endpoint",), multiprocess_mode="liveall")
+
+# Merging (AudioMerger)
+MERGE_STAGE_SECONDS = _metric(
+    Histogram, "merge_stage_seconds",
+    "Time spent per merge stage (decode, crossfade, export, normalize, ...)",
+    ("engine", "stage"), buckets=LATENCY_BUCKETS)
+MERGE_BYTES_WRITTEN = _metric(
+    Counter, "merge_bytes_written_total", "Bytes written by merge and normalize outputs", ("engine",))
+
+# API server
+HTTP_REQUEST_SECONDS = _metric(
+    Histogram, "http_request_seconds", "API request latency",
+    ("method", "route", "status"), buckets=LATENCY_BUCKETS)
+HTTP_IN_FLIGHT = _metric(
+    Gauge, "http_requests_in_flight", "API requests currently being handled",
+    multiprocess_mode="livesum")
+MERGE_JOBS = _metric(
+    Gauge, "merge_jobs", "Merge jobs by status", ("status",), multiprocess_mode="liveall")
+
+
+def stage(engine: str, name: str):
+    """Context manager timing one merge stage."""
+    return MERGE_STAGE_SECONDS.labels(engine=engine, stage=name).time()
+
+
+def render() -> Tuple[bytes, str]:
+    """
+    Render all metrics in the Prometheus text format.
+    
+    Returns:
+        (body, content type)
+    """
+    if not ENABLED:
+        return b"# metrics disabled: prometheus_client is not installed\n", CONTENT_TYPE_LATEST
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def dump(path: str):
+    """Write all metrics to path ("-" for stdout)."""
+    body, _ = render()
+    if path == "-":
+        print(body.decode("utf-8"), end="")
+        return
+    with open(path, "wb") as f:
+        f.write(body)
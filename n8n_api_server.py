@@ -5,25 +5,40 @@ Provides endpoints for n8n workflow to generate and merge audio files.
 
 API Endpoints:
 - GET  /api/config - Return audio configuration
-- POST /api/merge - Merge audio files
+- POST /api/merge - Queue a merge job (202 + job id)
+- GET  /api/merge/{job_id} - Merge job status, progress, size and duration
 - POST /api/status - Update processing status
 - POST /api/error - Log errors
+- GET  /metrics - Prometheus metrics
 - GET  /health - Health check
 
 Usage:
     python3 n8n_api_server.py
 """
 
+import asyncio
+import hashlib
 import json
 import logging
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse, FileResponse
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, FileResponse, Response
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
+from email.utils import formatdate, parsedate_to_datetime
 from pathlib import Path
 import subprocess
-from typing import Optional
+from typing import List, Optional
+from pydantic import BaseModel
 import uvicorn
+from audio_merger import BuildManifest, run_merge_job
+from log_store import open_log_store
+import metrics
 
 # Setup logging
 logging.basicConfig(
@@ -43,25 +58,498 @@ app = FastAPI(
 CONFIG_FILE = "final.json"
 OUTPUT_DIR = "audio_output"
 SEGMENTS_DIR = "audio_segments"
+MERGE_WORKERS = int(os.environ.get("MERGE_WORKERS", 2))
+MERGE_MAX_PENDING = int(os.environ.get("MERGE_MAX_PENDING", 16))
+MERGE_JOB_TTL_SECONDS = float(os.environ.get("MERGE_JOB_TTL_SECONDS", 3600))
+MERGE_MAX_FINISHED = int(os.environ.get("MERGE_MAX_FINISHED", 256))
+STATS_RESCAN_SECONDS = float(os.environ.get("STATS_RESCAN_SECONDS", 60))
+CONFIG_CHECK_SECONDS = float(os.environ.get("CONFIG_CHECK_SECONDS", 1))
 
 # Create directories
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 os.makedirs(SEGMENTS_DIR, exist_ok=True)
 
+# Status and error logs (indexed, paginated, rotated; see log_store.py)
+LOG_STORE_OPTIONS = {
+    "max_bytes": int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024)),
+    "max_segments": int(os.environ.get("LOG_MAX_SEGMENTS", 5)),
+    "retain": int(os.environ["LOG_RETAIN"]) if os.environ.get("LOG_RETAIN") else None
+}
+LOG_STORE_BACKEND = os.environ.get("LOG_STORE_BACKEND", "jsonl")
+# Opened at startup, not on import: merge workers started with spawn re-import
+# the main module, and opening a store resyncs its index
+status_store = None
+error_store = None
+
 # Load configuration
+def validate_config(config) -> list:
+    """
+    Check the structure the API and merger rely on
+    
+    Returns:
+        List of problems (empty when the config is usable)
+    """
+    if not isinstance(config, dict):
+        return ["config must be a JSON object"]
+    
+    errors = []
+    parts = config.get("parts")
+    if not isinstance(parts, list):
+        errors.append("parts must be a list")
+        parts = []
+    for index, part in enumerate(parts):
+        if not isinstance(part, dict):
+            errors.append(f"parts[{index}] must be an object")
+            continue
+        for field in ("id", "outputFile"):
+            if not part.get(field):
+                errors.append(f"parts[{index}].{field} is required")
+        if not isinstance(part.get("segments"), list):
+            errors.append(f"parts[{index}].segments must be a list")
+    
+    merge_config = config.get("mergeConfiguration")
+    if not isinstance(merge_config, dict) or not merge_config.get("outputFile"):
+        errors.append("mergeConfiguration.outputFile is required")
+    return errors
+
+class ConfigCache:
+    """
+    Parsed final.json held in memory and reloaded when the file changes.
+    
+    A reload is detected by (mtime, inode, size), so both in-place edits and
+    atomic replaces are picked up. Each reload parses and validates the file
+    once and precomputes the /api/config and /api/config/parts response
+    bodies together with their ETag. The result is published as one snapshot
+    dict so readers never see a half-finished reload. The file is stat'ed at
+    most once per check_interval seconds, so requests in between are served
+    without touching the disk.
+    """
+    
+    EMPTY = {"config": None, "errors": [], "etag": None, "bodies": {}}
+    
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._key = None
+        self._checked_at = None
+        self.snapshot = self.EMPTY
+    
+    def _stat_key(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+    
+    def is_fresh(self) -> bool:
+        """True when the snapshot was checked against the file recently (no I/O)"""
+        checked_at = self._checked_at
+        return checked_at is not None and time.monotonic() - checked_at < self.check_interval
+    
+    def refresh(self):
+        """Reload the config if the file changed since the last load"""
+        with self._lock:
+            key = self._stat_key()
+            if key is None or key != self._key:
+                self.snapshot = self._load()
+                self._key = key
+            self._checked_at = time.monotonic()
+    
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+            config = json.loads(raw)
+        except Exception as e:
+            logger.error(f"Failed to load config: {e}")
+            return self.EMPTY
+        
+        errors = validate_config(config)
+        if errors:
+            logger.error(f"Invalid config {self.path}: {'; '.join(errors)}")
+            return {"config": config, "errors": errors, "etag": None, "bodies": {}}
+        
+        loaded_at = datetime.now().isoformat()
+        parts = config.get("parts", [])
+        bodies = {
+            "config": json.dumps({
+                "status": "ok",
+                "data": config,
+                "timestamp": loaded_at
+            }).encode("utf-8"),
+            "parts": json.dumps({
+                "status": "ok",
+                "parts": parts,
+                "count": len(parts),
+                "totalDuration": config.get("metadata", {}).get("totalDuration")
+            }).encode("utf-8")
+        }
+        logger.info(f"Configuration loaded from {self.path}")
+        return {
+            "config": config,
+            "errors": [],
+            "etag": '"' + hashlib.sha256(raw).hexdigest()[:32] + '"',
+            "bodies": bodies
+        }
+    
+    def get(self) -> dict:
+        """Return the current snapshot, reloading it first if needed"""
+        if not self.is_fresh():
+            self.refresh()
+        return self.snapshot
+
+config_cache = ConfigCache(CONFIG_FILE, CONFIG_CHECK_SECONDS)
+
 def load_config():
-    """Load audio configuration from final.json"""
+    """Load audio configuration from final.json (cached until the file changes)"""
+    return config_cache.get()["config"]
+
+async def config_response(request: Request, body: str) -> Response:
+    """Serve a precomputed config response body, honouring If-None-Match"""
+    # The stat (and any reload) runs in the threadpool, at most once per check interval
+    if config_cache.is_fresh():
+        snapshot = config_cache.snapshot
+    else:
+        snapshot = await run_in_threadpool(config_cache.get)
+    
+    if snapshot["config"] is None:
+        raise HTTPException(status_code=404, detail="Config file not found")
+    if snapshot["errors"]:
+        raise HTTPException(status_code=500, detail=f"Invalid config: {'; '.join(snapshot['errors'])}")
+    
+    etag = snapshot["etag"]
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot["bodies"][body], media_type="application/json", headers=headers)
+
+# File helpers
+# Handlers are async, so every disk access goes through these blocking helpers
+# via run_in_threadpool to keep a slow disk from stalling the event loop.
+def missing_files(files: list) -> list:
+    """Return the paths in files that do not exist"""
+    return [f for f in files if not os.path.exists(f)]
+
+# Output statistics
+class StatsTracker:
+    """
+    Incrementally maintained file counts and sizes for /api/stats.
+    
+    Every known file is held as path -> (size, kind) with per-kind totals kept
+    alongside, so reading stats is O(1). The server updates entries when it
+    writes or deletes outputs and whenever the status/error log stores append,
+    rotate or compact; a periodic rescan reconciles with changes made by other
+    processes (e.g. audio_merger.py).
+    """
+    
+    KINDS = ("segments", "parts", "finals", "other")
+    
+    def __init__(self, output_dir: str, segments_dir: str):
+        self.output_dir = output_dir
+        self.segments_dir = segments_dir
+        self._lock = threading.Lock()
+        self._files = {}
+        self._totals = {}
+        self._part_names = set()
+        self._final_names = set()
+        self._segment_names = set()
+        self.scanned_at = None
+        self.updated_at = None
+        self._reset_totals()
+    
+    def _reset_totals(self):
+        self._totals = {
+            "output_files": 0,
+            "segment_files": 0,
+            "output_bytes": 0,
+            "kinds": {kind: {"count": 0, "bytes": 0} for kind in self.KINDS}
+        }
+    
+    def load_names(self, config: Optional[dict]):
+        """Derive part, final and segment file names from the audio config"""
+        config = config or {}
+        parts = config.get("parts", [])
+        output_file = config.get("mergeConfiguration", {}).get("outputFile")
+        finals = set()
+        if output_file:
+            base, ext = os.path.splitext(output_file)
+            finals = {output_file, f"{base}_normalized{ext}"}
+        with self._lock:
+            self._part_names = {part.get("outputFile") for part in parts}
+            self._segment_names = {f"{part.get('id')}_{segment.get('id')}.mp3"
+                                   for part in parts for segment in part.get("segments", [])}
+            self._final_names = finals | self._final_names
+    
+    def add_final(self, path: str):
+        """Mark an output (e.g. a merge job result) as a final mix"""
+        with self._lock:
+            self._final_names.add(os.path.basename(path))
+    
+    def _kind(self, directory: str, name: str) -> str:
+        if directory == self.segments_dir or name in self._segment_names:
+            return "segments"
+        if name in self._part_names:
+            return "parts"
+        if name in self._final_names:
+            return "finals"
+        return "other"
+    
+    def _apply(self, entry: Optional[tuple], sign: int):
+        if entry is None:
+            return
+        size, kind, directory, is_mp3 = entry
+        totals = self._totals
+        if directory == self.output_dir:
+            totals["output_bytes"] += sign * size
+            if is_mp3:
+                totals["output_files"] += sign
+        elif is_mp3:
+            totals["segment_files"] += sign
+        if is_mp3:
+            totals["kinds"][kind]["count"] += sign
+            totals["kinds"][kind]["bytes"] += sign * size
+    
+    def _entry(self, directory: str, name: str, size: int) -> tuple:
+        return (size, self._kind(directory, name), directory, name.endswith('.mp3'))
+    
+    def record_write(self, path: str):
+        """Account for a file the server just wrote"""
+        directory, name = os.path.split(os.path.normpath(path))
+        if directory not in (self.output_dir, self.segments_dir):
+            return
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return self.record_delete(path)
+        with self._lock:
+            key = os.path.join(directory, name)
+            self._apply(self._files.get(key), -1)
+            self._files[key] = self._entry(directory, name, size)
+            self._apply(self._files[key], 1)
+            self.updated_at = datetime.now().isoformat()
+    
+    def record_delete(self, path: str):
+        """Account for a file the server just removed"""
+        key = os.path.normpath(path)
+        with self._lock:
+            self._apply(self._files.pop(key, None), -1)
+            self.updated_at = datetime.now().isoformat()
+    
+    def rescan(self):
+        """Rebuild from a single scandir pass over both directories"""
+        scanned = []
+        for directory in (self.output_dir, self.segments_dir):
+            if not os.path.isdir(directory):
+                continue
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        scanned.append((directory, entry.name, entry.stat().st_size))
+        
+        with self._lock:
+            self._files = {}
+            self._reset_totals()
+            for directory, name, size in scanned:
+                key = os.path.join(directory, name)
+                self._files[key] = self._entry(directory, name, size)
+                self._apply(self._files[key], 1)
+            self.scanned_at = self.updated_at = datetime.now().isoformat()
+    
+    def snapshot(self) -> dict:
+        """Current stats; O(1) regardless of the number of files"""
+        with self._lock:
+            totals = self._totals
+            return {
+                "output_files": totals["output_files"],
+                "segment_files": totals["segment_files"],
+                "output_dir_size": totals["output_bytes"] / (1024*1024),
+                "kinds": {kind: dict(values) for kind, values in totals["kinds"].items()},
+                "scanned_at": self.scanned_at,
+                "updated_at": self.updated_at,
+                "timestamp": datetime.now().isoformat()
+            }
+
+stats_tracker = StatsTracker(OUTPUT_DIR, SEGMENTS_DIR)
+stats_rescan_task = None
+
+async def rescan_stats_periodically():
+    """Reconcile the stats tracker with the filesystem every STATS_RESCAN_SECONDS"""
+    while True:
+        await asyncio.sleep(STATS_RESCAN_SECONDS)
+        try:
+            stats_tracker.load_names(await run_in_threadpool(load_config))
+            await run_in_threadpool(stats_tracker.rescan)
+        except Exception as e:
+            logger.error(f"Stats rescan failed: {e}")
+
+# Output file serving
+class OutputETags:
+    """
+    Strong ETags for files in OUTPUT_DIR.
+    
+    Uses the content hash recorded in audio_merger.py's build manifest when the
+    file is unchanged since it was built, otherwise hashes the file once and
+    remembers the result until its (mtime, size, inode) changes.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hashes = {}
+        self._manifest = None
+        self._manifest_key = None
+    
+    def _current_manifest(self) -> Optional[BuildManifest]:
+        config = load_config() or {}
+        manifest_file = config.get("buildConfiguration", {}).get("manifestFile", ".build_manifest.json")
+        path = os.path.join(OUTPUT_DIR, manifest_file)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key != self._manifest_key:
+                self._manifest = BuildManifest(path)
+                self._manifest_key = key
+            return self._manifest
+    
+    def etag(self, path: str, stat: os.stat_result) -> str:
+        """Return the quoted strong ETag for path"""
+        key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        with self._lock:
+            cached = self._hashes.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+        
+        manifest = self._current_manifest()
+        if manifest is not None:
+            digest = manifest.output_hash(path)
+        else:
+            digest = BuildManifest.hash_file(path)
+        etag = f'"{digest[:32]}"'
+        with self._lock:
+            self._hashes[path] = (key, etag)
+        return etag
+
+output_etags = OutputETags()
+
+def not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+# Merge jobs
+# Merges run in a process pool so decoding/encoding never blocks the event
+# loop; workers report progress through a manager dict shared with the server.
+# The worker function is audio_merger.run_merge_job, so a spawned worker
+# unpickles it without importing this server module.
+merge_executor: Optional[ProcessPoolExecutor] = None
+merge_manager = None
+merge_progress = None
+merge_jobs = {}
+merge_jobs_lock = threading.Lock()
+
+def merger_settings_from_config() -> dict:
+    """Build AudioMerger settings from the mergeConfiguration in final.json"""
+    config = load_config() or {}
+    merge_config = config.get("mergeConfiguration", {})
+    quality = merge_config.get("qualitySettings", {})
+    return {
+        "output_format": quality.get("format", "mp3"),
+        "bitrate": quality.get("bitrate", "192k"),
+        "sample_rate": quality.get("sampleRate", 44100),
+        "channels": quality.get("channels", 2),
+        "engine": merge_config.get("engine", "pydub")
+    }
+
+def pending_merge_jobs() -> int:
+    """Count merge jobs that are queued or running"""
+    return sum(1 for job in merge_jobs.values() if job["status"] in ("queued", "running"))
+
+def prune_merge_jobs():
+    """
+    Forget finished merge jobs older than MERGE_JOB_TTL_SECONDS, keeping
+    at most MERGE_MAX_FINISHED of the newest (call with merge_jobs_lock held)
+    """
+    finished = sorted(
+        (job["finished_at"], job_id) for job_id, job in merge_jobs.items()
+        if job["status"] in ("completed", "failed") and job["finished_at"]
+    )
+    cutoff = (datetime.now() - timedelta(seconds=MERGE_JOB_TTL_SECONDS)).isoformat()
+    excess = len(finished) - MERGE_MAX_FINISHED
+    for index, (finished_at, job_id) in enumerate(finished):
+        if index < excess or finished_at < cutoff:
+            del merge_jobs[job_id]
+
+def finish_merge_job(job_id: str, future):
+    """Record the outcome of a merge job once its worker returns"""
+    with merge_jobs_lock:
+        job = merge_jobs[job_id]
+        job["finished_at"] = datetime.now().isoformat()
+        if future.cancelled():
+            job["status"] = "failed"
+            job["error"] = "cancelled"
+            return
+        error = future.exception()
+        if error is not None:
+            job["status"] = "failed"
+            job["error"] = str(error)
+            logger.error(f"Merge job {job_id} failed: {error}")
+        else:
+            result = future.result()
+            job["status"] = "completed"
+            job["progress"] = 1.0
+            job["size"] = result["size"]
+            job["duration"] = result["duration"]
+            stats_tracker.add_final(result["output"])
+            stats_tracker.record_write(result["output"])
+            logger.info(f"Merge job {job_id} completed: {result['output']}")
+        prune_merge_jobs()
+    
     try:
-        with open(CONFIG_FILE, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load config: {e}")
-        return None
+        merge_progress.pop(job_id, None)
+    except Exception:
+        pass
+
+def merge_job_view(job: dict) -> dict:
+    """Merge job record with live progress from the worker"""
+    view = dict(job)
+    if job["status"] in ("queued", "running") and merge_progress is not None:
+        try:
+            reported = merge_progress.get(job["job_id"])
+        except Exception:
+            reported = None
+        if reported:
+            done, total = reported
+            view["status"] = "running"
+            view["progress"] = round(done / total, 3) if total else 0.0
+    return view
+
+def count_merge_jobs() -> dict:
+    """Merge jobs per status, with queued jobs the worker already started counted as running"""
+    with merge_jobs_lock:
+        jobs = list(merge_jobs.values())
+    counts = {status: 0 for status in ("queued", "running", "completed", "failed")}
+    for job in jobs:
+        counts[merge_job_view(job)["status"]] += 1
+    return counts
 
 # Models
-class MergeRequest:
+class MergeRequest(BaseModel):
     """Request model for merging audio files"""
-    files: list
+    files: List[str]
     output: str = "final_output.mp3"
     crossfade: float = 0.5
 
@@ -79,6 +567,50 @@ class ErrorLog:
     node: Optional[str] = None
     details: Optional[dict] = None
 
+# Metrics
+class RequestMetricsMiddleware:
+    """
+    Record in-flight requests and latency per route template
+    
+    Plain ASGI rather than @app.middleware("http"): call_next returns once
+    the headers are sent, which would leave the body of streamed responses
+    (/api/output) out of the latency and the in-flight gauge.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        started = time.monotonic()
+        status = 500
+        finished = None
+        
+        async def send_and_time(message):
+            nonlocal status, finished
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished = time.monotonic()
+        
+        with metrics.HTTP_IN_FLIGHT.track_inprogress():
+            try:
+                await self.app(scope, receive, send_and_time)
+            finally:
+                # Label by template (/api/merge/{job_id}) to keep cardinality bounded
+                route = scope.get("route")
+                metrics.HTTP_REQUEST_SECONDS.labels(
+                    method=scope["method"],
+                    route=getattr(route, "path", "unmatched"),
+                    status=str(status)
+                ).observe((finished or time.monotonic()) - started)
+
+app.add_middleware(RequestMetricsMiddleware)
+
 # Endpoints
 
 @app.get("/health")
@@ -91,82 +623,110 @@ async def health_check():
     }
 
 @app.get("/api/config")
-async def get_config():
+async def get_config(request: Request):
     """
     Get audio configuration
     
     Returns:
-        Configuration from final.json with all parts and segments
+        Configuration from final.json with all parts and segments; 304 when
+        If-None-Match matches the current ETag
     """
-    config = load_config()
-    
-    if not config:
-        raise HTTPException(status_code=404, detail="Config file not found")
-    
-    logger.info("Configuration retrieved")
-    return {
-        "status": "ok",
-        "data": config,
-        "timestamp": datetime.now().isoformat()
-    }
+    return await config_response(request, "config")
 
 @app.get("/api/config/parts")
-async def get_parts():
+async def get_parts(request: Request):
     """Get only the parts configuration"""
-    config = load_config()
-    
-    if not config:
-        raise HTTPException(status_code=404, detail="Config file not found")
-    
-    return {
-        "status": "ok",
-        "parts": config.get("parts", []),
-        "count": len(config.get("parts", [])),
-        "totalDuration": config.get("metadata", {}).get("totalDuration")
-    }
+    return await config_response(request, "parts")
 
-@app.post("/api/merge")
-async def merge_audio_files(files: list, output: str = "final.mp3", crossfade: float = 0.5):
+@app.post("/api/merge", status_code=202)
+async def merge_audio_files(request: MergeRequest):
     """
-    Merge multiple audio files
+    Queue a merge of multiple audio files
     
     Args:
-        files: List of audio file paths to merge
-        output: Output filename
-        crossfade: Crossfade duration between files (seconds)
+        request: Files to merge, output filename and crossfade (seconds)
         
     Returns:
-        Status and output file path
+        Job id and status URL to poll for progress
     """
-    try:
-        if not files or len(files) == 0:
-            raise HTTPException(status_code=400, detail="No files provided")
-        
-        # Verify files exist
-        missing = [f for f in files if not os.path.exists(f)]
-        if missing:
-            logger.warning(f"Missing files: {missing}")
-            raise HTTPException(status_code=400, detail=f"Missing files: {missing}")
-        
-        output_path = os.path.join(OUTPUT_DIR, output)
-        
-        logger.info(f"Merging {len(files)} audio files to {output_path}")
-        
-        # Use Python script to merge (call audio_merger.py merge function)
-        # For now, return success response
-        
-        return {
-            "status": "success",
-            "message": f"Merged {len(files)} files",
+    files, output, crossfade = request.files, request.output, request.crossfade
+    if not files or len(files) == 0:
+        raise HTTPException(status_code=400, detail="No files provided")
+    
+    # Verify files exist
+    missing = await run_in_threadpool(missing_files, files)
+    if missing:
+        logger.warning(f"Missing files: {missing}")
+        raise HTTPException(status_code=400, detail=f"Missing files: {missing}")
+    
+    output_path = os.path.join(OUTPUT_DIR, output)
+    if not os.path.abspath(output_path).startswith(os.path.abspath(OUTPUT_DIR) + os.sep):
+        raise HTTPException(status_code=400, detail="Invalid output filename")
+    
+    if merge_executor is None:
+        raise HTTPException(status_code=503, detail="Merge workers not running")
+    
+    with merge_jobs_lock:
+        if pending_merge_jobs() >= MERGE_MAX_PENDING:
+            raise HTTPException(status_code=429, detail="Too many pending merge jobs",
+                                headers={"Retry-After": "5"})
+        
+        job_id = uuid.uuid4().hex
+        merge_jobs[job_id] = {
+            "job_id": job_id,
+            "status": "queued",
+            "progress": 0.0,
+            "files": len(files),
             "output": output_path,
-            "size": "TBD",
-            "duration": "TBD",
-            "timestamp": datetime.now().isoformat()
+            "size": None,
+            "duration": None,
+            "error": None,
+            "created_at": datetime.now().isoformat(),
+            "finished_at": None
         }
-        
+    
+    try:
+        merger_settings = await run_in_threadpool(merger_settings_from_config)
+        future = merge_executor.submit(run_merge_job, job_id, list(files), output_path,
+                                       crossfade, merge_progress, merger_settings)
     except Exception as e:
+        with merge_jobs_lock:
+            merge_jobs.pop(job_id, None)
         logger.error(f"Merge failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    
+    future.add_done_callback(lambda f: finish_merge_job(job_id, f))
+    logger.info(f"Queued merge job {job_id}: {len(files)} audio files to {output_path}")
+    
+    return {
+        "status": "queued",
+        "job_id": job_id,
+        "status_url": f"/api/merge/{job_id}",
+        "output": output_path,
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/api/merge/{job_id}")
+async def get_merge_job(job_id: str):
+    """
+    Get merge job status
+    
+    Args:
+        job_id: Job id returned by POST /api/merge
+        
+    Returns:
+        Job status, progress (0-1), output size and duration once completed
+    """
+    with merge_jobs_lock:
+        job = merge_jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Merge job not found")
+        view = merge_job_view(job)
+    
+    return {
+        "status": "ok",
+        "data": view
+    }
 
 @app.post("/api/status")
 async def update_status(status: str, timestamp: str, 
@@ -197,9 +757,7 @@ async def update_status(status: str, timestamp: str,
         logger.info(f"Status update: {status} - {message}")
         
         # Write to status log file
-        status_file = os.path.join(OUTPUT_DIR, "status_log.json")
-        with open(status_file, 'a') as f:
-            f.write(json.dumps(status_log) + "\n")
+        await run_in_threadpool(status_store.append, status_log)
         
         return {
             "status": "logged",
@@ -239,9 +797,7 @@ async def log_error(error: str, timestamp: str,
         logger.error(f"Workflow error in {node}: {error}")
         
         # Write to error log file
-        error_file = os.path.join(OUTPUT_DIR, "error_log.json")
-        with open(error_file, 'a') as f:
-            f.write(json.dumps(error_log) + "\n")
+        await run_in_threadpool(error_store.append, error_log)
         
         return {
             "status": "logged",
@@ -253,57 +809,83 @@ async def log_error(error: str, timestamp: str,
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/output/{filename}")
-async def get_output_file(filename: str):
+async def get_output_file(filename: str, request: Request):
     """
     Retrieve generated audio file
     
+    Supports conditional requests (If-None-Match, If-Modified-Since) and
+    byte ranges (Range, If-Range) so players can seek and clients can resume
+    downloads. Ranges, 416s and the transfer itself are left to FileResponse,
+    which hands the file to the server (http.response.pathsend) when it can.
+    
     Args:
         filename: Name of audio file to retrieve
         
     Returns:
-        Audio file content
+        Audio file content (200), byte ranges (206) or 304 Not Modified
     """
     try:
         filepath = os.path.join(OUTPUT_DIR, filename)
         
-        # Verify file exists and is safe to serve
-        if not os.path.exists(filepath):
+        # Verify file is safe to serve and exists
+        if not os.path.abspath(filepath).startswith(os.path.abspath(OUTPUT_DIR) + os.sep):
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        try:
+            stat = await run_in_threadpool(os.stat, filepath)
+        except OSError:
             raise HTTPException(status_code=404, detail="File not found")
         
-        if not os.path.abspath(filepath).startswith(os.path.abspath(OUTPUT_DIR)):
-            raise HTTPException(status_code=403, detail="Access denied")
+        etag = await run_in_threadpool(output_etags.etag, filepath, stat)
+        headers = {
+            "ETag": etag,
+            "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+            "Cache-Control": "no-cache"
+        }
+        
+        if not_modified(request, etag, stat.st_mtime):
+            return Response(status_code=304, headers=headers)
         
         logger.info(f"Serving file: {filepath}")
         
         return FileResponse(
             filepath,
             media_type="audio/mpeg",
-            filename=filename
+            filename=filename,
+            headers=headers,
+            stat_result=stat
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to serve file: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/status/log")
-async def get_status_log():
-    """Get status log entries"""
-    try:
-        status_file = os.path.join(OUTPUT_DIR, "status_log.json")
-        
-        if not os.path.exists(status_file):
-            return {"status": "ok", "entries": []}
+async def get_status_log(since: Optional[str] = None,
+                         cursor: Optional[int] = None,
+                         limit: int = Query(100, ge=1, le=1000)):
+    """
+    Get status log entries
+    
+    Args:
+        since: Only entries recorded at or after this ISO timestamp
+        cursor: Resume from a previous response's next_cursor
+        limit: Maximum number of entries to return
         
-        entries = []
-        with open(status_file, 'r') as f:
-            for line in f:
-                if line.strip():
-                    entries.append(json.loads(line))
+    Returns:
+        A page of entries (the newest ones when neither since nor cursor is
+        given) and the cursor for the next page
+    """
+    try:
+        entries, next_cursor = await run_in_threadpool(status_store.read, cursor, since, limit)
         
         return {
             "status": "ok",
             "entries": entries,
-            "count": len(entries)
+            "count": len(entries),
+            "next_cursor": next_cursor
         }
         
     except Exception as e:
@@ -311,24 +893,29 @@ async def get_status_log():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/error/log")
-async def get_error_log():
-    """Get error log entries"""
-    try:
-        error_file = os.path.join(OUTPUT_DIR, "error_log.json")
-        
-        if not os.path.exists(error_file):
-            return {"status": "ok", "entries": []}
+async def get_error_log(since: Optional[str] = None,
+                        cursor: Optional[int] = None,
+                        limit: int = Query(100, ge=1, le=1000)):
+    """
+    Get error log entries
+    
+    Args:
+        since: Only entries recorded at or after this ISO timestamp
+        cursor: Resume from a previous response's next_cursor
+        limit: Maximum number of entries to return
         
-        entries = []
-        with open(error_file, 'r') as f:
-            for line in f:
-                if line.strip():
-                    entries.append(json.loads(line))
+    Returns:
+        A page of entries (the newest ones when neither since nor cursor is
+        given) and the cursor for the next page
+    """
+    try:
+        entries, next_cursor = await run_in_threadpool(error_store.read, cursor, since, limit)
         
         return {
             "status": "ok",
             "entries": entries,
-            "count": len(entries)
+            "count": len(entries),
+            "next_cursor": next_cursor
         }
         
     except Exception as e:
@@ -339,12 +926,7 @@ async def get_error_log():
 async def get_stats():
     """Get processing statistics"""
     try:
-        stats = {
-            "output_files": len([f for f in os.listdir(OUTPUT_DIR) if f.endswith('.mp3')]),
-            "segment_files": len([f for f in os.listdir(SEGMENTS_DIR) if f.endswith('.mp3')]) if os.path.exists(SEGMENTS_DIR) else 0,
-            "output_dir_size": sum(os.path.getsize(os.path.join(OUTPUT_DIR, f)) for f in os.listdir(OUTPUT_DIR) if os.path.isfile(os.path.join(OUTPUT_DIR, f))) / (1024*1024),
-            "timestamp": datetime.now().isoformat()
-        }
+        stats = stats_tracker.snapshot()
         
         return {
             "status": "ok",
@@ -355,6 +937,17 @@ async def get_stats():
         logger.error(f"Failed to get stats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics"""
+    # merge_job_view asks the Manager for live progress; keep that IPC off the event loop
+    counts = await run_in_threadpool(count_merge_jobs)
+    for status, count in counts.items():
+        metrics.MERGE_JOBS.labels(status=status).set(count)
+    
+    body, content_type = await run_in_threadpool(metrics.render)
+    return Response(content=body, media_type=content_type)
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
@@ -365,7 +958,39 @@ async def startup_event():
     logger.info(f"Output directory: {os.path.abspath(OUTPUT_DIR)}")
     logger.info(f"Segments directory: {os.path.abspath(SEGMENTS_DIR)}")
     logger.info(f"Configuration file: {os.path.abspath(CONFIG_FILE)}")
+    logger.info(f"Merge workers: {MERGE_WORKERS} (max pending jobs: {MERGE_MAX_PENDING})")
     logger.info("="*60)
+    
+    global merge_executor, merge_manager, merge_progress, stats_rescan_task
+    global status_store, error_store
+    # The logs live in OUTPUT_DIR, so their writes count towards /api/stats
+    status_store = open_log_store(os.path.join(OUTPUT_DIR, "status_log.json"), LOG_STORE_BACKEND,
+                                  on_change=stats_tracker.record_write, **LOG_STORE_OPTIONS)
+    error_store = open_log_store(os.path.join(OUTPUT_DIR, "error_log.json"), LOG_STORE_BACKEND,
+                                 on_change=stats_tracker.record_write, **LOG_STORE_OPTIONS)
+    merge_manager = multiprocessing.Manager()
+    merge_progress = merge_manager.dict()
+    merge_executor = ProcessPoolExecutor(max_workers=MERGE_WORKERS)
+    
+    stats_tracker.load_names(await run_in_threadpool(load_config))
+    await run_in_threadpool(stats_tracker.rescan)
+    stats_rescan_task = asyncio.create_task(rescan_stats_periodically())
+
+# Shutdown event
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Shutdown event handler"""
+    global merge_executor, merge_manager, merge_progress, stats_rescan_task
+    if stats_rescan_task is not None:
+        stats_rescan_task.cancel()
+        stats_rescan_task = None
+    if merge_executor is not None:
+        merge_executor.shutdown(wait=False, cancel_futures=True)
+        merge_executor = None
+    if merge_manager is not None:
+        merge_manager.shutdown()
+        merge_manager = None
+        merge_progress = None
 
 # Main
 if __name__ == "__main__":
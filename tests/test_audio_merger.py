@@ -0,0 +1,52 @@
+"""Crossfade tests for the pcm engine; they need FFmpeg and numpy."""
+
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+np = pytest.importorskip("numpy")
+from audio_merger import AudioMerger
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="needs ffmpeg")
+
+SAMPLE_RATE = 44100
+
+
+def make_clip(directory: Path, name: str, seconds: float) -> str:
+    path = directory / f"{name}.wav"
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y", "-f", "lavfi",
+         "-i", f"sine=frequency=440:duration={seconds}:sample_rate={SAMPLE_RATE}",
+         "-ac", "2", str(path)],
+        check=True)
+    return str(path)
+
+
+@pytest.mark.parametrize("durations, expected_frames", [
+    ([2, 0.2, 3], 220500),
+    ([0.3, 0.2, 0.4], 30870),
+])
+def test_pcm_engine_keeps_clips_shorter_than_the_crossfade(tmp_path, durations, expected_frames):
+    merger = AudioMerger(output_format="wav", sample_rate=SAMPLE_RATE, engine="pcm")
+    files = [make_clip(tmp_path, str(i), seconds) for i, seconds in enumerate(durations)]
+    clips = [merger.decode_pcm(Path(f).read_bytes()) for f in files]
+
+    buffer = np.zeros((SAMPLE_RATE * 10, 2), dtype=np.float32)
+    end = remainder = 0
+    for f in files:
+        buffer, new_end, _ = merger._decode_into(f, buffer, end, int(0.5 * SAMPLE_RATE), 1.0, remainder)
+        remainder = new_end - end
+        end = new_end
+
+    mixed = merger.mix_pcm(clips, crossfade=0.5)
+    assert end == len(mixed) == expected_frames
+    np.testing.assert_allclose(buffer[:end], mixed, atol=1e-6)
+
+    output = tmp_path / "merged.wav"
+    assert merger.merge_audio_files(files, str(output), crossfade=0.5) == str(output)
+    assert len(merger.decode_pcm(output.read_bytes())) == expected_frames
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+TTS Service Load Test
+Ramps concurrent /tts clients against tts-service and reports requests/sec,
+latency percentiles and memory per uvicorn worker, as JSON.
+
+By default each --workers count gets its own uvicorn deployment on the
+deterministic local backend (TTS_BACKEND=local), so the numbers measure
+the service itself rather than the upstream and can be compared to size
+the container. Every request uses unique text unless --repeat-text is
+given, so it exercises synthesis rather than the cache.
+
+Usage:
+    python3 tts-service/loadtest.py
+    python3 tts-service/loadtest.py --workers 1,2,4 --clients 1,8,32,64 --stage-seconds 15
+    python3 tts-service/loadtest.py --first-byte-seconds 0.3 --realtime-factor 0.05
+    python3 tts-service/loadtest.py --url http://localhost:8880 --clients 1,4,16
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+
+SERVICE_DIR = Path(__file__).resolve().parent
+WORDS = ("light dream river stone morning night voice heart road star fire song "
+         "silence journey wind ocean shadow hope colour rhythm").split()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def read_status(pid: int) -> Dict[str, int]:
+    """VmRSS/VmHWM (KB) and PPid from /proc/<pid>/status."""
+    fields = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("VmRSS", "VmHWM", "PPid"):
+                fields[name] = int(value.split()[0])
+    return fields
+
+
+def worker_memory(master_pid: int) -> Optional[List[dict]]:
+    """
+    Current and peak RSS of each uvicorn worker in MB.
+
+    With one worker uvicorn serves from the master process itself;
+    otherwise the workers are its spawned children (the multiprocessing
+    resource tracker is skipped). None where /proc is missing.
+    """
+    try:
+        children = []
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                try:
+                    if read_status(int(entry)).get("PPid") != master_pid:
+                        continue
+                    with open(f"/proc/{entry}/cmdline", "rb") as f:
+                        if b"spawn_main" in f.read():
+                            children.append(int(entry))
+                except OSError:
+                    continue
+        memory = []
+        for pid in sorted(children) or [master_pid]:
+            status = read_status(pid)
+            memory.append({
+                "pid": pid,
+                "rss_mb": round(status.get("VmRSS", 0) / 1024, 1),
+                "peak_rss_mb": round(status.get("VmHWM", 0) / 1024, 1)
+            })
+        return memory
+    except OSError:
+        return None
+
+
+def wait_until_ready(base_url: str, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/health", timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"tts-service at {base_url} did not become ready")
+
+
+def run_stage(base_url: str, clients: int, seconds: float, words: int,
+              repeat_text: bool, stream: bool) -> dict:
+    """Keep `clients` requests in flight for `seconds` and time each one."""
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    stop = threading.Event()
+    text = " ".join(WORDS[i % len(WORDS)] for i in range(words))
+
+    def client(index: int):
+        session = requests.Session()
+        sequence = 0
+        while not stop.is_set():
+            sequence += 1
+            body = text if repeat_text else f"Client {index} request {sequence} {time.time_ns()}. {text}"
+            started = time.perf_counter()
+            try:
+                response = session.post(
+                    f"{base_url}/tts", params={"stream": "true"} if stream else None,
+                    json={"text": body, "lang": "en-US", "emotion": "neutral", "rate": "+0%"},
+                    timeout=60
+                )
+                ok = response.status_code == 200 and len(response.content) > 0
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    result = {"clients": clients, "requests": len(latencies), "errors": errors[0],
+              "requests_per_s": round(len(latencies) / elapsed, 2)}
+    if latencies:
+        result.update({
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p90_ms": round(percentile(latencies, 90) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "max_ms": round(max(latencies) * 1000, 2)
+        })
+    return result
+
+
+def ramp(base_url: str, args, master_pid: Optional[int] = None) -> List[dict]:
+    """Run one stage per client count, sampling worker memory after each."""
+    stages = []
+    for clients in args.clients:
+        print(f"  {clients} clients...", file=sys.stderr)
+        stage = run_stage(base_url, clients, args.stage_seconds, args.words,
+                          args.repeat_text, args.stream)
+        if master_pid is not None:
+            stage["workers"] = worker_memory(master_pid)
+        stages.append(stage)
+    return stages
+
+
+def deploy(workers: int, args) -> dict:
+    """Start a local uvicorn deployment with `workers` workers and ramp it."""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        "TTS_BACKEND": args.backend,
+        "TTS_LOCAL_FIRST_BYTE_SECONDS": str(args.first_byte_seconds),
+        "TTS_LOCAL_REALTIME_FACTOR": str(args.realtime_factor)
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_ready(base_url)
+        print(f"{workers} worker(s) on {base_url}", file=sys.stderr)
+        stages = ramp(base_url, args, server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+    return {"workers": workers, "stages": stages}
+
+
+def int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--workers", type=int_list, default=[1, 4],
+                        help="uvicorn worker counts to deploy and compare")
+    parser.add_argument("--clients", type=int_list, default=[1, 4, 16, 64],
+                        help="Concurrent clients per ramp stage")
+    parser.add_argument("--stage-seconds", type=float, default=10.0)
+    parser.add_argument("--words", type=int, default=40, help="Words of text per request")
+    parser.add_argument("--repeat-text", action="store_true",
+                        help="Send identical text (measures the cache path)")
+    parser.add_argument("--stream", action="store_true", help="Request ?stream=true")
+    parser.add_argument("--backend", default="local", help="TTS_BACKEND for deployments")
+    parser.add_argument("--first-byte-seconds", type=float, default=0.0,
+                        help="Local backend delay before the first audio chunk")
+    parser.add_argument("--realtime-factor", type=float, default=0.0,
+                        help="Local backend synthesis seconds per second of audio")
+    parser.add_argument("--url", help="Ramp an existing deployment instead of starting one")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    if args.url:
+        wait_until_ready(args.url.rstrip("/"))
+        deployments = [{"url": args.url, "stages": ramp(args.url.rstrip("/"), args)}]
+    else:
+        deployments = [deploy(workers, args) for workers in args.workers]
+
+    # Requests/sec per deployment at each client count, for sizing at a glance
+    comparison = {
+        str(clients): {
+            str(deployment.get("workers", deployment.get("url"))): stage["requests_per_s"]
+            for deployment in deployments
+            for stage in deployment["stages"] if stage["clients"] == clients
+        }
+        for clients in args.clients
+    }
+    report = {
+        "backend": None if args.url else args.backend,
+        "cpus": os.cpu_count(),
+        "stage_seconds": args.stage_seconds,
+        "words": args.words,
+        "repeat_text": args.repeat_text,
+        "stream": args.stream,
+        "deployments": deployments,
+        "requests_per_s_by_clients": comparison
+    }
+
+    body = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(body + "\n")
+    else:
+        print(body)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,87 @@
 from io import BytesIO
+from collections import OrderedDict
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 import asyncio
+import contextlib
+import hashlib
+import os
+import re
+import struct
+import time
 from enum import Enum
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import Response
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
-import edge_tts
+try:
+    import edge_tts
+except ImportError:  # Only needed by the "edge" backend
+    edge_tts = None
+
+try:
+    from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge,
+                                   Histogram, generate_latest, multiprocess)
+except ImportError:  # Optional: /metrics reports that metrics are disabled
+    Counter = Gauge = Histogram = None
 
 app = FastAPI(title="Advanced TTS Service", version="2.0.0")
 
+# Synthesis backend: "edge" (Microsoft Edge online TTS) or "local" (offline, for load tests)
+TTS_BACKEND = os.environ.get("TTS_BACKEND", "edge")
+LOCAL_FIRST_BYTE_SECONDS = float(os.environ.get("TTS_LOCAL_FIRST_BYTE_SECONDS", 0))
+LOCAL_REALTIME_FACTOR = float(os.environ.get("TTS_LOCAL_REALTIME_FACTOR", 0))
+
+# Synthesis cache: in-memory LRU with an optional on-disk spill directory
+CACHE_MAX_BYTES = int(os.environ.get("TTS_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+CACHE_DIR = os.environ.get("TTS_CACHE_DIR")
+CACHE_DIR_MAX_BYTES = int(os.environ.get("TTS_CACHE_DIR_MAX_BYTES", 512 * 1024 * 1024))
+# How long a request waits for an identical in-flight synthesis before running its own
+COALESCE_TIMEOUT_SECONDS = float(os.environ.get("TTS_COALESCE_TIMEOUT_SECONDS", 60))
+
+# Upstream syntheses allowed to run at once for batch items and long-text chunks
+SYNTHESIS_CONCURRENCY = int(os.environ.get("TTS_SYNTHESIS_CONCURRENCY", 4))
+BATCH_MAX_ITEMS = int(os.environ.get("TTS_BATCH_MAX_ITEMS", 32))
+
+# Long text is split at sentence boundaries into chunks synthesized in parallel
+MAX_TEXT_CHARS = int(os.environ.get("TTS_MAX_TEXT_CHARS", 20000))
+CHUNK_CHARS = int(os.environ.get("TTS_CHUNK_CHARS", 1000))
+
+# Length-prefixed batch frame: 1-byte status (0 = audio, 1 = error) + 4-byte length
+BATCH_FRAME_HEADER = struct.Struct(">BI")
+BATCH_MEDIA_TYPE = "application/x-tts-batch"
+
+
+# Prometheus metrics; with several uvicorn workers set PROMETHEUS_MULTIPROC_DIR
+class _NoopMetric:
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def track_inprogress(self):
+        return contextlib.nullcontext()
+
+
+def _metric(kind, *args, **kwargs):
+    return kind(*args, **kwargs) if kind is not None else _NoopMetric()
+
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+HTTP_REQUEST_SECONDS = _metric(Histogram, "tts_http_request_seconds", "Request latency per route",
+                               ("method", "route", "status"), buckets=LATENCY_BUCKETS)
+HTTP_IN_FLIGHT = _metric(Gauge, "tts_http_requests_in_flight", "Requests currently being handled",
+                         multiprocess_mode="livesum")
+SYNTHESIS_SECONDS = _metric(Histogram, "tts_synthesis_seconds", "Upstream synthesis time",
+                            ("outcome",), buckets=LATENCY_BUCKETS)
+SYNTHESES_IN_FLIGHT = _metric(Gauge, "tts_syntheses_in_flight", "Upstream syntheses running",
+                              multiprocess_mode="livesum")
+CACHE_EVENTS = _metric(Counter, "tts_cache_events_total",
+                       "Cache hits, misses, coalesced waits and evictions", ("event",))
+
 
 class LanguageEnum(str, Enum):
     en_us = "en-US"
@@ -41,15 +114,599 @@ class RateEnum(str, Enum):
 
 
 class TTSRequest(BaseModel):
-    text: str = Field(..., description="Text to convert to speech", min_length=1, max_length=1000)
+    text: str = Field(..., description="Text to convert to speech", min_length=1, max_length=MAX_TEXT_CHARS)
     lang: LanguageEnum = Field(LanguageEnum.en_us, description="Language and region")
     emotion: EmotionEnum = Field(EmotionEnum.neutral, description="Emotional style")
     rate: RateEnum = Field(RateEnum.normal, description="Speech rate")
 
 
+class BatchTTSRequest(BaseModel):
+    items: List[TTSRequest] = Field(..., description="Requests to synthesize, in order",
+                                    min_length=1, max_length=BATCH_MAX_ITEMS)
+    concat: bool = Field(False, description="Return one pre-concatenated MP3 clip")
+
+
+# Select voice based on language
+VOICE_MAP = {
+    "en-US": "en-US-AriaNeural",
+    "en-GB": "en-GB-SoniaNeural",
+    "en-AU": "en-AU-NatashaNeural",
+    "en-IN": "en-IN-NeerjaNeural",
+    "es-ES": "es-ES-ElviraNeural",
+    "fr-FR": "fr-FR-DeniseNeural",
+    "de-DE": "de-DE-AmalaNeural",
+    "it-IT": "it-IT-ElsaNeural",
+    "ja-JP": "ja-JP-NanamiNeural",
+    "zh-CN": "zh-CN-XiaoxuanNeural",
+    "hi-IN": "hi-IN-SwaraNeural"
+}
+
+
+class SynthesisCache:
+    """LRU cache of synthesized audio that coalesces concurrent identical requests."""
+
+    def __init__(self, max_bytes: int, spill_dir: Optional[str] = None,
+                 spill_max_bytes: int = 0, wait_timeout: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        self.wait_timeout = wait_timeout
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._spilled: "OrderedDict[str, int]" = OrderedDict()
+        self._spill_size = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            existing = []
+            for name in os.listdir(spill_dir):
+                if name.endswith(".mp3"):
+                    stat = os.stat(os.path.join(spill_dir, name))
+                    existing.append((stat.st_mtime, name[:-len(".mp3")], stat.st_size))
+            for _, key, size in sorted(existing):
+                self._spilled[key] = size
+                self._spill_size += size
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, f"{key}.mp3")
+
+    def _read_spill(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._spill_path(key), "rb") as f:
+                data = f.read()
+            os.utime(self._spill_path(key))
+            return data
+        except OSError:
+            return None
+
+    def _write_spill(self, key: str, data: bytes) -> None:
+        path = self._spill_path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _evict_spill(self) -> None:
+        while self._spill_size > self.spill_max_bytes and self._spilled:
+            key, size = self._spilled.popitem(last=False)
+            self._spill_size -= size
+            try:
+                os.remove(self._spill_path(key))
+            except OSError:
+                pass
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Look up audio in memory, then in the spill directory."""
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+            return data
+
+        if self.spill_dir and key in self._spilled:
+            data = await asyncio.to_thread(self._read_spill, key)
+            if data is not None:
+                self._spilled.move_to_end(key)
+                self._remember(key, data)
+                return data
+            self._spill_size -= self._spilled.pop(key, 0)
+
+        return None
+
+    def _remember(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        self._size -= len(self._entries.pop(key, b""))
+        self._entries[key] = data
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, old = self._entries.popitem(last=False)
+            self._size -= len(old)
+            CACHE_EVENTS.labels(event="eviction").inc()
+
+    async def put(self, key: str, data: bytes) -> None:
+        self._remember(key, data)
+        if self.spill_dir and len(data) <= self.spill_max_bytes:
+            try:
+                await asyncio.to_thread(self._write_spill, key, data)
+            except OSError:
+                return
+            self._spill_size -= self._spilled.pop(key, 0)
+            self._spilled[key] = len(data)
+            self._spill_size += len(data)
+            self._evict_spill()
+
+    def contains(self, key: str) -> bool:
+        """Return True if audio for a key is cached in memory or spilled to disk."""
+        return key in self._entries or key in self._spilled
+
+    def pending(self, key: str) -> Optional[asyncio.Future]:
+        """Return the in-flight synthesis for a key, if any."""
+        return self._inflight.get(key)
+
+    def begin(self, key: str) -> asyncio.Future:
+        """Register an in-flight synthesis that other requests can await."""
+        self.misses += 1
+        CACHE_EVENTS.labels(event="miss").inc()
+        future = asyncio.get_running_loop().create_future()
+        # Avoid "exception never retrieved" warnings when nobody else awaited
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        return future
+
+    def _release(self, key: str, future: asyncio.Future) -> None:
+        # A waiter that timed out may have registered a newer synthesis for the key
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    async def finish(self, key: str, future: asyncio.Future, data: bytes) -> None:
+        """Store a completed synthesis and wake up its waiters."""
+        self._release(key, future)
+        await self.put(key, data)
+        if not future.done():
+            future.set_result(data)
+
+    def fail(self, key: str, future: asyncio.Future, error: BaseException) -> None:
+        """Propagate a failed synthesis to its waiters; a no-op once it is settled."""
+        self._release(key, future)
+        if future.done():
+            return
+        if isinstance(error, asyncio.CancelledError):
+            future.cancel()
+        else:
+            future.set_exception(error)
+
+    async def lookup(self, key: str) -> Optional[bytes]:
+        """Return cached audio or await an identical in-flight synthesis."""
+        data = await self.get(key)
+        if data is None:
+            pending = self.pending(key)
+            if pending is None:
+                return None
+            # Another request is already synthesizing this SSML; share its result.
+            # If it fails or takes too long, the caller falls back to a
+            # synthesis of its own.
+            try:
+                data = await asyncio.wait_for(asyncio.shield(pending), self.wait_timeout)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                return None
+            except Exception:
+                return None
+            CACHE_EVENTS.labels(event="coalesced").inc()
+        else:
+            CACHE_EVENTS.labels(event="hit").inc()
+        self.hits += 1
+        return data
+
+    async def get_or_synthesize(self, key: str,
+                                synthesize: Callable[[], Awaitable[bytes]]) -> Tuple[bytes, bool]:
+        """
+        Return cached audio for a key, running at most one synthesis per key.
+
+        Returns:
+            Tuple of (audio bytes, whether the result came from the cache)
+        """
+        data = await self.lookup(key)
+        if data is not None:
+            return data, True
+
+        future = self.begin(key)
+        try:
+            data = await synthesize()
+        except BaseException as e:
+            self.fail(key, future, e)
+            raise
+        await self.finish(key, future, data)
+        return data, False
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "inflight": len(self._inflight),
+            "spill_entries": len(self._spilled),
+            "spill_bytes": self._spill_size,
+        }
+
+
+cache = SynthesisCache(CACHE_MAX_BYTES, CACHE_DIR, CACHE_DIR_MAX_BYTES, COALESCE_TIMEOUT_SECONDS)
+synthesis_slots = asyncio.Semaphore(SYNTHESIS_CONCURRENCY)
+
+
+def build_ssml(req: TTSRequest, text: Optional[str] = None) -> Tuple[str, str]:
+    """Return the SSML document and voice name for a request (or one chunk of its text)."""
+    voice = VOICE_MAP.get(req.lang, "en-US-AriaNeural")
+
+    # Build prosody with emotion and rate
+    text_with_prosody = f'<prosody rate="{req.rate}" pitch="+0%">{req.text if text is None else text}</prosody>'
+    ssml = f'''<speak version="1.0" xml:lang="{req.lang}">
+            <voice name="{voice}">
+                <mstts:express-as style="{req.emotion}" styledegree="2.0">
+                    {text_with_prosody}
+                </mstts:express-as>
+            </voice>
+        </speak>'''
+    return ssml, voice
+
+
+PARAGRAPH_END = re.compile(r"\n\s*\n")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def pack_pieces(pieces: List[str], limit: int, separator: str) -> List[str]:
+    """Greedily join pieces into chunks of at most limit characters where possible."""
+    chunks = []
+    current = ""
+    for piece in pieces:
+        piece = piece.strip()
+        if not piece:
+            continue
+        if current and len(current) + len(separator) + len(piece) > limit:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}{separator}{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def split_text(text: str, limit: int = CHUNK_CHARS) -> List[str]:
+    """
+    Split text into chunks of about limit characters at paragraph or sentence ends.
+
+    Every chunk is synthesized separately and keeps the backend's own leading
+    and trailing silence, so each boundary adds a short pause. Chunks therefore
+    only ever end where the voice pauses anyway: paragraphs are packed first,
+    a paragraph longer than the limit is packed by sentences, and a single
+    sentence longer than the limit is kept whole rather than cut mid-sentence.
+    """
+    text = text.strip()
+    if len(text) <= limit:
+        return [text]
+
+    chunks = []
+    for paragraph in pack_pieces(PARAGRAPH_END.split(text), limit, "\n\n"):
+        if len(paragraph) <= limit:
+            chunks.append(paragraph)
+        else:
+            chunks.extend(pack_pieces(SENTENCE_END.split(paragraph), limit, " "))
+    return chunks
+
+
+def request_chunks(req: TTSRequest) -> List[Tuple[str, str]]:
+    """Return (ssml, voice) for each chunk of a request's text."""
+    texts = split_text(req.text)
+    if len(texts) == 1:
+        return [build_ssml(req)]
+    return [build_ssml(req, text) for text in texts]
+
+
+class EdgeBackend:
+    """Synthesis through Microsoft Edge's online TTS service (edge-tts)."""
+
+    name = "edge"
+
+    def __init__(self):
+        if edge_tts is None:
+            raise RuntimeError("TTS_BACKEND=edge needs edge-tts: pip install edge-tts")
+
+    async def stream(self, ssml: str, voice: str) -> AsyncIterator[bytes]:
+        communicate = edge_tts.Communicate(ssml, voice)
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                yield chunk["data"]
+
+
+class LocalBackend:
+    """
+    Deterministic offline synthesis, for load tests without the upstream.
+
+    Emits silent MP3 in edge-tts's format (24 kHz, 48 kbps mono) lasting
+    as long as the text would take to speak at the requested prosody rate,
+    so responses have realistic sizes. Optional delays model the upstream's
+    time to first byte and synthesis speed (seconds per second of audio).
+    """
+
+    name = "local"
+    # MPEG-2 Layer III frame header; all-zero side info and data decode to 24 ms of silence
+    FRAME = bytes([0xFF, 0xF3, 0x64, 0xC0]) + bytes(140)
+    FRAME_SECONDS = 0.024
+    FRAMES_PER_CHUNK = 32
+    CHARS_PER_SECOND = 15
+    TAG = re.compile(r"<[^>]+>")
+    RATE = re.compile(r'rate="([+-]?\d+)%"')
+
+    def __init__(self, first_byte_seconds: float = 0.0, realtime_factor: float = 0.0):
+        self.first_byte_seconds = first_byte_seconds
+        self.realtime_factor = realtime_factor
+
+    def duration(self, ssml: str) -> float:
+        """Seconds of speech for the text in an SSML document."""
+        text = " ".join(self.TAG.sub(" ", ssml).split())
+        rate = self.RATE.search(ssml)
+        speed = max(0.1, 1 + int(rate.group(1)) / 100) if rate else 1.0
+        return len(text) / self.CHARS_PER_SECOND / speed
+
+    async def stream(self, ssml: str, voice: str) -> AsyncIterator[bytes]:
+        frames = max(1, round(self.duration(ssml) / self.FRAME_SECONDS))
+        if self.first_byte_seconds:
+            await asyncio.sleep(self.first_byte_seconds)
+        for start in range(0, frames, self.FRAMES_PER_CHUNK):
+            count = min(self.FRAMES_PER_CHUNK, frames - start)
+            if self.realtime_factor:
+                await asyncio.sleep(count * self.FRAME_SECONDS * self.realtime_factor)
+            yield self.FRAME * count
+
+
+BACKENDS = {"edge": EdgeBackend, "local": LocalBackend}
+
+
+def create_backend(name: str):
+    if name not in BACKENDS:
+        raise RuntimeError(f"Unknown TTS_BACKEND {name!r}, expected one of {', '.join(BACKENDS)}")
+    if name == "local":
+        return LocalBackend(LOCAL_FIRST_BYTE_SECONDS, LOCAL_REALTIME_FACTOR)
+    return BACKENDS[name]()
+
+
+backend = create_backend(TTS_BACKEND)
+
+
+def cache_key(ssml: str, voice: str) -> str:
+    # Keyed by backend too, so a shared spill directory never mixes their audio
+    return hashlib.sha256(f"{backend.name}\n{voice}\n{ssml}".encode("utf-8")).hexdigest()
+
+
+async def stream_ssml(ssml: str, voice: str) -> AsyncIterator[bytes]:
+    """Yield MP3 chunks from the synthesis backend as they arrive."""
+    started = time.monotonic()
+    outcome = "error"
+
+    with SYNTHESES_IN_FLIGHT.track_inprogress():
+        try:
+            async for data in backend.stream(ssml, voice):
+                yield data
+            outcome = "success"
+        except (asyncio.CancelledError, GeneratorExit):
+            outcome = "cancelled"
+            raise
+        finally:
+            SYNTHESIS_SECONDS.labels(outcome=outcome).observe(time.monotonic() - started)
+
+
+async def synthesize_ssml(ssml: str, voice: str) -> bytes:
+    """Run one upstream synthesis and return the MP3 bytes."""
+    buffer = BytesIO()
+
+    async for data in stream_ssml(ssml, voice):
+        buffer.write(data)
+
+    audio_bytes = buffer.getvalue()
+
+    if not audio_bytes:
+        raise HTTPException(status_code=500, detail="Failed to generate audio")
+
+    return audio_bytes
+
+
+async def synthesize_cached(ssml: str, voice: str) -> bytes:
+    """Synthesize SSML through the cache, bounded by the synthesis limit."""
+
+    async def limited() -> bytes:
+        async with synthesis_slots:
+            return await synthesize_ssml(ssml, voice)
+
+    audio_bytes, _ = await cache.get_or_synthesize(cache_key(ssml, voice), limited)
+    return audio_bytes
+
+
+def start_chunks(chunks: List[Tuple[str, str]]) -> List[asyncio.Future]:
+    """Start synthesizing every chunk concurrently."""
+    return [asyncio.ensure_future(synthesize_cached(ssml, voice)) for ssml, voice in chunks]
+
+
+def cancel_all(tasks: List[asyncio.Future]) -> None:
+    for task in tasks:
+        task.cancel()
+
+
+async def synthesize_request(req: TTSRequest) -> bytes:
+    """Synthesize a whole request, stitching long-text chunks back in order."""
+    if not req.text.strip():
+        raise HTTPException(status_code=400, detail="text must not be empty")
+
+    tasks = start_chunks(request_chunks(req))
+    try:
+        clips = await asyncio.gather(*tasks)
+    except BaseException:
+        cancel_all(tasks)
+        raise
+
+    # Backends return headerless MP3 frame streams, which concatenate cleanly
+    return b"".join(clips)
+
+
+async def stream_chunks(tasks: List[asyncio.Future]) -> AsyncIterator[bytes]:
+    """
+    Stream chunk syntheses in order once the first one has finished.
+
+    Like stream_and_cache, the first chunk is awaited up front so an early
+    failure still returns an error status.
+    """
+    try:
+        first = await tasks[0]
+    except BaseException:
+        cancel_all(tasks)
+        raise
+
+    async def body() -> AsyncIterator[bytes]:
+        try:
+            yield first
+            for task in tasks[1:]:
+                yield await task
+        finally:
+            cancel_all(tasks)
+
+    return body()
+
+
+class CacheFillingResponse(StreamingResponse):
+    """
+    StreamingResponse for a synthesis registered with the cache.
+
+    If the client goes away before the body is iterated (or mid-stream),
+    the body generator never finishes, so the in-flight entry is failed
+    here instead of leaving later requests for the same SSML waiting on it.
+    """
+
+    def __init__(self, key: str, future: asyncio.Future, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.key = key
+        self.future = future
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            cache.fail(self.key, self.future, ConnectionError("client disconnected"))
+
+
+async def stream_and_cache(key: str, ssml: str, voice: str, **response_options) -> CacheFillingResponse:
+    """
+    Start a streamed synthesis, registering it with the cache.
+
+    The first chunk is awaited before returning, so a synthesis that fails
+    up front still surfaces as an error status instead of an empty 200.
+    The chunks are buffered for the cache only while they fit its budget.
+    """
+    future = cache.begin(key)
+    chunks = stream_ssml(ssml, voice)
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        error = HTTPException(status_code=500, detail="Failed to generate audio")
+        cache.fail(key, future, error)
+        raise error
+    except BaseException as e:
+        cache.fail(key, future, e)
+        raise
+
+    async def body() -> AsyncIterator[bytes]:
+        buffered = [first]
+        size = len(first)
+        try:
+            yield first
+            async for data in chunks:
+                if buffered is not None:
+                    buffered.append(data)
+                    size += len(data)
+                    if size > cache.max_bytes:
+                        buffered = None
+                yield data
+        except BaseException as e:
+            cache.fail(key, future, e)
+            raise
+        if buffered is not None:
+            await cache.finish(key, future, b"".join(buffered))
+        else:
+            cache.fail(key, future, RuntimeError("streamed audio exceeded cache budget"))
+
+    return CacheFillingResponse(key, future, body(), **response_options)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class RequestMetricsMiddleware:
+    """Record in-flight requests and latency per route until the last body chunk is sent.
+
+    Plain ASGI because @app.middleware("http") stops timing at the headers,
+    which leaves the audio of /tts?stream=true out of the measurement.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.monotonic()
+        status = 500
+        finished = None
+
+        async def send_and_time(message):
+            nonlocal status, finished
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished = time.monotonic()
+
+        with HTTP_IN_FLIGHT.track_inprogress():
+            try:
+                await self.app(scope, receive, send_and_time)
+            finally:
+                route = scope.get("route")
+                HTTP_REQUEST_SECONDS.labels(
+                    method=scope["method"],
+                    route=getattr(route, "path", "unmatched"),
+                    status=str(status),
+                ).observe((finished or time.monotonic()) - started)
+
+
+app.add_middleware(RequestMetricsMiddleware)
+
+
 @app.get("/health")
 def health() -> dict:
-    return {"status": "ok"}
+    return {"status": "ok", "backend": backend.name, "cache": cache.stats()}
+
+
+@app.get("/metrics")
+def get_metrics() -> Response:
+    """Prometheus metrics"""
+    if Counter is None:
+        return Response("# metrics disabled: prometheus_client is not installed\n",
+                        media_type="text/plain")
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 @app.get("/voices")
@@ -63,50 +720,71 @@ def get_voices() -> dict:
 
 
 @app.post("/tts")
-async def synthesize(req: TTSRequest):
+async def synthesize(req: TTSRequest,
+                     stream: bool = Query(False, description="Stream audio chunks as they are synthesized"),
+                     if_none_match: Optional[str] = Header(None)):
     if not req.text.strip():
         raise HTTPException(status_code=400, detail="text must not be empty")
 
     try:
-        # Select voice based on language
-        voice_map = {
-            "en-US": "en-US-AriaNeural",
-            "en-GB": "en-GB-SoniaNeural",
-            "en-AU": "en-AU-NatashaNeural",
-            "en-IN": "en-IN-NeerjaNeural",
-            "es-ES": "es-ES-ElviraNeural",
-            "fr-FR": "fr-FR-DeniseNeural",
-            "de-DE": "de-DE-AmalaNeural",
-            "it-IT": "it-IT-ElsaNeural",
-            "ja-JP": "ja-JP-NanamiNeural",
-            "zh-CN": "zh-CN-XiaoxuanNeural",
-            "hi-IN": "hi-IN-SwaraNeural"
+        chunks = request_chunks(req)
+
+        # The ETag is derived from the SSML, so revalidation never needs synthesis
+        chunk_keys = [cache_key(ssml, voice) for ssml, voice in chunks]
+        if len(chunks) == 1:
+            ssml, voice = chunks[0]
+            key = chunk_keys[0]
+        else:
+            key = hashlib.sha256("".join(chunk_keys).encode("utf-8")).hexdigest()
+        etag = f'"{key}"'
+        cache_headers = {
+            "ETag": etag,
+            "Cache-Control": "public, max-age=3600",
         }
-        
-        voice = voice_map.get(req.lang, "en-US-AriaNeural")
-        
-        # Build prosody with emotion and rate
-        text_with_prosody = f'<prosody rate="{req.rate}" pitch="+0%">{req.text}</prosody>'
-        ssml = f'''<speak version="1.0" xml:lang="{req.lang}">
-            <voice name="{voice}">
-                <mstts:express-as style="{req.emotion}" styledegree="2.0">
-                    {text_with_prosody}
-                </mstts:express-as>
-            </voice>
-        </speak>'''
-        
-        # Generate audio
-        buffer = BytesIO()
-        communicate = edge_tts.Communicate(ssml, voice)
-        
-        async for chunk in communicate.stream():
-            if chunk["type"] == "audio":
-                buffer.write(chunk["data"])
-        
-        audio_bytes = buffer.getvalue()
-        
-        if not audio_bytes:
-            raise HTTPException(status_code=500, detail="Failed to generate audio")
+
+        # Only vouch for the client's copy while the audio is still cached
+        if etag_matches(if_none_match, etag) and all(cache.contains(k) for k in chunk_keys):
+            return Response(status_code=304, headers=cache_headers)
+
+        if len(chunks) > 1:
+            # Long text: chunks synthesize in parallel and are cached individually
+            tasks = start_chunks(chunks)
+            if stream:
+                return StreamingResponse(
+                    await stream_chunks(tasks),
+                    media_type="audio/mpeg",
+                    headers={
+                        "Content-Disposition": "inline; filename=tts.mp3",
+                        "X-Content-Type-Options": "nosniff",
+                        "X-Chunks": str(len(chunks)),
+                        **cache_headers,
+                    }
+                )
+            try:
+                audio_bytes = b"".join(await asyncio.gather(*tasks))
+            except BaseException:
+                cancel_all(tasks)
+                raise
+            cached = False
+        elif stream:
+            audio_bytes = await cache.lookup(key)
+            if audio_bytes is None:
+                return await stream_and_cache(
+                    key, ssml, voice,
+                    media_type="audio/mpeg",
+                    headers={
+                        "Content-Disposition": "inline; filename=tts.mp3",
+                        "X-Content-Type-Options": "nosniff",
+                        "X-Cache": "MISS",
+                        **cache_headers,
+                    }
+                )
+            cached = True
+        else:
+            # Generate audio
+            audio_bytes, cached = await cache.get_or_synthesize(
+                key, lambda: synthesize_ssml(ssml, voice)
+            )
 
         return Response(
             content=audio_bytes,
@@ -116,9 +794,64 @@ async def synthesize(req: TTSRequest):
                 "Content-Length": str(len(audio_bytes)),
                 "Content-Disposition": "inline; filename=tts.mp3",
                 "Accept-Ranges": "bytes",
-                "Cache-Control": "public, max-age=3600",
                 "X-Content-Type-Options": "nosniff",
+                "X-Cache": "HIT" if cached else "MISS",
+                "X-Chunks": str(len(chunks)),
+                **cache_headers,
             }
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"TTS Error: {str(e)}")
+
+
+@app.post("/tts/batch")
+async def synthesize_batch(batch: BatchTTSRequest):
+    """
+    Synthesize several requests in one round trip.
+
+    Items run concurrently (at most TTS_SYNTHESIS_CONCURRENCY upstream
+    syntheses at a time). By default the response is a stream of length-prefixed
+    frames in request order, each a 1-byte status (0 = MP3 audio, 1 = UTF-8
+    error message) and a 4-byte big-endian length followed by the payload.
+    Frames are sent as soon as every earlier item has finished. With
+    "concat": true a single MP3 clip of all items is returned instead.
+    """
+    tasks = [asyncio.ensure_future(synthesize_request(item)) for item in batch.items]
+
+    if batch.concat:
+        try:
+            clips = await asyncio.gather(*tasks)
+        except Exception as e:
+            cancel_all(tasks)
+            raise HTTPException(status_code=500, detail=f"TTS Error: {str(e)}")
+
+        audio_bytes = b"".join(clips)
+        return Response(
+            content=audio_bytes,
+            media_type="audio/mpeg",
+            headers={
+                "Content-Length": str(len(audio_bytes)),
+                "Content-Disposition": "inline; filename=tts.mp3",
+                "X-Batch-Count": str(len(clips)),
+            }
+        )
+
+    async def frames() -> AsyncIterator[bytes]:
+        try:
+            for task in tasks:
+                try:
+                    audio_bytes = await task
+                    yield BATCH_FRAME_HEADER.pack(0, len(audio_bytes))
+                    yield audio_bytes
+                except Exception as e:
+                    message = str(getattr(e, "detail", e)).encode("utf-8")
+                    yield BATCH_FRAME_HEADER.pack(1, len(message)) + message
+        finally:
+            # Client went away: stop syntheses nobody will read
+            cancel_all(tasks)
+
+    return StreamingResponse(
+        frames(),
+        media_type=BATCH_MEDIA_TYPE,
+        headers={"X-Batch-Count": str(len(tasks))}
+    )